@@ -1,10 +1,53 @@
 import streamlit as st
 import base64
 from PIL import Image
-import io
-import os
-import tempfile
 import google.generativeai as genai
+from utils.answer_cache import get_answer_cache
+from utils.file_utils import TempFileManager, file_sha256
+from services.document_service import (
+    generate_summary,
+    extract_key_concepts,
+    iter_document_blocks,
+    save_document_analysis
+)
+from services.document_index import retrieve_document_chunks
+from services.near_duplicate_service import find_saved_analysis, find_near_duplicate_analysis, register_document
+from services.library_service import add_to_library, add_document_to_library
+from services.gemini_service import (
+    generate_text_content,
+    generate_multimodal_content,
+    summarize_conversation,
+    ERROR_RESPONSE_PREFIX
+)
+from services.batch_service import run_batch, prepare_document, prepare_image, prepare_audio
+from utils.temp_janitor import get_temp_janitor
+from utils.conversation_utils import ConversationBuffer
+from utils.prompt_utils import (
+    create_learning_assistant_prompt,
+    create_media_chat_prompt,
+    create_document_analysis_prompt,
+    create_document_qa_prompt,
+    create_image_analysis_prompt,
+    create_audio_analysis_prompt,
+    create_video_analysis_prompt,
+    create_video_timestamps_prompt,
+    create_video_quiz_prompt,
+    create_quiz_generation_prompt,
+    create_concept_mapping_prompt
+)
+from utils.prompt_templates import get_template
+from utils.prompt_profiler import prompt_profiler, set_profiling_page
+from ui.components import (
+    checked_upload,
+    checked_uploads,
+    prompt_profile_panel,
+    temp_storage_panel,
+    reading_level_caption,
+    current_course,
+    course_selector,
+    library_search_panel
+)
+from config.settings import DOCUMENT_QA_TOP_K
 
 # Set page configuration
 st.set_page_config(page_title="EduGenius - AI Learning Assistant", 
@@ -106,6 +149,9 @@ safety_settings = [
     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
 ]
 
+# Start the temporary file janitor for this server process
+get_temp_janitor()
+
 # Initialize session state variables
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
@@ -180,6 +226,8 @@ selected_tab = st.tabs(modes)
 
 # Learning Assistant tab
 with selected_tab[0]:
+    set_profiling_page("Learning Assistant")
+
     if st.session_state.current_mode != "Learning Assistant":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Learning Assistant"
@@ -204,6 +252,9 @@ with selected_tab[0]:
             multimedia_examples = st.checkbox("Include Multimedia Examples", value=True,
                                           help="When possible, include diagrams, charts, or other visual aids in explanations")
     
+    # Earlier analyses, transcripts and quizzes of the course
+    library_search_panel(key_prefix="tutor_library")
+    
     # Initialize chat if not exists
     if "tutor_messages" not in st.session_state:
         st.session_state.tutor_messages = [
@@ -218,6 +269,10 @@ with selected_tab[0]:
                 st.markdown(f"<div style='background-color: #f0f2f6; padding: 10px; border-radius: 10px; margin-bottom: 10px;'><strong>You:</strong> {message['content']}</div>", unsafe_allow_html=True)
             else:
                 st.markdown(f"<div style='background-color: #e6f3ff; padding: 10px; border-radius: 10px; margin-bottom: 10px;'><strong>EduGenius:</strong> {message['content']}</div>", unsafe_allow_html=True)
+        
+        # Reading level of the latest answer, computed locally
+        if len(st.session_state.tutor_messages) > 1 and st.session_state.tutor_messages[-1]["role"] == "assistant":
+            reading_level_caption(st.session_state.tutor_messages[-1]["content"], learning_level)
     
     # Chat input area with a more modern design
     st.markdown("<br>", unsafe_allow_html=True)
@@ -246,6 +301,9 @@ with selected_tab[0]:
         elif upload_option == "Document":
             uploaded_file = st.file_uploader("Upload document:", type=["pdf", "docx", "txt"], key="chat_doc_upload")
         
+        # Reject files whose content does not match their extension
+        uploaded_file = checked_upload(uploaded_file)
+        
         if uploaded_file is not None:
             # Display information about the uploaded file
             st.success(f"File '{uploaded_file.name}' uploaded successfully! ({uploaded_file.type})")
@@ -261,56 +319,80 @@ with selected_tab[0]:
         # Add user message to chat
         st.session_state.tutor_messages.append({"role": "user", "content": user_input})
         
-        # Create system context based on selected options
-        system_context = f"You are EduGenius, an educational AI tutor. Adapt your explanation for {learning_level} level students. Use a {learning_style} learning style in your response."
-        
-        # Create conversation history for context
-        conversation_history = ""
-        if memory_option and len(st.session_state.tutor_messages) > 1:
-            for msg in st.session_state.tutor_messages[:-1]:  # Exclude the current message
-                role = "User" if msg["role"] == "user" else "EduGenius"
-                conversation_history += f"{role}: {msg['content']}\n\n"
-        
-        # Create complete prompt
-        if conversation_history:
-            prompt = f"{system_context}\n\nConversation history:\n{conversation_history}\n\nCurrent question: {user_input}"
-        else:
-            prompt = f"{system_context}\n\nStudent question: {user_input}"
+        # Keep the serialized conversation history in sync with the chat,
+        # excluding the message that was just added
+        if "tutor_buffer" not in st.session_state:
+            st.session_state.tutor_buffer = ConversationBuffer(summarizer=summarize_conversation)
+        st.session_state.tutor_buffer.sync(
+            st.session_state.tutor_messages, end=len(st.session_state.tutor_messages) - 1
+        )
         
         # Check if there's a multimedia upload to process
         has_multimedia = False
         media_type = None
         media_bytes = None
+        uploaded_media = None
         
         if hasattr(st.session_state, 'current_upload') and st.session_state.current_upload is not None:
             has_multimedia = True
             media_type = st.session_state.current_upload["type"].lower()
-            media_bytes = st.session_state.current_upload["file"].getvalue()
+            uploaded_media = (media_type, st.session_state.current_upload['name'])
             
-            # Add multimedia context to prompt
-            prompt += f"\n\nNote: The student has also uploaded a {media_type} file named '{st.session_state.current_upload['name']}'. Please incorporate this into your response if relevant."
+            # Only images are sent with the prompt, so other uploads are never read
+            if media_type == "image":
+                media_bytes = st.session_state.current_upload["file"].getvalue()
+        
+        # Create complete prompt
+        prompt = create_learning_assistant_prompt(
+            question=user_input,
+            learning_level=learning_level,
+            learning_style=learning_style,
+            chat_history=st.session_state.tutor_buffer if memory_option else None,
+            uploaded_media=uploaded_media
+        )
+        
+        # Standalone questions (no media, no earlier student turns in context)
+        # can be answered from the shared answer cache
+        has_prior_turns = memory_option and any(
+            msg["role"] == "user" for msg in st.session_state.tutor_messages[:-1]
+        )
+        is_standalone = not has_multimedia and not has_prior_turns
+        answer_cache = get_answer_cache()
+        template_key = get_template("learning_assistant").cache_key
+        cached_answer = None
+        if is_standalone:
+            cached_answer = answer_cache.get(user_input, learning_level, learning_style, context_key=template_key)
         
         with st.spinner("Thinking..."):
             try:
-                # Create a generative model instance
-                model = genai.GenerativeModel(
-                    model_name=model_name,
-                    generation_config=get_generation_config(temperature=0.7),
-                    safety_settings=safety_settings
-                )
-                
-                # Generate response based on whether there's multimedia
-                if has_multimedia and media_type == "image":
-                    response = model.generate_content([
-                        prompt,
-                        {"mime_type": "image/jpeg", "data": media_bytes}
-                    ])
+                if cached_answer is not None:
+                    response_text = cached_answer
                 else:
-                    # For text-only or other media types (which we're simulating for now)
-                    response = model.generate_content(prompt)
-                
-                # Extract response text
-                response_text = response.text
+                    # Create a generative model instance
+                    model = genai.GenerativeModel(
+                        model_name=model_name,
+                        generation_config=get_generation_config(temperature=0.7),
+                        safety_settings=safety_settings
+                    )
+                    
+                    # Generate response based on whether there's multimedia
+                    if has_multimedia and media_type == "image":
+                        prompt_profiler.record_media("image/jpeg", len(media_bytes))
+                        response = model.generate_content([
+                            prompt,
+                            {"mime_type": "image/jpeg", "data": media_bytes}
+                        ])
+                    else:
+                        # For text-only or other media types (which we're simulating for now)
+                        response = model.generate_content(prompt)
+                    
+                    # Extract response text
+                    response_text = response.text
+                    
+                    # Remember standalone answers for other students
+                    if is_standalone:
+                        answer_cache.put(user_input, learning_level, learning_style, response_text,
+                                         context_key=template_key)
                 
                 # Add AI response to chat
                 st.session_state.tutor_messages.append({"role": "assistant", "content": response_text})
@@ -329,6 +411,8 @@ with selected_tab[0]:
 
 # Document Analysis tab
 with selected_tab[1]:
+    set_profiling_page("Document Analysis")
+
     if st.session_state.current_mode != "Document Analysis":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Document Analysis"
@@ -336,61 +420,149 @@ with selected_tab[1]:
     st.markdown("### AI-Powered Document Analysis")
     st.markdown("Upload study materials, textbooks, or notes for AI analysis and insights")
     
-    uploaded_file = st.file_uploader("Upload a document (PDF, DOCX, or TXT):", type=["pdf", "docx", "txt"])
+    uploaded_files = st.file_uploader("Upload documents (PDF, DOCX, or TXT):", type=["pdf", "docx", "txt"],
+                                      accept_multiple_files=True)
+
+    # Reject files whose content does not match their extension
+    uploaded_files = checked_uploads(uploaded_files)
     
-    if uploaded_file is not None:
+    if uploaded_files:
         analysis_type = st.multiselect("Select analysis types:", 
                                       ["Key Concepts Extraction", "Summary Generation", 
                                        "Difficulty Assessment", "Concept Relations", 
                                        "Generate Study Questions"])
         
-        if st.button("Analyze Document", use_container_width=True):
-            with st.spinner("Analyzing document..."):
-                # Get file content as bytes
-                file_bytes = uploaded_file.getvalue()
-                
-                # Create a temporary file to hold the content
-                with tempfile.NamedTemporaryFile(delete=False, suffix="." + uploaded_file.name.split(".")[-1]) as temp_file:
-                    temp_file.write(file_bytes)
-                    temp_file_path = temp_file.name
-                
-                # In a real implementation, you would process the document content here
-                # For now, just use a placeholder for the demo
-                file_content_preview = file_bytes[:1000]  # Just use first 1000 bytes as a preview
-                
-                try:
-                    # Create prompt with analysis instructions
-                    analysis_prompt = f"I'm uploading a document named '{uploaded_file.name}'. "
-                    analysis_prompt += f"Please perform the following analyses: {', '.join(analysis_type)}. "
-                    analysis_prompt += "Here's a preview of the document content: " + str(file_content_preview)
+        # Offer saved analyses of the same files; near duplicates are found when analyzing
+        for file_index, uploaded_file in enumerate(uploaded_files):
+            saved = find_saved_analysis(uploaded_file, analysis_type)
+            if saved is None:
+                continue
+            st.info(f"**{uploaded_file.name}** was analyzed earlier for the same analysis types.")
+            if st.button(f"Use Earlier Analysis of {uploaded_file.name}", use_container_width=True, key=f"reuse_analysis_button_{file_index}"):
+                st.session_state.chat_history.append({"role": "user", "content": f"Please analyze my document '{uploaded_file.name}' for: {', '.join(analysis_type)}"})
+                st.session_state.chat_history.append({"role": "assistant", "content": saved["response"]})
+        
+        reuse_similar = st.checkbox("Reuse analyses of nearly identical documents", value=False,
+                                    help="Another scan, export or revision of a document analyzed earlier is answered from that analysis")
+        
+        button_label = "Analyze Document" if len(uploaded_files) == 1 else f"Analyze {len(uploaded_files)} Documents"
+        if st.button(button_label, use_container_width=True):
+            with st.spinner("Analyzing documents..."):
+                # The uploads are released from the shared store however the analysis ends
+                with TempFileManager() as temp_manager:
+                    # Save the uploads to the shared upload store
+                    files = []
+                    for uploaded_file in uploaded_files:
+                        try:
+                            files.append((temp_manager.save_uploaded_file(uploaded_file), uploaded_file.name))
+                        except ValueError as e:
+                            st.error(f"{uploaded_file.name}: {str(e)}")
                     
-                    # Add to history
-                    st.session_state.chat_history.append({"role": "user", "content": f"Please analyze my document '{uploaded_file.name}' for: {', '.join(analysis_type)}"})
+                    # Show a local extractive draft of a single document while the full summary is generated
+                    draft_placeholder = st.empty()
+                    if len(files) == 1 and "Summary Generation" in analysis_type:
+                        draft_summary = generate_summary(iter_document_blocks(files[0][0]), use_api=False)
+                        if draft_summary:
+                            draft_placeholder.info(f"**Draft summary** (refining...)\n\n{draft_summary}")
                     
-                    # Create a generative model instance
-                    model = genai.GenerativeModel(
-                        model_name=model_name,
-                        generation_config=get_generation_config(temperature=0.2),
-                        safety_settings=safety_settings
-                    )
+                    # Read in this thread; the analyses run in worker threads and must not call Streamlit
+                    course = current_course()
                     
-                    # Generate content
-                    response = model.generate_content(analysis_prompt)
+                    def analyze_document(file_path, file_name, prepared):
+                        sha256 = file_sha256(file_path)
+                        
+                        # Keep the document in the course library
+                        add_document_to_library(file_path, sha256, file_name, course)
+                        
+                        # A nearly identical document analyzed earlier is answered instantly;
+                        # its analysis is already saved, so nothing is stored again
+                        earlier = None
+                        if reuse_similar:
+                            earlier = find_near_duplicate_analysis(file_path, sha256, analysis_type)
+                        if earlier is not None:
+                            match, saved = earlier
+                            return f"*Reused the analysis of {saved['document_name']}, which is {match.similarity:.0%} similar.*\n\n{saved['response']}"
+                        
+                        # Summarize the whole document chunk by chunk when asked to
+                        document_summary = None
+                        if "Summary Generation" in analysis_type:
+                            document_summary = generate_summary(
+                                iter_document_blocks(file_path), document_name=file_name
+                            )
+                        
+                        # Locally ranked concepts give the model a head start
+                        document_metadata = prepared["info"]
+                        if "Key Concepts Extraction" in analysis_type:
+                            concepts = extract_key_concepts(
+                                iter_document_blocks(file_path), count=10, document_id=sha256
+                            )
+                            document_metadata = dict(document_metadata, candidate_key_concepts=", ".join(concepts))
+                        
+                        # Create prompt with analysis instructions from the extracted preview
+                        analysis_prompt = create_document_analysis_prompt(
+                            document_name=file_name,
+                            analysis_types=analysis_type,
+                            document_preview=prepared["preview"],
+                            document_metadata=document_metadata,
+                            document_summary=document_summary
+                        )
+                        response_text = generate_text_content(analysis_prompt, temperature=0.2, show_errors=False)
+                        
+                        # Remember the analysis for later uploads of this or a revised version
+                        save_document_analysis(sha256, analysis_type, file_name, response_text)
+                        register_document(file_path, sha256, file_name)
+                        add_to_library("analysis", f"Analysis of {file_name}", response_text, course)
+                        return response_text
                     
-                    # Extract response text
-                    response_text = response.text
-                    st.session_state.chat_history.append({"role": "assistant", "content": response_text})
+                    # One placeholder per document, filled in as its analysis finishes
+                    placeholders = [st.empty() for _ in files]
+                    for index, _, response_text in run_batch(files, prepare_document, analyze_document):
+                        file_name = files[index][1]
+                        draft_placeholder.empty()
+                        placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                        if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                            st.error(f"{file_name}: {response_text}")
+                        
+                        st.session_state.chat_history.append({"role": "user", "content": f"Please analyze my document '{file_name}' for: {', '.join(analysis_type)}"})
+                        st.session_state.chat_history.append({"role": "assistant", "content": response_text})
                     
-                    # Clean up the temporary file
-                    os.unlink(temp_file_path)
-                
-                except Exception as e:
-                    st.error(f"Error analyzing document: {str(e)}")
-                    st.session_state.chat_history.append({"role": "assistant", "content": f"I apologize, but I encountered an error: {str(e)}"})
+                    # The results are shown with the history below
+                    for placeholder in placeholders:
+                        placeholder.empty()
+        
+        # Questions are answered from the most relevant passages only
+        st.markdown("### Ask About Your Documents")
+        document_question = st.text_input("Your question:", key="document_qa_input",
+                                          placeholder="e.g., How does the author define opportunity cost?")
+        
+        if st.button("Ask", use_container_width=True, key="document_qa_button") and document_question:
+            with st.spinner("Searching your documents..."):
+                with TempFileManager() as temp_manager:
+                    try:
+                        documents = []
+                        for uploaded_file in uploaded_files:
+                            try:
+                                documents.append((temp_manager.save_uploaded_file(uploaded_file), uploaded_file.name))
+                            except ValueError as e:
+                                st.error(f"{uploaded_file.name}: {str(e)}")
+                        
+                        # Indexes are built once per document and reused afterwards
+                        excerpts = retrieve_document_chunks(documents, document_question, DOCUMENT_QA_TOP_K)
+                        qa_prompt = create_document_qa_prompt(document_question, excerpts)
+                        
+                        st.session_state.chat_history.append({"role": "user", "content": document_question})
+                        
+                        model = genai.GenerativeModel(
+                            model_name=model_name,
+                            generation_config=get_generation_config(temperature=0.2),
+                            safety_settings=safety_settings
+                        )
+                        response = model.generate_content(qa_prompt)
+                        st.session_state.chat_history.append({"role": "assistant", "content": response.text})
                     
-                    # Clean up the temporary file
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
+                    except Exception as e:
+                        st.error(f"Error answering question: {str(e)}")
+                        st.session_state.chat_history.append({"role": "assistant", "content": f"I apologize, but I encountered an error: {str(e)}"})
     
     # Display analysis history
     st.markdown("### Analysis Results")
@@ -403,6 +575,8 @@ with selected_tab[1]:
 
 # Visual Learning tab  
 with selected_tab[2]:
+    set_profiling_page("Visual Learning")
+
     if st.session_state.current_mode != "Visual Learning":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Visual Learning"
@@ -410,11 +584,13 @@ with selected_tab[2]:
     st.markdown("### Visual Learning Assistant")
     st.markdown("Upload images of diagrams, problems, or visual concepts for AI explanation")
     
-    uploaded_image = st.file_uploader("Upload an image:", type=["jpg", "jpeg", "png"])
+    uploaded_images = st.file_uploader("Upload images:", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+
+    # Reject files whose content does not match their extension
+    uploaded_images = checked_uploads(uploaded_images)
     
-    if uploaded_image is not None:
-        image = Image.open(uploaded_image)
-        st.image(image, caption="Uploaded Image", use_column_width=True)
+    if uploaded_images:
+        st.image(uploaded_images, caption=[f.name for f in uploaded_images], use_column_width=True)
         
         query_type = st.radio("What would you like to do with this image?", 
                              ["Explain the concept shown", "Identify elements", 
@@ -427,9 +603,18 @@ with selected_tab[2]:
         st.markdown("### Image Chat")
         st.info("You can have a conversation about this image by entering questions below.")
         
+        # The chat is about one image at a time
+        uploaded_image = uploaded_images[0]
+        if len(uploaded_images) > 1:
+            chat_index = st.selectbox("Image to chat about:", range(len(uploaded_images)),
+                                      format_func=lambda i: uploaded_images[i].name)
+            uploaded_image = uploaded_images[chat_index]
+        
         # Initialize image chat history if not exists
         if "image_chat_history" not in st.session_state:
             st.session_state.image_chat_history = []
+        if "image_chat_buffer" not in st.session_state:
+            st.session_state.image_chat_buffer = ConversationBuffer(summarizer=summarize_conversation)
         
         # Display image chat history
         for message in st.session_state.image_chat_history:
@@ -447,12 +632,18 @@ with selected_tab[2]:
                 # Add to image chat history
                 st.session_state.image_chat_history.append({"role": "user", "content": image_chat_input})
                 
+                # Earlier turns about this image, summarized once they grow long
+                st.session_state.image_chat_buffer.sync(
+                    st.session_state.image_chat_history, end=len(st.session_state.image_chat_history) - 1
+                )
+                image_chat_prompt = create_media_chat_prompt(
+                    "image", uploaded_image.name, image_chat_input, st.session_state.image_chat_buffer
+                )
+                
                 with st.spinner("Analyzing..."):
                     try:
-                        # Convert image for API
-                        img_byte_arr = io.BytesIO()
-                        image.save(img_byte_arr, format='PNG')
-                        img_byte_arr = img_byte_arr.getvalue()
+                        # Send the uploaded bytes as they are instead of re-encoding the image
+                        img_byte_arr = uploaded_image.getvalue()
                         
                         # Create a generative model instance
                         model = genai.GenerativeModel(
@@ -462,9 +653,10 @@ with selected_tab[2]:
                         )
                         
                         # Prepare multipart content
+                        prompt_profiler.record_media(uploaded_image.type, len(img_byte_arr))
                         response = model.generate_content([
-                            image_chat_input,
-                            {"mime_type": "image/png", "data": img_byte_arr}
+                            image_chat_prompt,
+                            {"mime_type": uploaded_image.type, "data": img_byte_arr}
                         ])
                         
                         # Extract response text
@@ -480,40 +672,46 @@ with selected_tab[2]:
                         st.experimental_rerun()
         
         # Main image analysis button
-        if st.button("Analyze Image", use_container_width=True, key="main_analysis"):
-            with st.spinner("Analyzing image..."):
-                try:
-                    # Create prompt with image query
-                    image_prompt = f"{query_type}: {specific_question}" if specific_question else query_type
-                    
-                    # Add to history
-                    st.session_state.chat_history.append({"role": "user", "content": f"[Image uploaded] {image_prompt}"})
-                    
-                    # Convert image for API
-                    img_byte_arr = io.BytesIO()
-                    image.save(img_byte_arr, format='PNG')
-                    img_byte_arr = img_byte_arr.getvalue()
+        button_label = "Analyze Image" if len(uploaded_images) == 1 else f"Analyze {len(uploaded_images)} Images"
+        if st.button(button_label, use_container_width=True, key="main_analysis"):
+            with st.spinner("Analyzing images..."):
+                # Describe the image request for the history
+                image_prompt = f"{query_type}: {specific_question}" if specific_question else query_type
+                analysis_prompt = create_image_analysis_prompt(query_type, specific_question)
+                
+                # The uploads are released from the shared store however the analysis ends
+                with TempFileManager() as temp_manager:
+                    files = []
+                    for image_file in uploaded_images:
+                        try:
+                            files.append((temp_manager.save_uploaded_file(image_file), image_file.name))
+                        except ValueError as e:
+                            st.error(f"{image_file.name}: {str(e)}")
                     
-                    # Create a generative model instance
-                    model = genai.GenerativeModel(
-                        model_name=model_name,
-                        generation_config=get_generation_config(temperature=0.2),
-                        safety_settings=safety_settings
-                    )
+                    def analyze_image(file_path, file_name, prepared):
+                        # Runs on a worker thread, so failures are returned and shown below
+                        return generate_multimodal_content(
+                            prompt=analysis_prompt,
+                            media_data=file_path,
+                            media_type=prepared["info"].get("mime_type", "image/jpeg"),
+                            temperature=0.2,
+                            show_errors=False
+                        )
                     
-                    # Prepare multipart content
-                    response = model.generate_content([
-                        image_prompt,
-                        {"mime_type": "image/png", "data": img_byte_arr}
-                    ])
+                    # One placeholder per image, filled in as its analysis finishes
+                    placeholders = [st.empty() for _ in files]
+                    for index, _, response_text in run_batch(files, prepare_image, analyze_image):
+                        file_name = files[index][1]
+                        placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                        if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                            st.error(f"{file_name}: {response_text}")
+                        
+                        st.session_state.chat_history.append({"role": "user", "content": f"[Image uploaded: {file_name}] {image_prompt}"})
+                        st.session_state.chat_history.append({"role": "assistant", "content": response_text})
                     
-                    # Extract response text
-                    response_text = response.text
-                    st.session_state.chat_history.append({"role": "assistant", "content": response_text})
-                
-                except Exception as e:
-                    st.error(f"Error analyzing image: {str(e)}")
-                    st.session_state.chat_history.append({"role": "assistant", "content": f"I apologize, but I encountered an error: {str(e)}"})
+                    # The results are shown with the history below
+                    for placeholder in placeholders:
+                        placeholder.empty()
     
     # Display visual analysis history
     st.markdown("### Analysis Results")
@@ -526,6 +724,8 @@ with selected_tab[2]:
 
 # Audio Analysis tab
 with selected_tab[3]:
+    set_profiling_page("Audio Analysis")
+
     if st.session_state.current_mode != "Audio Analysis":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Audio Analysis"
@@ -533,11 +733,17 @@ with selected_tab[3]:
     st.markdown("### Audio Learning Assistant")
     st.markdown("Upload audio files for transcription, analysis, and educational insights")
     
-    uploaded_audio = st.file_uploader("Upload an audio file:", type=["mp3", "wav", "m4a", "ogg"])
+    uploaded_audios = st.file_uploader("Upload audio files:", type=["mp3", "wav", "m4a", "ogg"],
+                                       accept_multiple_files=True)
+
+    # Reject files whose content does not match their extension
+    uploaded_audios = checked_uploads(uploaded_audios)
     
-    if uploaded_audio is not None:
-        # Display audio player
-        st.audio(uploaded_audio, format="audio/mp3")
+    if uploaded_audios:
+        # Display audio players
+        for uploaded_audio in uploaded_audios:
+            st.caption(uploaded_audio.name)
+            st.audio(uploaded_audio, format=uploaded_audio.type or "audio/mp3")
         
         analysis_options = st.multiselect("Select analysis types:", 
                                      ["Transcription", "Content Summary", 
@@ -548,57 +754,49 @@ with selected_tab[3]:
                               ["Auto-detect", "English", "Spanish", "French", "German", 
                                "Chinese", "Japanese", "Arabic", "Hindi", "Russian"])
         
-        if st.button("Analyze Audio", use_container_width=True):
+        button_label = "Analyze Audio" if len(uploaded_audios) == 1 else f"Analyze {len(uploaded_audios)} Audio Files"
+        if st.button(button_label, use_container_width=True):
             with st.spinner("Processing audio..."):
                 try:
-                    # Get audio bytes
-                    audio_bytes = uploaded_audio.getvalue()
-                    
-                    # Create prompt for audio analysis
-                    audio_prompt = f"I've uploaded an audio file named '{uploaded_audio.name}'. "
-                    audio_prompt += f"Please perform the following analyses: {', '.join(analysis_options)}. "
-                    
-                    if language != "Auto-detect":
-                        audio_prompt += f"The audio is in {language}. "
-                    
-                    audio_prompt += "Please provide a detailed analysis focusing on educational value."
-                    
-                    # Add to history
-                    st.session_state.chat_history.append({"role": "user", "content": f"[Audio uploaded] Please analyze with: {', '.join(analysis_options)}"})
-                    
-                    # Create a generative model instance for audio
-                    model = genai.GenerativeModel(
-                        model_name=model_name,
-                        generation_config=get_generation_config(temperature=0.2),
-                        safety_settings=safety_settings
-                    )
-                    
-                    # In production, you would process the audio file here
-                    # For demo purposes, simulate the audio analysis
-                    
-                    # Simulate an analysis response
-                    analysis_content = f"""
-# Audio Analysis of {uploaded_audio.name}
-
-## Transcription
-[This would normally contain the transcribed text from the audio file]
-
-## Content Summary
-This audio appears to contain educational content related to [subject]. The main topics covered include:
-- Topic 1
-- Topic 2
-- Topic 3
-
-## Key Concepts Identified
-- Concept 1: Brief explanation
-- Concept 2: Brief explanation
-- Concept 3: Brief explanation
-
-## Educational Value
-This audio would be suitable for students at the [level] level. It effectively explains [concepts] and could be integrated into curriculum for [subject] courses.
-"""
-                    
-                    st.session_state.chat_history.append({"role": "assistant", "content": analysis_content})
+                    # The uploads are released from the shared store however the analysis ends
+                    with TempFileManager() as temp_manager:
+                        files = []
+                        for uploaded_audio in uploaded_audios:
+                            try:
+                                files.append((temp_manager.save_uploaded_file(uploaded_audio), uploaded_audio.name))
+                            except ValueError as e:
+                                st.error(f"{uploaded_audio.name}: {str(e)}")
+                        
+                        # Read in this thread; the analyses run in worker threads and must not call Streamlit
+                        course = current_course()
+                        kind = "transcript" if "Transcription" in analysis_options else "audio"
+                        
+                        def analyze_audio(file_path, file_name, prepared):
+                            audio_prompt = create_audio_analysis_prompt(
+                                audio_name=file_name,
+                                analysis_types=analysis_options,
+                                language=language
+                            )
+                            response_text = generate_text_content(audio_prompt, temperature=0.2, show_errors=False)
+                            
+                            # Keep the transcript or analysis in the course library
+                            add_to_library(kind, file_name, response_text, course)
+                            return response_text
+                        
+                        # One placeholder per file, filled in as its analysis finishes
+                        placeholders = [st.empty() for _ in files]
+                        for index, _, response_text in run_batch(files, prepare_audio, analyze_audio):
+                            file_name = files[index][1]
+                            placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                            if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                                st.error(f"{file_name}: {response_text}")
+                            
+                            st.session_state.chat_history.append({"role": "user", "content": f"[Audio uploaded: {file_name}] Please analyze with: {', '.join(analysis_options)}"})
+                            st.session_state.chat_history.append({"role": "assistant", "content": response_text})
+                        
+                        # The results are shown with the history below
+                        for placeholder in placeholders:
+                            placeholder.empty()
                     
                     # Add chat functionality for audio
                     st.markdown("### Audio Chat")
@@ -644,6 +842,8 @@ This audio would be suitable for students at the [level] level. It effectively e
 
 # Video Learning tab
 with selected_tab[4]:
+    set_profiling_page("Video Learning")
+
     if st.session_state.current_mode != "Video Learning":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Video Learning"
@@ -652,11 +852,13 @@ with selected_tab[4]:
     st.markdown("Upload educational videos for AI analysis, summaries, and interactive learning")
     
     uploaded_video = st.file_uploader("Upload a video file:", type=["mp4", "mov", "avi", "mkv"])
+
+    # Reject files whose content does not match their extension
+    uploaded_video = checked_upload(uploaded_video)
     
     if uploaded_video is not None:
         # Display video player
-        video_bytes = uploaded_video.getvalue()
-        st.video(video_bytes)
+        st.video(uploaded_video)
         
         video_analysis_options = st.multiselect("Select analysis types:", 
                                       ["Video Transcription", "Content Summary", 
@@ -671,10 +873,11 @@ with selected_tab[4]:
             with st.spinner("Processing video..."):
                 try:
                     # Create prompt for video analysis
-                    video_prompt = f"I've uploaded a video file named '{uploaded_video.name}'. "
-                    video_prompt += f"Please perform the following analyses: {', '.join(video_analysis_options)}. "
-                    video_prompt += f"Focus on {video_focus} educational aspects. "
-                    video_prompt += "Provide a detailed analysis of the educational value of this video."
+                    video_prompt = create_video_analysis_prompt(
+                        video_name=uploaded_video.name,
+                        analysis_types=video_analysis_options,
+                        focus=video_focus
+                    )
                     
                     # Add to history
                     st.session_state.chat_history.append({"role": "user", "content": f"[Video uploaded] Please analyze with: {', '.join(video_analysis_options)}"})
@@ -736,6 +939,8 @@ This video would be valuable for students studying [subject] at the [level] leve
                         # Initialize video chat if not exists
                         if "video_chat_history" not in st.session_state:
                             st.session_state.video_chat_history = []
+                        if "video_chat_buffer" not in st.session_state:
+                            st.session_state.video_chat_buffer = ConversationBuffer(summarizer=summarize_conversation)
                         
                         # Display video chat history
                         for message in st.session_state.video_chat_history:
@@ -761,8 +966,15 @@ This video would be valuable for students studying [subject] at the [level] leve
                                         safety_settings=safety_settings
                                     )
                                     
-                                    # Generate response
-                                    response = model.generate_content(video_chat_input)
+                                    # Generate response with earlier turns as context
+                                    st.session_state.video_chat_buffer.sync(
+                                        st.session_state.video_chat_history,
+                                        end=len(st.session_state.video_chat_history) - 1
+                                    )
+                                    response = model.generate_content(create_media_chat_prompt(
+                                        "video", uploaded_video.name, video_chat_input,
+                                        st.session_state.video_chat_buffer
+                                    ))
                                     
                                     # In a real implementation, you would process the video query here
                                     # For demo purposes, use simulated response if needed
@@ -792,7 +1004,7 @@ This video would be valuable for students studying [subject] at the [level] leve
                                 )
                                 
                                 # Generate timestamps
-                                timestamp_prompt = f"Generate educational timestamps for a video about {uploaded_video.name} focusing on {timestamp_purpose}."
+                                timestamp_prompt = create_video_timestamps_prompt(uploaded_video.name, timestamp_purpose)
                                 response = model.generate_content(timestamp_prompt)
                                 
                                 # Display generated or simulated timestamps
@@ -833,7 +1045,7 @@ This video would be valuable for students studying [subject] at the [level] leve
                                 )
                                 
                                 # Generate quiz
-                                quiz_prompt = f"Create a {quiz_format} quiz with {quiz_question_count} questions based on a video about {uploaded_video.name}."
+                                quiz_prompt = create_video_quiz_prompt(uploaded_video.name, quiz_question_count, quiz_format)
                                 response = model.generate_content(quiz_prompt)
                                 
                                 # Display generated or simulated quiz
@@ -893,6 +1105,8 @@ This video would be valuable for students studying [subject] at the [level] leve
 
 # Quiz Generator tab
 with selected_tab[5]:
+    set_profiling_page("Quiz Generator")
+
     if st.session_state.current_mode != "Quiz Generator":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Quiz Generator"
@@ -939,23 +1153,17 @@ with selected_tab[5]:
         with st.spinner("Creating quiz..."):
             try:
                 # Create prompt for quiz generation
-                quiz_prompt = f"Create a quiz on {subject}"
-                if subtopic:
-                    quiz_prompt += f" focusing on {subtopic}"
-                
-                quiz_prompt += f". The quiz should be for {education_level} level students and contain {question_count} {quiz_type} questions at a {difficulty} difficulty level."
-                
-                if content_focus:
-                    quiz_prompt += f" Focus on {', '.join(content_focus)}."
-                
-                if include_answers:
-                    quiz_prompt += " Include an answer key."
-                
-                if include_explanations:
-                    quiz_prompt += " Include explanations for each answer."
-                
-                if special_instructions:
-                    quiz_prompt += f" Additional instructions: {special_instructions}"
+                quiz_prompt = create_quiz_generation_prompt(
+                    topic=f"{subject}: {subtopic}" if subtopic else subject,
+                    difficulty=difficulty,
+                    question_count=question_count,
+                    format_type=quiz_type,
+                    education_level=education_level,
+                    content_focus=content_focus,
+                    include_answers=include_answers,
+                    include_explanations=include_explanations,
+                    additional_instructions=special_instructions
+                )
                 
                 # Add to history
                 st.session_state.chat_history.append({"role": "user", "content": quiz_prompt})
@@ -974,9 +1182,13 @@ with selected_tab[5]:
                 response_text = response.text
                 st.session_state.chat_history.append({"role": "assistant", "content": response_text})
                 
+                # Keep the quiz in the course library
+                add_to_library("quiz", f"Quiz: {subject}: {subtopic}" if subtopic else f"Quiz: {subject}", response_text, current_course())
+                
                 # Display the quiz
                 st.markdown("## Generated Quiz")
                 st.markdown(response_text)
+                reading_level_caption(response_text, education_level)
                 
                 # Add export options
                 st.download_button(
@@ -1022,6 +1234,8 @@ with selected_tab[5]:
 
 # Concept Mapper tab
 with selected_tab[6]:
+    set_profiling_page("Concept Mapper")
+
     if st.session_state.current_mode != "Concept Mapper":
         st.session_state.chat_history = []
         st.session_state.current_mode = "Concept Mapper"
@@ -1064,22 +1278,17 @@ with selected_tab[6]:
         with st.spinner("Creating concept map..."):
             try:
                 # Create prompt for concept map generation
-                map_prompt = f"Create a {complexity} concept map about {main_topic} for {education_level} level students. "
-                map_prompt += f"The concept map should focus on {focus_area} and use a {visual_style} style. "
-                
-                if include_definitions:
-                    map_prompt += "Include brief definitions for key concepts. "
-                
-                if include_examples:
-                    map_prompt += "Include examples where appropriate. "
-                
-                if include_resources:
-                    map_prompt += "Suggest additional resources for further learning. "
-                
-                if custom_content:
-                    map_prompt += f"Be sure to include these specific concepts or content: {custom_content}. "
-                
-                map_prompt += "Provide the concept map in a format that clearly shows relationships between concepts."
+                map_prompt = create_concept_mapping_prompt(
+                    topic=main_topic,
+                    complexity=complexity,
+                    related_concepts=[custom_content] if custom_content else None,
+                    educational_level=education_level,
+                    map_format=visual_style,
+                    specific_focus=focus_area,
+                    include_examples=include_examples,
+                    include_definitions=include_definitions,
+                    include_resources=include_resources
+                )
                 
                 # Add to history
                 st.session_state.chat_history.append({"role": "user", "content": map_prompt})
@@ -1149,3 +1358,9 @@ with selected_tab[6]:
                     st.markdown(st.session_state.chat_history[i+1]["content"])
     else:
         st.info("No concept maps generated yet. Create your first concept map above!")
+
+# Course library and developer panels (only shown when enabled)
+with st.sidebar:
+    course_selector()
+    prompt_profile_panel()
+    temp_storage_panel()
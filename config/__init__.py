@@ -1,21 +1 @@
-# config/__init__.py
 """Configuration package for the EduGenius application."""
-
-# services/__init__.py
-"""Service modules for the EduGenius application."""
-
-# ui/__init__.py
-"""UI modules for the EduGenius application."""
-
-# ui/pages/__init__.py
-"""Page modules for the EduGenius application UI."""
-from . import learning_assistant
-from . import document_analysis
-from . import visual_learning
-from . import audio_analysis
-from . import video_learning
-from . import quiz_generator
-from . import concept_mapper
-
-# utils/__init__.py
-"""Utility modules for the EduGenius application."""
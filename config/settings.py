@@ -1,4 +1,5 @@
 import os
+import tempfile
 import streamlit as st
 
 # Application settings
@@ -64,3 +65,114 @@ ALLOWED_EXTENSIONS = {
 
 # Maximum file size (in MB)
 MAX_FILE_SIZE_MB = 25
+
+# Block size used when copying uploads to disk (in bytes)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Batch uploads
+BATCH_MAX_FILES = 20  # Files accepted in one batch upload
+BATCH_PROCESS_WORKERS = min(4, os.cpu_count() or 1)  # Processes for extraction, metadata and previews
+BATCH_GEMINI_CONCURRENCY = 4  # Gemini requests in flight at once for a batch
+
+# PDF extraction
+PDF_PARALLEL_MIN_PAGES = 40  # Smaller PDFs are extracted on the calling thread
+PDF_PAGES_PER_TASK = 20  # Page range extracted by one worker task
+PDF_MAX_PENDING_TASKS = 8  # Page ranges in flight or waiting to be merged, bounding memory
+PDF_PAGE_CACHE_MAX_CHARS = 20_000_000  # Extracted page text kept for reuse
+
+# Document chunking and summarization
+CHUNK_MAX_TOKENS = 2000  # Estimated tokens per chunk sent for summarization
+CHUNK_OVERLAP_TOKENS = 200  # Trailing context repeated at the start of the next chunk
+CHUNK_BOUNDARY_WINDOW_CHARS = 64  # Closing text hashed to place content-defined chunk boundaries
+CHUNK_SUMMARY_WORDS = 150  # Length of each chunk summary in the map step
+SUMMARY_CONCURRENCY = 6  # Chunk and reduce requests in flight at once
+SUMMARY_REDUCE_FAN_IN = 8  # Summaries combined by one reduce request
+
+# Local extractive summaries
+TEXTRANK_MAX_CANDIDATES = 400  # Sentences ranked by TextRank after centroid pruning
+TEXTRANK_MIN_SENTENCE_WORDS = 6  # Shorter sentences are never selected
+TEXTRANK_SIMILARITY_THRESHOLD = 0.05  # Weaker sentence similarities are dropped from the graph
+
+# Key concept extraction
+CORPUS_STATS_PATH = os.environ.get(
+    "EDUGENIUS_CORPUS_STATS", os.path.join(tempfile.gettempdir(), "edugenius_corpus_df.json")
+)
+CORPUS_MAX_TERMS = 500_000  # The rarest terms are forgotten above this
+CORPUS_MAX_DOCUMENT_IDS = 50_000  # Document hashes remembered to avoid counting a document twice
+CORPUS_SAVE_EVERY_DOCUMENTS = 25  # The table is saved after this many new documents...
+CORPUS_SAVE_INTERVAL_SECONDS = 60  # ...or when this long has passed since the last save, and at exit
+KEY_CONCEPT_MAX_WORDS = 3  # Longest phrase considered as a concept
+
+# Document question answering
+DOCUMENT_INDEX_DIR = os.environ.get("EDUGENIUS_INDEX_DIR", os.path.join(tempfile.gettempdir(), "edugenius_index"))
+DOCUMENT_INDEX_CACHE_SIZE = 16  # Document indexes kept in memory
+INDEX_CHUNK_TOKENS = 400  # Smaller chunks than for summaries, so answers cite focused passages
+INDEX_CHUNK_OVERLAP_TOKENS = 50
+DOCUMENT_QA_TOP_K = 6  # Chunks included in a question-answering prompt
+INDEX_CHUNK_CACHE_SIZE = 4096  # Tokenized chunks kept for re-indexing revised documents
+DOCUMENT_INDEX_QUOTA_MB = 512  # Least recently used persisted indexes are deleted above this
+
+# Media sent to Gemini
+INLINE_MEDIA_MAX_MB = 18  # Larger files are sent through the Files API instead of inline
+GEMINI_FILE_TTL_SECONDS = 46 * 60 * 60  # Uploaded files expire on the server after 48 hours
+GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS = 300  # Longest wait for an uploaded video to become usable
+
+# File type detection
+FILE_SNIFF_BYTES = 4096  # Leading bytes read to detect a file's real type
+FILE_TYPE_CACHE_SIZE = 4096  # Detected types remembered by content hash
+
+# Persistent extraction cache (metadata and extracted text by content hash)
+EXTRACTION_CACHE_DIR = os.environ.get(
+    "EDUGENIUS_EXTRACTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "edugenius_extraction")
+)
+EXTRACTION_CACHE_QUOTA_MB = 512  # Least recently used entries are deleted above this
+EXTRACTION_CACHE_MAX_TEXT_CHARS = 20_000_000  # Longer documents are re-extracted instead of cached
+
+# Near-duplicate detection (MinHash signatures in an LSH index)
+NEAR_DUPLICATE_INDEX_PATH = os.environ.get(
+    "EDUGENIUS_NEAR_DUPLICATE_INDEX", os.path.join(tempfile.gettempdir(), "edugenius_minhash.json")
+)
+SHINGLE_WORDS = 4  # Words per shingle; each edited word changes this many shingles
+MINHASH_NUM_PERMUTATIONS = 128  # Signature length; the similarity estimate is within about 0.04
+MINHASH_BANDS = 16  # LSH bands of 8 rows: documents over about 0.7 similar become candidates
+NEAR_DUPLICATE_MAX_DOCUMENTS = 5000  # Least recently used signatures are forgotten above this
+# Minimum estimated Jaccard similarity of the shingle sets for reusing an earlier analysis.
+# When a fraction f of one document's shingles also occur in the other, the Jaccard
+# similarity is f / (2 - f), so 0.85 means about 92% of the text is unchanged. That is the
+# "about 95% similar" target, with some room for OCR and export noise.
+NEAR_DUPLICATE_THRESHOLD = 0.85
+
+# Library of saved documents, analyses, transcripts and quizzes (SQLite full-text search)
+LIBRARY_DB_PATH = os.environ.get("EDUGENIUS_LIBRARY_DB", os.path.join(tempfile.gettempdir(), "edugenius_library.db"))
+LIBRARY_DEFAULT_COURSE = "General"
+LIBRARY_SEARCH_LIMIT = 8  # Results shown per search
+LIBRARY_SNIPPET_WORDS = 24  # Words of context around the matches in each result
+LIBRARY_MAX_DOCUMENT_CHARS = 5_000_000  # Longer document text is truncated before it is stored
+
+# Temporary files
+TEMP_FILE_DIR = os.environ.get("EDUGENIUS_TEMP_DIR", os.path.join(tempfile.gettempdir(), "edugenius_tmp"))
+TEMP_FILE_MAX_AGE_HOURS = 12  # Unused stored uploads older than this are deleted
+TEMP_DIR_QUOTA_MB = 1024  # Oldest temporary files are deleted above this
+TEMP_ORPHAN_GRACE_SECONDS = 300  # Temporary files older than this were left behind by a crash
+TEMP_JANITOR_INTERVAL_SECONDS = 600
+
+# Shared content-addressed upload store
+UPLOAD_STORE_DIR = os.environ.get("EDUGENIUS_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "edugenius_uploads"))
+UPLOAD_STORE_QUOTA_MB = 2048  # Unreferenced files are evicted (least recently used first) above this
+
+# Learning Assistant answer cache settings
+ANSWER_CACHE_MAX_ENTRIES = 2000
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.9  # Minimum n-gram similarity for a cache hit
+ANSWER_CACHE_NGRAM_SIZE = 3
+
+# Chat history windowing settings
+HISTORY_TOKEN_BUDGET = 3000  # Verbatim history tokens before older turns are summarized
+HISTORY_KEEP_RECENT_TURNS = 6  # Most recent messages always kept verbatim
+HISTORY_RELEVANT_TURNS = 4  # Older messages selected by relevance to the current question
+
+# Developer settings
+# Set EDUGENIUS_PROMPT_PROFILING=1 to record token counts per prompt section
+PROMPT_PROFILING_ENABLED = os.environ.get("EDUGENIUS_PROMPT_PROFILING") == "1"
+
+# Set EDUGENIUS_STORAGE_METRICS=1 to show temporary storage metrics in the sidebar
+STORAGE_METRICS_ENABLED = os.environ.get("EDUGENIUS_STORAGE_METRICS") == "1"
@@ -4,12 +4,20 @@ Handles different audio file types including MP3, WAV, and others.
 """
 
 import os
+import hashlib
 import streamlit as st
 from utils.file_utils import get_file_mime_type
+from utils.extraction_cache import cached_extraction
+from services.text_analysis_service import key_concepts
 
+# Bump when process_audio_file's output changes
+AUDIO_EXTRACTOR_VERSION = 1
+
+@cached_extraction("audio", AUDIO_EXTRACTOR_VERSION)
 def process_audio_file(file_path, file_name=None):
     """
     Process an audio file and extract basic information.
+    Results are cached on disk by content hash.
     In a production app, this would use a library like librosa or pydub.
     
     Args:
@@ -66,27 +74,21 @@ def transcribe_audio(file_path):
     }
 
 
-def extract_audio_key_concepts(transcription):
+def extract_audio_key_concepts(transcription, count=5):
     """
     Extract key concepts from audio transcription.
-    In a production app, this would use NLP techniques.
+    Uses the same corpus TF-IDF ranking as documents, locally and without an API call.
     
     Args:
         transcription (str): Audio transcription text
+        count (int, optional): Number of concepts to extract. Defaults to 5.
         
     Returns:
         list: List of key concepts
     """
-    # In a production app, use NLP techniques
-    # For this example, return placeholder information
-    
-    return [
-        "Placeholder Key Concept 1",
-        "Placeholder Key Concept 2",
-        "Placeholder Key Concept 3",
-        "Placeholder Key Concept 4",
-        "Placeholder Key Concept 5"
-    ]
+    # The transcription's hash keeps repeated analyses from skewing the corpus
+    document_id = hashlib.sha256((transcription or "").encode("utf-8")).hexdigest()
+    return key_concepts(transcription, count, document_id)
 
 
 def summarize_audio_content(transcription):
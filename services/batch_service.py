@@ -0,0 +1,126 @@
+"""
+Batch processing of multiple uploaded files.
+Extraction, metadata and previews run in a process pool; each file's Gemini
+request starts as soon as that file is prepared, and results are yielded as
+they finish so pages can render them progressively.
+"""
+
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+import streamlit as st
+from config.settings import BATCH_PROCESS_WORKERS, BATCH_GEMINI_CONCURRENCY
+from services.document_service import process_document
+from services.image_service import process_image_file
+from services.audio_service import process_audio_file
+from utils.file_utils import get_file_preview
+
+# Gemini calls are network-bound, so threads are enough
+_gemini_executor = ThreadPoolExecutor(max_workers=BATCH_GEMINI_CONCURRENCY, thread_name_prefix="gemini-batch")
+
+
+@st.cache_resource
+def get_process_pool():
+    """
+    Get the process pool shared by all sessions of this server process.
+
+    Workers are spawned rather than forked: the server process already runs
+    threads (Tornado, the summary executor, the janitor), and a forked child
+    can deadlock on a lock one of them held at fork time.
+
+    Returns:
+        ProcessPoolExecutor: Pool for CPU-bound file preparation
+    """
+    return ProcessPoolExecutor(max_workers=BATCH_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def prepare_document(file_path, file_name):
+    """
+    Extract a document's metadata and text preview (runs in a worker process).
+
+    Args:
+        file_path (str): Path to the document
+        file_name (str): Original filename
+
+    Returns:
+        dict: {"info": document metadata, "preview": text preview}
+    """
+    return {
+        "info": process_document(file_path, file_name),
+        "preview": get_file_preview(file_path, max_length=1000)
+    }
+
+
+def prepare_image(file_path, file_name):
+    """
+    Read an image's metadata (runs in a worker process).
+
+    Args:
+        file_path (str): Path to the image
+        file_name (str): Original filename
+
+    Returns:
+        dict: {"info": image metadata}
+    """
+    return {"info": process_image_file(file_path, file_name)}
+
+
+def prepare_audio(file_path, file_name):
+    """
+    Read an audio file's metadata (runs in a worker process).
+
+    Args:
+        file_path (str): Path to the audio file
+        file_name (str): Original filename
+
+    Returns:
+        dict: {"info": audio metadata}
+    """
+    return {"info": process_audio_file(file_path, file_name)}
+
+
+def run_batch(files, prepare, generate):
+    """
+    Prepare files in parallel and run a Gemini request for each one.
+
+    Args:
+        files (list): (file_path, file_name) pairs
+        prepare (callable): Module-level function (file_path, file_name) -> dict,
+            run in the process pool
+        generate (callable): Function (file_path, file_name, prepared) -> str,
+            run on a thread as soon as the file is prepared. It must not call
+            Streamlit; failures are returned as text starting with
+            ERROR_RESPONSE_PREFIX for the caller to show.
+
+    Yields:
+        tuple: (index into files, prepared dict or None, response text), in completion order
+    """
+    pool = get_process_pool()
+    pending = {}
+    for index, (file_path, file_name) in enumerate(files):
+        pending[pool.submit(prepare, file_path, file_name)] = ("prepare", index, None)
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage, index, prepared = pending.pop(future)
+            file_path, file_name = files[index]
+
+            if stage == "prepare":
+                try:
+                    prepared = future.result()
+                except Exception as e:
+                    yield index, None, f"I apologize, but I encountered an error processing '{file_name}': {str(e)}"
+                    continue
+
+                # Keep the page's context (such as the profiling page) on the worker thread
+                context = contextvars.copy_context()
+                request = _gemini_executor.submit(context.run, generate, file_path, file_name, prepared)
+                pending[request] = ("generate", index, prepared)
+                continue
+
+            try:
+                response_text = future.result()
+            except Exception as e:
+                response_text = f"I apologize, but I encountered an error: {str(e)}"
+            yield index, prepared, response_text
@@ -0,0 +1,305 @@
+"""
+Compact BM25 index over the chunks of a document, for question answering.
+Postings are stored in flat typed arrays rather than per-posting objects, and
+indexes are persisted on disk by document content hash so each document is
+indexed only once.
+"""
+
+import os
+import sys
+import json
+import heapq
+import math
+import struct
+import tempfile
+import functools
+from array import array
+import streamlit as st
+from config.settings import (
+    DOCUMENT_INDEX_DIR,
+    DOCUMENT_INDEX_CACHE_SIZE,
+    INDEX_CHUNK_CACHE_SIZE,
+    INDEX_CHUNK_TOKENS,
+    INDEX_CHUNK_OVERLAP_TOKENS
+)
+from services.document_service import iter_document_blocks
+from utils.file_utils import file_sha256
+from utils.text_chunker import chunk_blocks
+from utils.text_utils import tokenize, BM25_K1, BM25_B
+
+# Bumped whenever the on-disk layout or the chunking changes
+INDEX_FORMAT_VERSION = 2
+
+
+@functools.lru_cache(maxsize=INDEX_CHUNK_CACHE_SIZE)
+def _chunk_term_counts(text):
+    """
+    Tokenize a chunk into its distinct terms and their counts.
+    Cached by chunk text, so the unchanged chunks of a revised document are
+    not tokenized again. Terms are kept as one joined string and counts as a
+    typed array to keep cached entries small.
+
+    Args:
+        text (str): Chunk text
+
+    Returns:
+        tuple: (terms joined by NUL, array of counts, token count)
+    """
+    tokens = tokenize(text, remove_stop_words=True)
+    counts = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    return "\0".join(counts), array("H", (min(count, 0xFFFF) for count in counts.values())), len(tokens)
+
+
+class DocumentIndex:
+    """
+    Immutable BM25 index over a document's chunks.
+
+    Postings for all terms live in two flat arrays (chunk ids and term
+    frequencies), sliced per term through an offsets array, so a 500-page
+    textbook costs a few bytes per posting.
+
+    Example:
+        index = DocumentIndex.from_chunks(chunk_blocks(blocks))
+        for chunk_id, score in index.search("what is osmosis", 5):
+            print(index.chunks[chunk_id])
+    """
+
+    def __init__(self, terms, offsets, doc_ids, term_freqs, doc_lengths, chunks, sections,
+                 k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        # term -> term id; postings for term id t are doc_ids[offsets[t]:offsets[t + 1]]
+        self.term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.chunks = chunks
+        self.sections = sections
+        self.average_length = (sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0) or 1.0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Build an index from text chunks.
+
+        Args:
+            chunks (iterable): TextChunk objects, in document order
+
+        Returns:
+            DocumentIndex: The new index
+        """
+        # Per-term growable arrays while building; packed into flat arrays at the end
+        building = {}
+        doc_lengths = array("I")
+        texts = []
+        sections = []
+        for chunk in chunks:
+            doc_id = len(texts)
+            terms, counts, length = _chunk_term_counts(chunk.text)
+            for token, count in zip(terms.split("\0") if terms else (), counts):
+                postings = building.get(token)
+                if postings is None:
+                    postings = building[token] = (array("I"), array("H"))
+                postings[0].append(doc_id)
+                postings[1].append(count)
+            doc_lengths.append(length)
+            texts.append(chunk.text)
+            sections.append(chunk.section)
+
+        terms = sorted(building)
+        offsets = array("Q", [0])
+        doc_ids = array("I")
+        term_freqs = array("H")
+        for term in terms:
+            term_docs, term_counts = building.pop(term)
+            doc_ids.extend(term_docs)
+            term_freqs.extend(term_counts)
+            offsets.append(len(doc_ids))
+        return cls(terms, offsets, doc_ids, term_freqs, doc_lengths, texts, sections)
+
+    def search(self, query, k=5):
+        """
+        Find the chunks that best match a query.
+
+        Args:
+            query (str): Question or search text
+            k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            list: (chunk id, score) pairs with a positive score, best first
+        """
+        doc_count = len(self.doc_lengths)
+        if doc_count == 0:
+            return []
+
+        scores = {}
+        for term in set(tokenize(query, remove_stop_words=True)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            # Robertson-Sparck Jones IDF, floored at zero for very common terms
+            df = stop - start
+            idf = max(0.0, math.log((doc_count - df + 0.5) / (df + 0.5) + 1.0))
+            if idf == 0.0:
+                continue
+            k1 = self.k1
+            length_weight = self.b / self.average_length
+            for doc_id, tf in zip(self.doc_ids[start:stop], self.term_freqs[start:stop]):
+                norm = k1 * (1.0 - self.b + length_weight * self.doc_lengths[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(doc_id, score) for doc_id, score in best if score > 0]
+
+    def save(self, path):
+        """
+        Write the index to a file atomically.
+
+        The file holds a length-prefixed JSON header (vocabulary, chunk text
+        and array sizes) followed by the raw posting arrays.
+
+        Args:
+            path (str): Destination file
+        """
+        terms = [None] * len(self.term_ids)
+        for term, term_id in self.term_ids.items():
+            terms[term_id] = term
+        arrays = (self.offsets, self.doc_ids, self.term_freqs, self.doc_lengths)
+        header = json.dumps({
+            "version": INDEX_FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "k1": self.k1,
+            "b": self.b,
+            "terms": terms,
+            "chunks": self.chunks,
+            "sections": self.sections,
+            "arrays": [[values.typecode, len(values)] for values in arrays]
+        }).encode("utf-8")
+
+        directory = os.path.dirname(path) or "."
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(struct.pack("<Q", len(header)))
+                f.write(header)
+                for values in arrays:
+                    values.tofile(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index written by save().
+
+        Args:
+            path (str): Index file
+
+        Returns:
+            DocumentIndex: The index, or None if the file is from another format version
+        """
+        with open(path, "rb") as f:
+            (header_length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+            if header.get("version") != INDEX_FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+                return None
+            arrays = []
+            for typecode, length in header["arrays"]:
+                values = array(typecode)
+                values.fromfile(f, length)
+                arrays.append(values)
+        offsets, doc_ids, term_freqs, doc_lengths = arrays
+        return cls(header["terms"], offsets, doc_ids, term_freqs, doc_lengths,
+                   header["chunks"], header["sections"], header["k1"], header["b"])
+
+
+def build_document_index(file_path, sha256=None):
+    """
+    Chunk a document and index its chunks.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
+
+    Returns:
+        DocumentIndex: Index over the document's chunks
+    """
+    chunks = chunk_blocks(
+        iter_document_blocks(file_path, sha256),
+        max_tokens=INDEX_CHUNK_TOKENS,
+        overlap_tokens=INDEX_CHUNK_OVERLAP_TOKENS
+    )
+    return DocumentIndex.from_chunks(chunks)
+
+
+@st.cache_resource(max_entries=DOCUMENT_INDEX_CACHE_SIZE, show_spinner=False)
+def _get_document_index(sha256, _file_path):
+    """Load a persisted index for a document hash, or build and persist it."""
+    path = os.path.join(DOCUMENT_INDEX_DIR, f"{sha256}.v{INDEX_FORMAT_VERSION}.idx")
+    if os.path.exists(path):
+        try:
+            index = DocumentIndex.load(path)
+            if index is not None:
+                # Mark as recently used; the janitor evicts the oldest indexes first
+                os.utime(path)
+                return index
+        except (OSError, ValueError, KeyError, EOFError, struct.error):
+            # A damaged file is rebuilt below
+            pass
+
+    index = build_document_index(_file_path, sha256)
+    try:
+        os.makedirs(DOCUMENT_INDEX_DIR, exist_ok=True)
+        index.save(path)
+    except OSError:
+        # Persisting is an optimization; the in-memory index still works
+        pass
+    return index
+
+
+def get_document_index(file_path, sha256=None):
+    """
+    Get the index for a document, reusing it across sessions and restarts.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
+
+    Returns:
+        DocumentIndex: Index over the document's chunks
+    """
+    if sha256 is None:
+        sha256 = file_sha256(file_path)
+    return _get_document_index(sha256, file_path)
+
+
+def retrieve_document_chunks(documents, question, k):
+    """
+    Retrieve the chunks most relevant to a question across several documents.
+
+    Args:
+        documents (list): (file path, document name) pairs
+        question (str): The question to answer
+        k (int): Number of chunks to return in total
+
+    Returns:
+        list: (document name, section, chunk text) tuples, best first
+    """
+    candidates = []
+    for file_path, document_name in documents:
+        index = get_document_index(file_path)
+        for chunk_id, score in index.search(question, k):
+            candidates.append((score, document_name, index.sections[chunk_id], index.chunks[chunk_id]))
+
+    best = heapq.nlargest(k, candidates, key=lambda item: item[0])
+    return [(document_name, section, text) for _, document_name, section, text in best]
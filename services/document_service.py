@@ -4,17 +4,70 @@ Handles different document types including PDF, DOCX, and TXT files.
 """
 
 import os
+import zlib
+import hashlib
+import threading
+import functools
+import contextvars
+import itertools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 import streamlit as st
 from pathlib import Path
-from utils.file_utils import get_file_mime_type, get_file_preview
+from config.settings import (
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_PAGES_PER_TASK,
+    PDF_MAX_PENDING_TASKS,
+    PDF_PAGE_CACHE_MAX_CHARS,
+    CHUNK_MAX_TOKENS,
+    CHUNK_SUMMARY_WORDS,
+    SUMMARY_CONCURRENCY,
+    SUMMARY_REDUCE_FAN_IN,
+    EXTRACTION_CACHE_MAX_TEXT_CHARS,
+    UPLOAD_CHUNK_SIZE
+)
+from services.gemini_service import generate_background_text, ERROR_RESPONSE_PREFIX
+from services.text_analysis_service import extractive_summary, key_concepts, readability_metrics
+from utils.file_utils import get_file_mime_type, get_file_preview, file_sha256
+from utils.document_readers import (
+    pdf_support_available,
+    open_pdf,
+    get_pdf_page_count,
+    iter_pdf_pages,
+    iter_docx_blocks,
+    TextFileReader
+)
+from utils.text_utils import tokenize
+from utils.extraction_cache import cached_extraction, get_extraction_cache
+from utils.text_chunker import chunk_blocks, chunk_digest
+from utils.prompt_templates import get_template
+from utils.prompt_utils import create_chunk_summary_prompt, create_summary_reduce_prompt
 
-def process_document(file_path, file_name=None):
+# Bump when process_document's output or the extracted text blocks change
+DOCUMENT_EXTRACTOR_VERSION = 4
+
+# Bump when cached chunk and reduce summaries should be discarded
+SUMMARY_CACHE_VERSION = 1
+
+# Extracted PDF page text by (content hash, page index), in LRU order
+_pdf_page_cache = OrderedDict()
+_pdf_page_cache_chars = 0
+_pdf_page_cache_lock = threading.Lock()
+
+# Chunk summaries and reduce steps are network-bound, so threads are enough
+_summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY, thread_name_prefix="summary")
+
+@cached_extraction("document", DOCUMENT_EXTRACTOR_VERSION)
+def process_document(file_path, file_name=None, sha256=None):
     """
     Process a document file and extract relevant information.
+    Results are cached on disk by content hash.
     
     Args:
         file_path (str): Path to the document file
         file_name (str, optional): Original filename. Defaults to None.
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
         
     Returns:
         dict: Document information and metadata
@@ -37,18 +90,59 @@ def process_document(file_path, file_name=None):
     if file_extension == '.txt':
         document_info.update(process_text_file(file_path))
     elif file_extension == '.pdf':
-        document_info.update(process_pdf_file(file_path))
-    elif file_extension in ['.docx', '.doc']:
-        document_info.update(process_word_file(file_path))
+        document_info.update(summarize_pdf_file(file_path, sha256))
+    elif file_extension == '.docx':
+        document_info.update(summarize_word_file(file_path))
     else:
         document_info["processing_note"] = "File type not supported for detailed analysis."
     
     return document_info
 
 
+def _scan_text_file(file_path):
+    """
+    Count a text file's characters, lines and words in one streaming pass.
+    
+    Args:
+        file_path (str): Path to the text file
+        
+    Returns:
+        dict: Encoding, counts and the first 500 characters
+    """
+    reader = TextFileReader(file_path, block_size=UPLOAD_CHUNK_SIZE)
+    char_count = 0
+    newline_count = 0
+    word_count = 0
+    sample = ""
+    # Whether the previous block ended inside a word
+    in_word = False
+    
+    for text in reader:
+        char_count += len(text)
+        newline_count += text.count('\n')
+        words = len(text.split())
+        # A word split across blocks is counted in both
+        if in_word and not text[0].isspace():
+            words -= 1
+        word_count += words
+        in_word = not text[-1].isspace()
+        if len(sample) < 501:
+            sample += text[:501 - len(sample)]
+    
+    return {
+        "encoding": reader.encoding,
+        "char_count": char_count,
+        "line_count": newline_count + 1,
+        "word_count": word_count,
+        "sample_content": sample[:500] + ("..." if len(sample) > 500 else "")
+    }
+
+
 def process_text_file(file_path):
     """
     Process a text file and extract basic information.
+    The file is read once, in fixed-size blocks, so memory use does not grow
+    with its size. See TextFileReader for how the encoding is detected.
     
     Args:
         file_path (str): Path to the text file
@@ -57,20 +151,9 @@ def process_text_file(file_path):
         dict: Text file information
     """
     try:
-        with open(file_path, 'r', errors='replace') as f:
-            content = f.read()
-            
-        # Get basic metrics
-        total_chars = len(content)
-        total_lines = content.count('\n') + 1
-        total_words = len(content.split())
-        
         return {
             "content_type": "plain text",
-            "char_count": total_chars,
-            "line_count": total_lines,
-            "word_count": total_words,
-            "sample_content": content[:500] + ("..." if len(content) > 500 else "")
+            **_scan_text_file(file_path)
         }
     
     except Exception as e:
@@ -81,31 +164,198 @@ def process_text_file(file_path):
         }
 
 
-def process_pdf_file(file_path):
+def _get_cached_page(sha256, page):
+    """Get cached page text, or None."""
+    with _pdf_page_cache_lock:
+        text = _pdf_page_cache.get((sha256, page))
+        if text is not None:
+            _pdf_page_cache.move_to_end((sha256, page))
+        return text
+
+
+def _cache_page(sha256, page, text):
+    """Cache page text, evicting the least recently used pages over the size cap."""
+    global _pdf_page_cache_chars
+    with _pdf_page_cache_lock:
+        if (sha256, page) in _pdf_page_cache:
+            return
+        _pdf_page_cache[(sha256, page)] = text
+        _pdf_page_cache_chars += len(text)
+        while _pdf_page_cache_chars > PDF_PAGE_CACHE_MAX_CHARS and _pdf_page_cache:
+            _, evicted = _pdf_page_cache.popitem(last=False)
+            _pdf_page_cache_chars -= len(evicted)
+
+
+def extract_pdf_page_range(file_path, start, stop):
+    """
+    Extract the text of a range of PDF pages (runs in a worker process).
+    
+    Args:
+        file_path (str): Path to the PDF file
+        start (int): First page index
+        stop (int): Page index to stop before
+        
+    Returns:
+        list: Text of each page in the range
+    """
+    return [text for _, text in iter_pdf_pages(file_path, start, stop)]
+
+
+def process_pdf_file(file_path, sha256=None):
+    """
+    Extract a PDF's text page by page.
+    Large PDFs are split into page ranges extracted in parallel by the process
+    pool and merged back in page order. Only a bounded number of ranges are in
+    flight at once, and pages are cached by (content hash, page).
+    
+    Args:
+        file_path (str): Path to the PDF file
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
+        
+    Yields:
+        tuple: (page index, page text), in page order
+    
+    Raises:
+        ImportError: If PyPDF2 is not installed
+    """
+    if sha256 is None:
+        sha256 = file_sha256(file_path)
+    page_count = get_pdf_page_count(file_path)
+    
+    # Worker processes cannot start pools of their own, so they extract sequentially
+    in_worker = multiprocessing.parent_process() is not None
+    if page_count < PDF_PARALLEL_MIN_PAGES or in_worker:
+        reader = None
+        for page in range(page_count):
+            text = _get_cached_page(sha256, page)
+            if text is None:
+                # Open the file only once a page is missing from the cache
+                if reader is None:
+                    reader = open_pdf(file_path)
+                text = reader.pages[page].extract_text() or ""
+                _cache_page(sha256, page, text)
+            yield page, text
+        return
+    
+    # Imported here because the batch service depends on this module
+    from services.batch_service import get_process_pool
+    pool = get_process_pool()
+    
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    pending = {}
+    next_range = 0
+    
+    def submit_ahead():
+        # Keep a bounded window of ranges ahead of the merge point
+        nonlocal next_range
+        while next_range < len(ranges) and len(pending) < PDF_MAX_PENDING_TASKS:
+            start, stop = ranges[next_range]
+            if all(_get_cached_page(sha256, page) is not None for page in range(start, stop)):
+                pending[next_range] = None
+            else:
+                pending[next_range] = pool.submit(extract_pdf_page_range, file_path, start, stop)
+            next_range += 1
+    
+    try:
+        for index, (start, stop) in enumerate(ranges):
+            submit_ahead()
+            future = pending.pop(index)
+            if future is None:
+                texts = [_get_cached_page(sha256, page) for page in range(start, stop)]
+            else:
+                texts = future.result()
+                for page, text in zip(range(start, stop), texts):
+                    _cache_page(sha256, page, text)
+            
+            for page, text in zip(range(start, stop), texts):
+                # Pages evicted between the check and the read are extracted again
+                if text is None:
+                    text = extract_pdf_page_range(file_path, page, page + 1)[0]
+                yield page, text
+    finally:
+        # Stop work nobody will read, for example when the caller only wanted a preview
+        for future in pending.values():
+            if future is not None:
+                future.cancel()
+
+
+def summarize_pdf_file(file_path, sha256=None):
     """
-    Process a PDF file and extract basic information.
-    In a production app, this would use a PDF library like PyPDF2.
+    Collect basic information about a PDF while streaming its pages.
     
     Args:
         file_path (str): Path to the PDF file
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
         
     Returns:
         dict: PDF file information
     """
-    # In a production app, implement PDF processing using PyPDF2 or similar
-    # For this example, return placeholder information
+    if not pdf_support_available():
+        # Reported as an error so the result is not cached once PyPDF2 is installed
+        return {
+            "content_type": "PDF document",
+            "processing_error": "PyPDF2 is not installed",
+            "processing_note": "PDF text extraction requires PyPDF2."
+        }
     
-    return {
-        "content_type": "PDF document",
-        "processing_note": "Full PDF processing would be implemented in production.",
-        "sample_content": "[PDF content would be extracted here in production app]"
-    }
+    try:
+        page_count = 0
+        char_count = 0
+        word_count = 0
+        sample = []
+        sample_length = 0
+        
+        for _, text in process_pdf_file(file_path, sha256):
+            page_count += 1
+            char_count += len(text)
+            word_count += len(tokenize(text))
+            if sample_length < 500 and text.strip():
+                sample.append(text.strip())
+                sample_length += len(text)
+        
+        sample_content = "\n\n".join(sample)
+        return {
+            "content_type": "PDF document",
+            "page_count": page_count,
+            "char_count": char_count,
+            "word_count": word_count,
+            "sample_content": sample_content[:500] + ("..." if len(sample_content) > 500 else "")
+        }
+    
+    except Exception as e:
+        return {
+            "content_type": "PDF document",
+            "processing_error": str(e),
+            "processing_note": "Error occurred while processing PDF file."
+        }
 
 
-def process_word_file(file_path):
+def process_word_file(file_path, max_chars=None):
     """
-    Process a Word file and extract basic information.
-    In a production app, this would use python-docx or similar.
+    Extract a Word document's content block by block.
+    word/document.xml is parsed as a stream, so memory stays bounded and
+    embedded images and other parts are never read.
+    
+    Args:
+        file_path (str): Path to the Word file
+        max_chars (int, optional): Stop once this many characters have been
+            yielded, for previews. Defaults to None (read everything).
+        
+    Yields:
+        tuple: (kind, text) where kind is "heading", "paragraph" or "table"
+    """
+    yielded_chars = 0
+    for kind, text in iter_docx_blocks(file_path):
+        yield kind, text
+        yielded_chars += len(text)
+        if max_chars is not None and yielded_chars >= max_chars:
+            return
+
+
+def summarize_word_file(file_path):
+    """
+    Collect basic information about a Word file while streaming its content.
     
     Args:
         file_path (str): Path to the Word file
@@ -113,71 +363,333 @@ def process_word_file(file_path):
     Returns:
         dict: Word file information
     """
-    # In a production app, implement Word processing using python-docx
-    # For this example, return placeholder information
+    try:
+        counts = {"heading": 0, "paragraph": 0, "table": 0}
+        char_count = 0
+        word_count = 0
+        headings = []
+        sample = []
+        sample_length = 0
+        
+        for kind, text in process_word_file(file_path):
+            counts[kind] += 1
+            char_count += len(text)
+            word_count += len(tokenize(text))
+            if kind == "heading" and len(headings) < 20:
+                headings.append(text)
+            if sample_length < 500:
+                sample.append(text)
+                sample_length += len(text)
+        
+        sample_content = "\n\n".join(sample)
+        return {
+            "content_type": "Word document",
+            "paragraph_count": counts["paragraph"],
+            "heading_count": counts["heading"],
+            "table_count": counts["table"],
+            "headings": headings,
+            "char_count": char_count,
+            "word_count": word_count,
+            "sample_content": sample_content[:500] + ("..." if len(sample_content) > 500 else "")
+        }
     
-    return {
-        "content_type": "Word document",
-        "processing_note": "Full Word document processing would be implemented in production.",
-        "sample_content": "[Word document content would be extracted here in production app]"
-    }
+    except Exception as e:
+        return {
+            "content_type": "Word document",
+            "processing_error": str(e),
+            "processing_note": "Error occurred while processing Word file."
+        }
 
 
-def extract_key_concepts(document_content, count=5):
+def extract_key_concepts(document_content, count=5, document_id=None):
     """
     Extract key concepts from document content.
-    This is a placeholder - in production, would use NLP techniques.
+    Candidate phrases are ranked by TF-IDF against the corpus of all
+    documents analyzed so far, locally and without an API call.
     
     Args:
-        document_content (str): Document content
+        document_content (str or iterable): Document text, or (kind, text)
+            blocks such as those from iter_document_blocks
         count (int, optional): Number of concepts to extract. Defaults to 5.
+        document_id (str, optional): Content hash of the document, so it is
+            counted in the corpus only once. Defaults to None.
         
     Returns:
         list: List of key concepts
     """
-    # This is a placeholder for actual NLP-based concept extraction
-    # In production, use techniques like TF-IDF, LDA, or named entity recognition
+    return key_concepts(document_content, count, document_id)
+
+
+def _extract_document_blocks(file_path, sha256):
+    """Stream a document's text blocks straight from the file."""
+    file_extension = Path(file_path).suffix.lower()
     
-    return ["Placeholder Concept 1", "Placeholder Concept 2", "Placeholder Concept 3"]
+    if file_extension == '.pdf':
+        for _, text in process_pdf_file(file_path, sha256):
+            yield "page", text
+    elif file_extension == '.docx':
+        yield from process_word_file(file_path)
+    elif file_extension == '.txt':
+        # Paragraphs end at blank lines, or once they are longer than one chunk
+        max_chars = CHUNK_MAX_TOKENS * 4
+        lines = []
+        length = 0
+        # Decoded the same way as the text statistics
+        for line in TextFileReader(file_path, block_size=UPLOAD_CHUNK_SIZE).lines():
+            if line.strip():
+                lines.append(line.rstrip())
+                length += len(line) + 1
+                if length < max_chars:
+                    continue
+            if lines:
+                yield "paragraph", "\n".join(lines)
+                lines, length = [], 0
+        if lines:
+            yield "paragraph", "\n".join(lines)
 
 
-def generate_summary(document_content, max_length=200):
+def iter_document_blocks(file_path, sha256=None):
     """
-    Generate a summary of document content.
-    This is a placeholder - in production, would use summarization algorithms.
+    Stream a document's text as blocks, whatever its type.
+    A document read to the end is cached on disk by content hash, so later
+    reads (summaries, key concepts, indexing) skip extraction entirely.
     
     Args:
-        document_content (str): Document content
-        max_length (int, optional): Maximum summary length. Defaults to 200.
+        file_path (str): Path to the document file
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
+        
+    Yields:
+        tuple: (kind, text) where kind is "heading", "paragraph", "table" or "page"
+    """
+    if sha256 is None:
+        sha256 = file_sha256(file_path)
+    cache = get_extraction_cache()
+    
+    cached_blocks = cache.get("document_text", sha256, DOCUMENT_EXTRACTOR_VERSION)
+    if cached_blocks is not None:
+        for kind, text in cached_blocks:
+            yield kind, text
+        return
+    
+    # Collect blocks for the cache unless the document is too long to keep
+    blocks = []
+    length = 0
+    for kind, text in _extract_document_blocks(file_path, sha256):
+        if blocks is not None:
+            blocks.append((kind, text))
+            length += len(text)
+            if length > EXTRACTION_CACHE_MAX_TEXT_CHARS:
+                blocks = None
+        yield kind, text
+    
+    # Only reached when the caller consumed every block
+    if blocks is not None:
+        cache.put("document_text", sha256, DOCUMENT_EXTRACTOR_VERSION, blocks)
+
+
+def _summary_cache_key(template_name, max_words, content_digest):
+    """
+    Key a cached summary by what shapes it: the template revision, the length
+    limit and the summarized content. Document names and chunk positions are
+    left out, so unchanged chunks of a revised document hit the cache.
+    """
+    key = f"{get_template(template_name).cache_key}\0{max_words}\0{content_digest}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _generate_cached_summary(build_prompt, max_words, cache_key):
+    """Generate a summary and cache it if generation succeeded."""
+    summary = generate_background_text(build_prompt(), max_output_tokens=max_words * 2 + 100)
+    if summary:
+        get_extraction_cache().put("summary", cache_key, SUMMARY_CACHE_VERSION, summary)
+    return summary
+
+
+def _submit_summary(build_prompt, max_words, cache_key):
+    """
+    Get a summary from the cache, or queue a request for it.
+    
+    Args:
+        build_prompt (callable): Builds the prompt; only called on a cache miss
+        max_words (int): Summary length limit
+        cache_key (str): Key from _summary_cache_key
         
     Returns:
-        str: Document summary
+        Future: Resolves to the summary, or None if generation failed
     """
-    # This is a placeholder for actual summarization
-    # In production, use extractive or abstractive summarization techniques
+    cached = get_extraction_cache().get("summary", cache_key, SUMMARY_CACHE_VERSION)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
     
-    return "This is a placeholder summary. In a production app, this would use actual summarization techniques to create a meaningful summary of the document content."
+    # Keep the caller's profiling context in the worker thread
+    context = contextvars.copy_context()
+    return _summary_executor.submit(context.run, _generate_cached_summary, build_prompt, max_words, cache_key)
+
+
+def _group_summaries(summaries):
+    """
+    Split summaries into groups for one reduce level.
+    Like chunk boundaries, group boundaries depend on the summaries'
+    content rather than their positions, so an inserted or removed chunk
+    only changes the group it falls in and the other reduce results stay cached.
+    
+    Args:
+        summaries (list): Summaries in document order
+        
+    Returns:
+        list: Groups of between half and all of SUMMARY_REDUCE_FAN_IN
+              summaries (the last group may be smaller)
+    """
+    min_size = max(2, SUMMARY_REDUCE_FAN_IN // 2)
+    groups = []
+    group = []
+    for summary in summaries:
+        group.append(summary)
+        if len(group) >= SUMMARY_REDUCE_FAN_IN or (
+            len(group) >= min_size and zlib.crc32(summary.encode("utf-8")) % min_size == 0
+        ):
+            groups.append(group)
+            group = []
+    if group:
+        groups.append(group)
+    return groups
+
+
+def generate_summary(document_content, max_length=200, document_name="document", use_api=True):
+    """
+    Generate a summary of document content with map-reduce summarization.
+    The content is split into overlapping, token-sized chunks that are
+    summarized concurrently (map); the chunk summaries are then combined in
+    groups, level by level, until one summary remains (reduce). Every request
+    stays within one chunk's size however long the document is.
+    
+    Chunk boundaries are content-defined and chunk and reduce summaries are
+    cached by content, so for a revised document only the chunks around the
+    edits (and the reduce steps above them) are sent to Gemini again.
+    
+    Without the API, or when its requests fail (for example once the quota
+    is exhausted), a local extractive TextRank summary is returned instead.
+    
+    Args:
+        document_content (str or iterable): Document text, or (kind, text)
+            blocks such as those from iter_document_blocks
+        max_length (int, optional): Maximum summary length in words. Defaults to 200.
+        document_name (str, optional): Name used in the prompts. Defaults to "document".
+        use_api (bool, optional): Summarize with Gemini; if False, return the
+            instant extractive summary. Defaults to True.
+        
+    Returns:
+        str: Document summary, or an apology text if none could be generated
+    """
+    if isinstance(document_content, str):
+        document_content = [("page", document_content)]
+    if not use_api:
+        return extractive_summary(document_content, max_length)
+    
+    # Blocks are kept as they stream past, for the local fallback
+    seen_blocks = []
+    
+    def recorded(blocks):
+        for block in blocks:
+            seen_blocks.append(block)
+            yield block
+    
+    def fallback():
+        return (extractive_summary(seen_blocks, max_length)
+                or f"{ERROR_RESPONSE_PREFIX}: the summary could not be generated.")
+    
+    chunks = chunk_blocks(recorded(document_content))
+    
+    first = next(chunks, None)
+    if first is None:
+        return ""
+    second = next(chunks, None)
+    if second is None:
+        # Short documents are summarized in one request
+        build_prompt = functools.partial(
+            create_chunk_summary_prompt, document_name, first.text, 1, first.section, max_length
+        )
+        cache_key = _summary_cache_key("chunk_summary", max_length, chunk_digest(first))
+        return _submit_summary(build_prompt, max_length, cache_key).result() or fallback()
+    
+    futures = []
+    in_flight = set()
+    try:
+        # Map: summarize chunks as they are extracted, with a bounded number in flight
+        for chunk in itertools.chain((first, second), chunks):
+            if len(in_flight) >= SUMMARY_CONCURRENCY * 2:
+                _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            build_prompt = functools.partial(
+                create_chunk_summary_prompt,
+                document_name, chunk.text, chunk.index + 1, chunk.section, CHUNK_SUMMARY_WORDS
+            )
+            cache_key = _summary_cache_key("chunk_summary", CHUNK_SUMMARY_WORDS, chunk_digest(chunk))
+            future = _submit_summary(build_prompt, CHUNK_SUMMARY_WORDS, cache_key)
+            futures.append(future)
+            in_flight.add(future)
+        
+        # Chunks whose summary failed are left out
+        summaries = [summary for summary in (future.result() for future in futures) if summary]
+        
+        # Reduce: combine groups of summaries concurrently until one is left
+        while len(summaries) > 1:
+            groups = _group_summaries(summaries)
+            max_words = max_length if len(groups) == 1 else CHUNK_SUMMARY_WORDS
+            futures = [
+                _submit_summary(
+                    functools.partial(create_summary_reduce_prompt, document_name, group, max_words),
+                    max_words,
+                    _summary_cache_key(
+                        "summary_reduce", max_words, hashlib.sha256("\0".join(group).encode("utf-8")).hexdigest()
+                    )
+                )
+                if len(group) > 1 else None
+                for group in groups
+            ]
+            summaries = [group[0] if future is None else future.result()
+                         for group, future in zip(groups, futures)]
+            if not all(summaries):
+                summaries = []
+    finally:
+        # Nothing is left running if extraction or a request fails
+        for future in futures:
+            if future is not None:
+                future.cancel()
+    
+    if not summaries:
+        return fallback()
+    return summaries[0]
 
 
 def assess_difficulty(document_content):
     """
-    Assess the difficulty level of document content.
-    This is a placeholder - in production, would use readability metrics.
+    Assess the difficulty level of document content with readability metrics.
+    Flesch-Kincaid, SMOG, Coleman-Liau and (approximate) Dale-Chall grades
+    are computed locally in one pass; their median gives the grade level.
     
     Args:
-        document_content (str): Document content
+        document_content (str or iterable): Document text, or (kind, text)
+            blocks such as those from iter_document_blocks
         
     Returns:
         dict: Difficulty assessment with metrics
     """
-    # This is a placeholder for actual difficulty assessment
-    # In production, use readability scores like Flesch-Kincaid, SMOG, etc.
+    metrics = readability_metrics(document_content)
+    if metrics is None:
+        return {
+            "difficulty_level": "Unknown",
+            "assessment_note": "The document contains no readable text."
+        }
     
+    grade = metrics["grade_level"]
     return {
-        "difficulty_level": "Intermediate",
-        "readability_score": 65,  # Example score
-        "grade_level": "10-12",
-        "assessment_note": "This is a placeholder assessment. In production, this would use actual readability metrics."
+        "difficulty_level": metrics["reading_level"],
+        "readability_score": metrics["flesch_reading_ease"],
+        "grade_level": f"{grade:.1f}",
+        "metrics": metrics,
+        "assessment_note": "Median of the Flesch-Kincaid, SMOG, Coleman-Liau and Dale-Chall grade estimates."
     }
 
 
@@ -203,3 +715,53 @@ def generate_study_questions(document_content, count=5):
         "How does this content relate to other topics in the field?",
         "What practical applications are discussed for these concepts?"
     ]
+
+
+def _analysis_cache_key(sha256, analysis_types):
+    """Key a saved analysis by the document's content and the requested analysis types."""
+    key = f"{sha256}\0{chr(31).join(sorted(analysis_types))}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _analysis_version():
+    """
+    Version saved analyses by the revisions of the prompt templates that
+    produce them and of the extracted text they are given, so changing any
+    of them stops stale analyses from being served.
+    """
+    revisions = [get_template(name).cache_key for name in ("document_analysis", "chunk_summary", "summary_reduce")]
+    revisions.append(str(DOCUMENT_EXTRACTOR_VERSION))
+    return hashlib.sha256("\0".join(revisions).encode("utf-8")).hexdigest()[:16]
+
+
+def save_document_analysis(sha256, analysis_types, document_name, response_text):
+    """
+    Save a finished analysis so a later upload of the same or a nearly
+    identical document can reuse it. Failed analyses are not saved.
+    
+    Args:
+        sha256 (str): Content hash of the analyzed document
+        analysis_types (list): Selected analysis types
+        document_name (str): Name of the analyzed document
+        response_text (str): The analysis
+    """
+    if not response_text or response_text.startswith(ERROR_RESPONSE_PREFIX):
+        return
+    get_extraction_cache().put(
+        "analysis", _analysis_cache_key(sha256, analysis_types), _analysis_version(),
+        {"document_name": document_name, "response": response_text}
+    )
+
+
+def load_document_analysis(sha256, analysis_types):
+    """
+    Load an analysis saved by save_document_analysis.
+    
+    Args:
+        sha256 (str): Content hash of the analyzed document
+        analysis_types (list): Selected analysis types
+        
+    Returns:
+        dict: document_name and response, or None if there is none
+    """
+    return get_extraction_cache().get("analysis", _analysis_cache_key(sha256, analysis_types), _analysis_version())
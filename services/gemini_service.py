@@ -3,9 +3,16 @@ Gemini API service for handling interactions with Google's Generative AI models.
 """
 
 import os
+import time
 import streamlit as st
 import google.generativeai as genai
-from google.genai import types
+from config.settings import INLINE_MEDIA_MAX_MB, GEMINI_FILE_TTL_SECONDS, GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS
+from utils.file_utils import file_sha256
+from utils.prompt_utils import create_history_summary_prompt, create_video_insights_prompt
+from utils.prompt_profiler import prompt_profiler
+
+# Prefix of the apology text returned in place of content when a call fails
+ERROR_RESPONSE_PREFIX = "I apologize, but I encountered an error"
 
 # Initialize the Gemini API client
 def initialize_genai():
@@ -16,7 +23,7 @@ def initialize_genai():
     return True
 
 # Generate content with text prompt
-def generate_text_content(prompt, temperature=0.7, model_name=None):
+def generate_text_content(prompt, temperature=0.7, model_name=None, show_errors=True):
     """
     Generate content from a text prompt.
     
@@ -24,6 +31,9 @@ def generate_text_content(prompt, temperature=0.7, model_name=None):
         prompt (str): The text prompt for generation
         temperature (float, optional): Temperature for generation. Defaults to 0.7.
         model_name (str, optional): Name of the model to use. Defaults to None.
+        show_errors (bool, optional): Show failures with st.error. Pass False
+            on worker threads, which cannot render; the caller shows the
+            returned error text instead. Defaults to True.
         
     Returns:
         str: Generated content
@@ -56,19 +66,94 @@ def generate_text_content(prompt, temperature=0.7, model_name=None):
         return response.text
         
     except Exception as e:
-        st.error(f"Error generating content: {str(e)}")
-        return f"I apologize, but I encountered an error: {str(e)}"
+        if show_errors:
+            st.error(f"Error generating content: {str(e)}")
+        return f"{ERROR_RESPONSE_PREFIX}: {str(e)}"
+
+# Upload large media once through the Files API, keyed by content hash
+@st.cache_resource(ttl=GEMINI_FILE_TTL_SECONDS, show_spinner=False)
+def upload_media_file(sha256, _file_path, mime_type):
+    """
+    Upload a media file with the Gemini Files API.
+    The file is streamed from disk; the upload handle is cached by content
+    hash so identical files are uploaded once per server process.
+    
+    Args:
+        sha256 (str): Content hash of the file, used as the cache key
+        _file_path (str): Path to the file (not part of the cache key)
+        mime_type (str): MIME type of the file
+        
+    Returns:
+        File: Uploaded file handle usable as a content part
+    
+    Raises:
+        ValueError: If Gemini fails to process the file
+        TimeoutError: If processing does not finish within GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS
+    """
+    initialize_genai()
+    uploaded = genai.upload_file(path=_file_path, mime_type=mime_type)
+    
+    # Video files must finish server-side processing before they can be used
+    deadline = time.monotonic() + GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS
+    while uploaded.state.name == "PROCESSING":
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                f"Gemini did not finish processing the uploaded {mime_type} file "
+                f"within {GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS} seconds"
+            )
+        time.sleep(2)
+        uploaded = genai.get_file(uploaded.name)
+    if uploaded.state.name == "FAILED":
+        raise ValueError(f"Gemini could not process the uploaded {mime_type} file")
+    
+    return uploaded
+
+
+def _media_part(media_data, media_type, sha256=None):
+    """
+    Build the content part for a piece of media.
+    
+    Args:
+        media_data: File path, memoryview or bytes of the media
+        media_type (str): MIME type of the media
+        sha256 (str, optional): Content hash of a media file path. Defaults to None.
+        
+    Returns:
+        tuple: (content part, size in bytes)
+    """
+    if isinstance(media_data, str):
+        size = os.path.getsize(media_data)
+        
+        # Large files go through the Files API straight from disk
+        if size > INLINE_MEDIA_MAX_MB * 1024 * 1024:
+            return upload_media_file(sha256 or file_sha256(media_data), media_data, media_type), size
+        
+        # Small files are read once; the request payload needs its own bytes either way
+        with open(media_data, "rb") as f:
+            return {"mime_type": media_type, "data": f.read()}, size
+    
+    # Views of in-memory uploads are copied once, when the request is built
+    # (the SDK's inline blobs only accept bytes)
+    if not isinstance(media_data, bytes):
+        media_data = bytes(media_data)
+    return {"mime_type": media_type, "data": media_data}, len(media_data)
+
 
 # Generate content with multimodal input (text + media)
-def generate_multimodal_content(prompt, media_data, media_type="image/jpeg", temperature=0.7):
+def generate_multimodal_content(prompt, media_data, media_type="image/jpeg", temperature=0.7, sha256=None,
+                                show_errors=True):
     """
     Generate content from a text prompt and media data.
     
     Args:
         prompt (str): The text prompt for generation
-        media_data (bytes): Binary data of the media file
+        media_data: Path to a stored media file, or a memoryview or bytes of its contents
         media_type (str, optional): MIME type of the media. Defaults to "image/jpeg".
         temperature (float, optional): Temperature for generation. Defaults to 0.7.
+        sha256 (str, optional): Content hash of a media file path, if already known.
+            Defaults to None.
+        show_errors (bool, optional): Show failures with st.error; pass False
+            on worker threads. Defaults to True.
         
     Returns:
         str: Generated content
@@ -96,14 +181,14 @@ def generate_multimodal_content(prompt, media_data, media_type="image/jpeg", tem
         )
         
         # Generate content with media
-        response = model.generate_content([
-            prompt,
-            {"mime_type": media_type, "data": media_data}
-        ])
+        media_part, media_size = _media_part(media_data, media_type, sha256)
+        prompt_profiler.record_media(media_type, media_size)
+        response = model.generate_content([prompt, media_part])
         return response.text
         
     except Exception as e:
-        st.error(f"Error generating content from {media_type}: {str(e)}")
+        if show_errors:
+            st.error(f"Error generating content from {media_type}: {str(e)}")
         return f"I apologize, but I encountered an error processing your media: {str(e)}"
 
 # Create a chat session
@@ -164,14 +249,15 @@ def send_chat_message(chat_session, message):
         return f"I apologize, but I encountered an error: {str(e)}"
 
 # Function to handle video analysis specifically
-def analyze_video(video_data, analysis_types, focus="General Analysis"):
+def analyze_video(video_data, analysis_types, focus="General Analysis", sha256=None):
     """
     Analyze video content.
     
     Args:
-        video_data (bytes): Binary data of the video file
+        video_data: Path to the stored video file, or its contents as bytes
         analysis_types (list): Types of analysis to perform
         focus (str, optional): Educational focus. Defaults to "General Analysis".
+        sha256 (str, optional): Content hash of the video file. Defaults to None.
         
     Returns:
         str: Analysis results
@@ -180,27 +266,62 @@ def analyze_video(video_data, analysis_types, focus="General Analysis"):
     initialize_genai()
     
     # Create prompt for video analysis
-    analysis_prompt = f"""
-    You are EduGenius, an AI video learning assistant.
-    
-    Please analyze this educational video and provide insights on the following aspects:
-    {', '.join(analysis_types)}
-    
-    Focus on {focus} educational aspects.
-    
-    Provide a detailed analysis organized with markdown headings, including:
-    1. Content summary
-    2. Key educational moments with timestamps
-    3. Educational value assessment
-    4. Suggested learning activities
-    
-    Format your response in clear, organized markdown.
-    """
+    analysis_prompt = create_video_insights_prompt(analysis_types, focus)
     
     # Use multimodal content generation for video
     return generate_multimodal_content(
         prompt=analysis_prompt,
         media_data=video_data,
         media_type="video/mp4",
-        temperature=0.2  # Lower temperature for more factual analysis
+        temperature=0.2,  # Lower temperature for more factual analysis
+        sha256=sha256
     )
+
+# Summarize older chat turns for rolling conversation memory
+def summarize_conversation(previous_summary, history_text):
+    """
+    Fold older chat turns into a running conversation summary.
+    This is the summarizer every ConversationBuffer uses. It runs on a
+    background thread, so failures are reported by returning None.
+    
+    Args:
+        previous_summary (str): Existing summary of earlier turns (may be empty)
+        history_text (str): Serialized chat turns to fold into the summary
+        
+    Returns:
+        str: Updated summary, or None if generation failed
+    """
+    prompt = create_history_summary_prompt(previous_summary, history_text)
+    return generate_background_text(prompt, temperature=0.2, max_output_tokens=512)
+
+# Generate text from worker threads, such as document chunk summaries
+def generate_background_text(prompt, temperature=0.2, max_output_tokens=1024):
+    """
+    Generate content from a text prompt without touching Streamlit.
+    Meant for worker threads, so failures are reported by returning None.
+    
+    Args:
+        prompt (str): The text prompt for generation
+        temperature (float, optional): Temperature for generation. Defaults to 0.2.
+        max_output_tokens (int, optional): Output length limit. Defaults to 1024.
+        
+    Returns:
+        str: Generated content, or None if generation failed
+    """
+    # Initialize API
+    initialize_genai()
+    
+    try:
+        model = genai.GenerativeModel(
+            model_name="gemini-2.0-flash",
+            generation_config={
+                "temperature": temperature,
+                "top_p": 0.95,
+                "top_k": 40,
+                "max_output_tokens": max_output_tokens,
+                "response_mime_type": "text/plain",
+            }
+        )
+        return model.generate_content(prompt).text.strip() or None
+    except Exception:
+        return None
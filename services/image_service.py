@@ -7,11 +7,17 @@ import os
 import io
 import streamlit as st
 from PIL import Image
-from utils.file_utils import get_file_mime_type
+from utils.file_utils import get_file_mime_type, get_upload_buffer
+from utils.extraction_cache import cached_extraction
 
+# Bump when process_image_file's output changes
+IMAGE_EXTRACTOR_VERSION = 1
+
+@cached_extraction("image", IMAGE_EXTRACTOR_VERSION)
 def process_image_file(file_path, file_name=None):
     """
     Process an image file and extract basic information.
+    Results are cached on disk by content hash.
     
     Args:
         file_path (str): Path to the image file
@@ -56,36 +62,37 @@ def process_image_file(file_path, file_name=None):
 def convert_image_for_api(image_file):
     """
     Convert an image file to the format needed for API requests.
+    Uploads and file paths are passed through without copying their bytes.
     
     Args:
         image_file: Image file (could be a file path or a file object)
         
     Returns:
-        tuple: (image_bytes, mime_type)
+        tuple: (image_data, mime_type); image_data is a file path, memoryview or bytes
+               accepted by generate_multimodal_content
     """
     try:
-        # Check if image_file is a string (file path)
+        # Check if image_file is a string (file path); the service layer maps it on demand
         if isinstance(image_file, str):
-            with open(image_file, 'rb') as f:
-                image_bytes = f.read()
+            image_data = image_file
             mime_type = get_file_mime_type(image_file)
         
         # Check if image_file is a file-like object (e.g., Streamlit UploadedFile)
         elif hasattr(image_file, 'getvalue'):
-            image_bytes = image_file.getvalue()
+            image_data = get_upload_buffer(image_file)
             mime_type = image_file.type if hasattr(image_file, 'type') else "image/jpeg"
         
         # Check if image_file is a PIL Image
         elif isinstance(image_file, Image.Image):
             img_byte_arr = io.BytesIO()
             image_file.save(img_byte_arr, format=image_file.format or 'JPEG')
-            image_bytes = img_byte_arr.getvalue()
+            image_data = img_byte_arr.getbuffer()
             mime_type = f"image/{(image_file.format or 'jpeg').lower()}"
         
         else:
             raise ValueError("Unsupported image file type")
         
-        return image_bytes, mime_type
+        return image_data, mime_type
         
     except Exception as e:
         raise ValueError(f"Error converting image for API: {str(e)}")
@@ -0,0 +1,285 @@
+"""
+Persistent library of study materials.
+Analyzed documents, their analyses, audio transcripts and quizzes are saved
+in a local SQLite database with an FTS5 full-text index, so a course's
+materials survive reloads and restarts and can be searched together instead
+of being uploaded and analyzed again.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import namedtuple
+import streamlit as st
+from config.settings import (
+    LIBRARY_DB_PATH,
+    LIBRARY_DEFAULT_COURSE,
+    LIBRARY_SEARCH_LIMIT,
+    LIBRARY_SNIPPET_WORDS,
+    LIBRARY_MAX_DOCUMENT_CHARS
+)
+from services.document_service import iter_document_blocks
+from services.gemini_service import ERROR_RESPONSE_PREFIX
+from utils.text_utils import tokenize
+
+# Kinds of library items and how they are labeled
+LIBRARY_KINDS = {
+    "document": "Document",
+    "analysis": "Document Analysis",
+    "transcript": "Audio Transcript",
+    "audio": "Audio Analysis",
+    "quiz": "Quiz"
+}
+
+# A search result; snippet marks the matching terms in bold
+LibraryHit = namedtuple("LibraryHit", ["id", "kind", "course", "title", "created_at", "snippet"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS library_items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    course TEXT NOT NULL,
+    title TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (kind, course, item_key)
+);
+CREATE INDEX IF NOT EXISTS library_items_course ON library_items (course, created_at);
+"""
+
+# External-content FTS5 table kept in sync with library_items by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS library_fts USING fts5(
+    title, content, content='library_items', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS library_items_insert AFTER INSERT ON library_items BEGIN
+    INSERT INTO library_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS library_items_delete AFTER DELETE ON library_items BEGIN
+    INSERT INTO library_fts (library_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS library_items_update AFTER UPDATE ON library_items BEGIN
+    INSERT INTO library_fts (library_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO library_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+
+class Library:
+    """
+    SQLite store of library items with full-text search.
+
+    Items are unique per kind, course and key (by default the hash of their
+    content), so saving the same material again only refreshes it. When the
+    SQLite build lacks FTS5, searches fall back to scanning with LIKE.
+
+    Example:
+        library = get_library()
+        library.add("quiz", "Quiz: Photosynthesis", quiz_text, course="Biology 101")
+        for hit in library.search("light reactions", course="Biology 101"):
+            print(hit.title, hit.snippet)
+    """
+
+    def __init__(self, path=LIBRARY_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # One connection shared by all sessions, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+            try:
+                self._connection.executescript(_FTS_SCHEMA)
+                self.full_text_search = True
+            except sqlite3.OperationalError:
+                self.full_text_search = False
+
+    def add(self, kind, title, content, course=LIBRARY_DEFAULT_COURSE, key=None):
+        """
+        Save an item, replacing an earlier item with the same kind, course and key.
+
+        Args:
+            kind (str): One of LIBRARY_KINDS
+            title (str): Title shown in search results
+            content (str): Searchable text
+            course (str, optional): Course the item belongs to. Defaults to LIBRARY_DEFAULT_COURSE.
+            key (str, optional): Identity of the item, such as a document's
+                content hash. Defaults to the hash of the content.
+
+        Returns:
+            int: Id of the saved item
+        """
+        if kind not in LIBRARY_KINDS:
+            raise ValueError(f"Unknown library item kind: {kind}")
+        if key is None:
+            key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT INTO library_items (kind, course, title, item_key, content, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (kind, course, item_key) DO UPDATE SET
+                    title = excluded.title, content = excluded.content, created_at = excluded.created_at
+                """,
+                (kind, course, title, key, content, time.time())
+            )
+            row = self._connection.execute(
+                "SELECT id FROM library_items WHERE kind = ? AND course = ? AND item_key = ?",
+                (kind, course, key)
+            ).fetchone()
+        return row["id"]
+
+    def search(self, query, course=None, limit=LIBRARY_SEARCH_LIMIT):
+        """
+        Find the items that best match a query.
+
+        Args:
+            query (str): Search text; any of its non-stop words may match
+            course (str, optional): Only search this course. Defaults to None (all courses).
+            limit (int, optional): Maximum number of results. Defaults to LIBRARY_SEARCH_LIMIT.
+
+        Returns:
+            list: LibraryHit tuples, best match first
+        """
+        terms = list(dict.fromkeys(tokenize(query, remove_stop_words=True)))
+        if not terms:
+            return []
+        if not self.full_text_search:
+            return self._scan(terms, course, limit)
+
+        # Quoted terms keep FTS5 query syntax in the user's text from being interpreted
+        match = " OR ".join(f'"{term}"' for term in terms)
+        sql = """
+            SELECT i.id, i.kind, i.course, i.title, i.created_at,
+                   snippet(library_fts, 1, '**', '**', ' ... ', ?) AS snippet
+            FROM library_fts JOIN library_items AS i ON i.id = library_fts.rowid
+            WHERE library_fts MATCH ?
+        """
+        params = [LIBRARY_SNIPPET_WORDS, match]
+        if course is not None:
+            sql += " AND i.course = ?"
+            params.append(course)
+        # Title matches weigh more than matches in the body
+        sql += " ORDER BY bm25(library_fts, 5.0, 1.0) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [LibraryHit(*row) for row in rows]
+
+    def _scan(self, terms, course, limit):
+        """Search without FTS5, ranking items by the number of matching terms."""
+        score = " + ".join("(instr(lower(title || ' ' || content), ?) > 0)" for _ in terms)
+        sql = f"SELECT id, kind, course, title, created_at, substr(content, 1, 300) AS snippet, {score} AS score FROM library_items"
+        params = list(terms)
+        if course is not None:
+            sql += " WHERE course = ?"
+            params.append(course)
+        sql += " ORDER BY score DESC, created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return [LibraryHit(*tuple(row)[:6]) for row in rows if row["score"] > 0]
+
+    def get(self, item_id):
+        """
+        Load an item.
+
+        Args:
+            item_id (int): Id from add() or a search result
+
+        Returns:
+            dict: The item's fields, or None if it does not exist
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM library_items WHERE id = ?", (item_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def courses(self):
+        """
+        List the courses that have items.
+
+        Returns:
+            list: Course names, alphabetically
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT DISTINCT course FROM library_items ORDER BY course").fetchall()
+        return [row["course"] for row in rows]
+
+    def stats(self, course=None):
+        """
+        Count the items in the library.
+
+        Args:
+            course (str, optional): Only count this course. Defaults to None (all courses).
+
+        Returns:
+            dict: Number of items per kind
+        """
+        sql = "SELECT kind, COUNT(*) FROM library_items"
+        params = []
+        if course is not None:
+            sql += " WHERE course = ?"
+            params.append(course)
+        sql += " GROUP BY kind"
+        with self._lock:
+            rows = self._connection.execute(sql, params).fetchall()
+        return {kind: count for kind, count in rows}
+
+
+@st.cache_resource
+def get_library():
+    """
+    Get the library shared by all sessions of this server process.
+
+    Returns:
+        Library: Shared library
+    """
+    return Library()
+
+
+def add_to_library(kind, title, content, course=LIBRARY_DEFAULT_COURSE, key=None):
+    """
+    Save generated material to the library. Empty and failed responses are not saved.
+
+    Args:
+        kind (str): One of LIBRARY_KINDS
+        title (str): Title shown in search results
+        content (str): The material
+        course (str, optional): Course the item belongs to. Defaults to LIBRARY_DEFAULT_COURSE.
+        key (str, optional): Identity of the item. Defaults to the hash of the content.
+    """
+    if not content or content.startswith(ERROR_RESPONSE_PREFIX):
+        return
+    try:
+        get_library().add(kind, title, content, course, key)
+    except sqlite3.Error:
+        # The material is still shown; it just is not kept
+        pass
+
+
+def add_document_to_library(file_path, sha256, document_name, course=LIBRARY_DEFAULT_COURSE):
+    """
+    Save a document's extracted text to the library, so it can be searched
+    without uploading it again.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str): Content hash of the document
+        document_name (str): Document name
+        course (str, optional): Course the document belongs to. Defaults to LIBRARY_DEFAULT_COURSE.
+    """
+    parts = []
+    length = 0
+    for _, text in iter_document_blocks(file_path, sha256):
+        parts.append(text)
+        length += len(text) + 2
+        if length >= LIBRARY_MAX_DOCUMENT_CHARS:
+            break
+    content = "\n\n".join(parts)[:LIBRARY_MAX_DOCUMENT_CHARS]
+    add_to_library("document", document_name, content, course, key=sha256)
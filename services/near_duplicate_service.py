@@ -0,0 +1,333 @@
+"""
+Near-duplicate document detection with MinHash and locality-sensitive hashing.
+Every analyzed document gets a MinHash signature over its word shingles.
+Signatures are banded into an LSH index persisted across sessions, so a new
+upload that is nearly identical to an earlier one (another scan, export or
+revision of the same chapter) is recognized without comparing it with every
+stored document.
+"""
+
+import os
+import json
+import zlib
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import streamlit as st
+from config.settings import (
+    MINHASH_NUM_PERMUTATIONS,
+    MINHASH_BANDS,
+    SHINGLE_WORDS,
+    NEAR_DUPLICATE_THRESHOLD,
+    NEAR_DUPLICATE_INDEX_PATH,
+    NEAR_DUPLICATE_MAX_DOCUMENTS
+)
+from services.document_service import iter_document_blocks, load_document_analysis
+from utils.extraction_cache import get_extraction_cache
+from utils.file_utils import get_upload_sha256
+from utils.text_utils import tokenize
+
+# Bump when shingling or hashing changes, so old signatures are discarded
+MINHASH_VERSION = 1
+
+# Universal hashing modulo the Mersenne prime 2^31 - 1 keeps every product within 64 bits
+_MERSENNE_PRIME = (1 << 31) - 1
+_MAX_HASH = _MERSENNE_PRIME - 1
+
+# Fixed seed: signatures must stay comparable across processes and restarts
+_random = np.random.RandomState(20240601)
+_PERMUTATION_A = _random.randint(1, _MERSENNE_PRIME, size=MINHASH_NUM_PERMUTATIONS).astype(np.uint64)
+_PERMUTATION_B = _random.randint(0, _MERSENNE_PRIME, size=MINHASH_NUM_PERMUTATIONS).astype(np.uint64)
+
+# Shingles hashed per vectorized batch, bounding temporary arrays
+_SHINGLE_BATCH = 8192
+
+# A stored document similar to the queried one
+NearDuplicate = namedtuple("NearDuplicate", ["sha256", "name", "similarity"])
+
+
+def _update_signature(signature, shingle_hashes):
+    """Fold a batch of shingle hashes into a running MinHash signature."""
+    values = np.asarray(shingle_hashes, dtype=np.uint64) % _MERSENNE_PRIME
+    permuted = (_PERMUTATION_A[:, None] * values[None, :] + _PERMUTATION_B[:, None]) % _MERSENNE_PRIME
+    np.minimum(signature, permuted.min(axis=1), out=signature)
+
+
+def compute_minhash(document_content, shingle_words=SHINGLE_WORDS):
+    """
+    Compute the MinHash signature of a document's word shingles.
+    Blocks are consumed as a stream and shingles are hashed in batches, so
+    memory stays bounded whatever the document's length.
+
+    Args:
+        document_content (str or iterable): Text, or (kind, text) blocks
+        shingle_words (int, optional): Words per shingle. Defaults to SHINGLE_WORDS.
+
+    Returns:
+        numpy.ndarray: Signature of MINHASH_NUM_PERMUTATIONS values, or None
+                       if the document has fewer words than one shingle
+    """
+    if isinstance(document_content, str):
+        document_content = [("page", document_content)]
+
+    signature = np.full(MINHASH_NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    window = []
+    batch = []
+    shingle_count = 0
+    for block in document_content:
+        text = block if isinstance(block, str) else block[1]
+        # Shingles run across block boundaries, so page breaks do not matter
+        for token in tokenize(text):
+            window.append(token)
+            if len(window) > shingle_words:
+                window.pop(0)
+            if len(window) == shingle_words:
+                batch.append(zlib.crc32(" ".join(window).encode("utf-8")))
+                shingle_count += 1
+                if len(batch) >= _SHINGLE_BATCH:
+                    _update_signature(signature, batch)
+                    batch = []
+    if batch:
+        _update_signature(signature, batch)
+    return signature if shingle_count else None
+
+
+def estimate_similarity(signature_a, signature_b):
+    """
+    Estimate the Jaccard similarity of two documents' shingle sets.
+
+    Args:
+        signature_a (numpy.ndarray): MinHash signature
+        signature_b (numpy.ndarray): MinHash signature
+
+    Returns:
+        float: Fraction of matching signature positions
+    """
+    return float(np.mean(signature_a == signature_b))
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures, persisted as JSON.
+
+    Each signature is cut into MINHASH_BANDS bands; documents sharing any
+    whole band become candidates, and candidates are verified by their
+    estimated similarity. Above max_documents the least recently added or
+    matched documents are forgotten.
+
+    Example:
+        index = get_near_duplicate_index()
+        index.add(sha256, signature, "chapter3.pdf")
+        index.query(other_signature)
+    """
+
+    def __init__(self, path=NEAR_DUPLICATE_INDEX_PATH, bands=MINHASH_BANDS,
+                 max_documents=NEAR_DUPLICATE_MAX_DOCUMENTS):
+        self.path = path
+        self.bands = bands
+        self.rows = MINHASH_NUM_PERMUTATIONS // bands
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        # Serializes writers, so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+        # sha256 -> (name, signature), least recently used first
+        self._documents = OrderedDict()
+        # (band number, band hash) -> set of sha256
+        self._buckets = {}
+        self._load()
+
+    def _band_keys(self, signature):
+        """Hash each band of a signature to a bucket key."""
+        return [
+            (band, hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                   digest_size=8).hexdigest())
+            for band in range(self.bands)
+        ]
+
+    def _insert(self, sha256, name, signature):
+        """Add a document to the in-memory index, evicting the least recently used. Caller must hold the lock."""
+        self._documents[sha256] = (name, signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(sha256)
+        while len(self._documents) > self.max_documents:
+            evicted, (_, evicted_signature) = self._documents.popitem(last=False)
+            for key in self._band_keys(evicted_signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _load(self):
+        """Read the saved signatures, starting empty if they are missing or outdated."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MINHASH_VERSION or data.get("bands") != self.bands:
+            return
+        for sha256, (name, values) in data.get("documents", {}).items():
+            self._insert(sha256, name, np.asarray(values, dtype=np.uint64))
+
+    def _save(self):
+        """Write all signatures atomically, in LRU order."""
+        with self._save_lock:
+            # Copy the entries under the lock, then serialize them without holding it
+            with self._lock:
+                documents = list(self._documents.items())
+            data = {
+                "version": MINHASH_VERSION,
+                "bands": self.bands,
+                "documents": {sha256: [name, signature.tolist()] for sha256, (name, signature) in documents}
+            }
+            self._write(data)
+
+    def _write(self, data):
+        """Write a snapshot of the index atomically."""
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+        except OSError:
+            # Saving is retried with the next added document
+            pass
+
+    def add(self, sha256, signature, name):
+        """
+        Add a document's signature to the index.
+
+        Args:
+            sha256 (str): Content hash of the document
+            signature (numpy.ndarray): MinHash signature
+            name (str): Document name, for display
+        """
+        with self._lock:
+            if sha256 in self._documents:
+                self._documents.move_to_end(sha256)
+                return
+            self._insert(sha256, name, signature)
+        self._save()
+
+    def query(self, signature, threshold=NEAR_DUPLICATE_THRESHOLD, exclude=None):
+        """
+        Find indexed documents similar to a signature.
+
+        Args:
+            signature (numpy.ndarray): MinHash signature of the new document
+            threshold (float, optional): Minimum estimated similarity.
+                Defaults to NEAR_DUPLICATE_THRESHOLD.
+            exclude (str, optional): Content hash of the queried document
+                itself, which is never reported. Defaults to None.
+
+        Returns:
+            list: NearDuplicate tuples, most similar first
+        """
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            candidates.discard(exclude)
+            matches = []
+            for sha256 in candidates:
+                name, stored = self._documents[sha256]
+                similarity = estimate_similarity(signature, stored)
+                if similarity >= threshold:
+                    self._documents.move_to_end(sha256)
+                    matches.append(NearDuplicate(sha256, name, similarity))
+        return sorted(matches, key=lambda match: match.similarity, reverse=True)
+
+
+@st.cache_resource
+def get_near_duplicate_index():
+    """
+    Get the near-duplicate index shared by all sessions of this server process.
+
+    Returns:
+        NearDuplicateIndex: Shared index
+    """
+    return NearDuplicateIndex()
+
+
+def get_document_signature(file_path, sha256):
+    """
+    Get a document's MinHash signature, computing it only once per content hash.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str): Content hash of the document
+
+    Returns:
+        numpy.ndarray: Signature, or None for documents with too little text
+    """
+    cache = get_extraction_cache()
+    cached = cache.get("minhash", sha256, MINHASH_VERSION)
+    if cached is not None:
+        return np.asarray(cached, dtype=np.uint64) if cached else None
+
+    signature = compute_minhash(iter_document_blocks(file_path, sha256))
+    cache.put("minhash", sha256, MINHASH_VERSION, signature.tolist() if signature is not None else [])
+    return signature
+
+
+def register_document(file_path, sha256, name):
+    """
+    Add an analyzed document to the near-duplicate index.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str): Content hash of the document
+        name (str): Document name
+    """
+    signature = get_document_signature(file_path, sha256)
+    if signature is not None:
+        get_near_duplicate_index().add(sha256, signature, name)
+
+
+def find_saved_analysis(uploaded_file, analysis_types):
+    """
+    Find a saved analysis of exactly this upload for the same analysis types.
+    Cheap enough to run on every rerun: the upload's hash is computed once
+    per session and nothing is extracted.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile object
+        analysis_types (list): Selected analysis types
+
+    Returns:
+        dict: document_name and response of the saved analysis, or None
+    """
+    if not analysis_types:
+        return None
+    return load_document_analysis(get_upload_sha256(uploaded_file), analysis_types)
+
+
+def find_near_duplicate_analysis(file_path, sha256, analysis_types):
+    """
+    Find a saved analysis of another, nearly identical document for the same
+    analysis types. The document itself is never matched. Computing the signature reads the whole document, so this runs when an
+    analysis is requested (the text is extracted then anyway), not on render.
+
+    Args:
+        file_path (str): Path to the document
+        sha256 (str): Content hash of the document
+        analysis_types (list): Selected analysis types
+
+    Returns:
+        tuple: (NearDuplicate, saved analysis dict), or None
+    """
+    if not analysis_types:
+        return None
+    signature = get_document_signature(file_path, sha256)
+    if signature is None:
+        return None
+    for match in get_near_duplicate_index().query(signature, exclude=sha256):
+        saved = load_document_analysis(match.sha256, analysis_types)
+        if saved is not None:
+            return match, saved
+    return None
@@ -0,0 +1,459 @@
+"""
+Local text analysis that runs without calling the Gemini API.
+Provides an extractive TextRank summarizer over TF-IDF sentence vectors,
+used for instant draft summaries and as a fallback when API calls fail,
+TF-IDF key concept extraction against corpus-wide document frequencies, and
+readability metrics.
+"""
+
+import re
+import math
+from collections import Counter
+from functools import lru_cache
+import numpy as np
+from config.settings import (
+    TEXTRANK_MAX_CANDIDATES,
+    TEXTRANK_MIN_SENTENCE_WORDS,
+    TEXTRANK_SIMILARITY_THRESHOLD,
+    KEY_CONCEPT_MAX_WORDS
+)
+from utils.corpus_stats import get_corpus_statistics
+from utils.text_chunker import split_paragraphs
+from utils.text_utils import tokenize, STOP_WORDS
+
+# Sentence ends: terminal punctuation followed by whitespace and a capital, digit or quote
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[A-Z0-9\"'(\[])")
+
+# Punctuation and dashes that end a candidate phrase
+_PHRASE_BREAK = re.compile(r"[.,;:!?()\[\]{}\"\u201c\u201d\u2018\u2019/\\|<>=+*\n\t]+|\s[-\u2013\u2014]+\s")
+
+# Readability: words, letters and sentence ends
+_READABILITY_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_SENTENCE_END_RUN = re.compile(r"[.!?]+(?=\s|$)")
+_VOWEL_GROUP = re.compile(r"[aeiouy]+")
+
+# Reading levels by upper U.S. grade bound, matching the app's level names
+READING_LEVELS = [
+    (5, "Elementary"),
+    (8, "Middle School"),
+    (12, "High School"),
+    (16, "Undergraduate"),
+    (18, "Graduate"),
+    (float("inf"), "Expert")
+]
+
+# PageRank parameters
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_MAX_ITERATIONS = 100
+TEXTRANK_TOLERANCE = 1e-6
+
+
+def split_sentences(text):
+    """
+    Split text into sentences.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: Sentences, with internal whitespace collapsed
+    """
+    sentences = []
+    for paragraph in split_paragraphs(text):
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+
+def _collect_sentences(document_content, min_words):
+    """
+    Split document content into candidate sentences and their tokens.
+
+    Args:
+        document_content (str or iterable): Text, or (kind, text) blocks
+        min_words (int): Shorter sentences (headings, captions, page numbers) are skipped
+
+    Returns:
+        tuple: (sentences, token lists)
+    """
+    if isinstance(document_content, str):
+        document_content = [("page", document_content)]
+
+    sentences = []
+    token_lists = []
+    for block in document_content:
+        kind, text = ("page", block) if isinstance(block, str) else block
+        if kind in ("heading", "table"):
+            continue
+        for sentence in split_sentences(text):
+            tokens = tokenize(sentence, remove_stop_words=True)
+            if len(sentence.split()) >= min_words and tokens:
+                sentences.append(sentence)
+                token_lists.append(tokens)
+    return sentences, token_lists
+
+
+def _tfidf_vectors(token_lists):
+    """
+    Build L2-normalized sparse TF-IDF vectors for tokenized sentences.
+
+    Args:
+        token_lists (list): Token list of each sentence
+
+    Returns:
+        list: {term: weight} dict of each sentence
+    """
+    term_counts = [Counter(tokens) for tokens in token_lists]
+    document_frequency = Counter()
+    for counts in term_counts:
+        document_frequency.update(counts.keys())
+
+    # Smoothed inverse document frequency over sentences
+    sentence_count = len(token_lists)
+    idf = {term: math.log((1.0 + sentence_count) / (1.0 + df)) + 1.0 for term, df in document_frequency.items()}
+
+    vectors = []
+    for counts in term_counts:
+        vector = {term: (1.0 + math.log(count)) * idf[term] for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors
+
+
+def _cosine_similarity(vectors):
+    """
+    Compute the pairwise cosine similarities of normalized sparse vectors.
+    Products are only formed for sentences that share a term, through an
+    inverted index, so no sentence-by-vocabulary matrix is built.
+
+    Args:
+        vectors (list): L2-normalized {term: weight} dicts
+
+    Returns:
+        numpy.ndarray: Square similarity matrix with a zero diagonal
+    """
+    postings = {}
+    for row, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings.setdefault(term, ([], []))
+            postings[term][0].append(row)
+            postings[term][1].append(weight)
+
+    similarity = np.zeros((len(vectors), len(vectors)), dtype=np.float32)
+    for rows, weights in postings.values():
+        # A term in a single sentence only adds to the diagonal
+        if len(rows) < 2:
+            continue
+        weights = np.asarray(weights, dtype=np.float32)
+        similarity[np.ix_(rows, rows)] += np.outer(weights, weights)
+    np.fill_diagonal(similarity, 0.0)
+    return similarity
+
+
+def _prune_candidates(token_lists, max_candidates):
+    """
+    Pick the sentences closest to the document's overall content.
+    Ranking every sentence of a long document against every other is
+    quadratic, so long documents are first narrowed by each sentence's
+    similarity to the TF-IDF centroid, which is linear.
+
+    Args:
+        token_lists (list): Token list of each sentence
+        max_candidates (int): Number of sentences to keep
+
+    Returns:
+        list: Indexes of the kept sentences, in document order
+    """
+    document_frequency = {}
+    for tokens in token_lists:
+        for token in set(tokens):
+            document_frequency[token] = document_frequency.get(token, 0) + 1
+
+    sentence_count = len(token_lists)
+    idf = {token: math.log((1.0 + sentence_count) / (1.0 + df)) + 1.0
+           for token, df in document_frequency.items()}
+    # Centroid weight of a term: its total TF-IDF mass across the document
+    centroid = {token: df * idf[token] for token, df in document_frequency.items()}
+
+    scores = np.empty(sentence_count, dtype=np.float32)
+    for row, tokens in enumerate(token_lists):
+        unique = set(tokens)
+        scores[row] = sum(centroid[token] * idf[token] for token in unique) / math.sqrt(len(unique))
+
+    keep = np.argpartition(-scores, max_candidates - 1)[:max_candidates]
+    return sorted(keep.tolist())
+
+
+def textrank_scores(similarity, damping=TEXTRANK_DAMPING):
+    """
+    Rank graph nodes with PageRank by power iteration.
+
+    Args:
+        similarity (numpy.ndarray): Square, non-negative edge weight matrix
+        damping (float, optional): Damping factor. Defaults to TEXTRANK_DAMPING.
+
+    Returns:
+        numpy.ndarray: Score of each node, summing to 1
+    """
+    size = similarity.shape[0]
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # Sentences with no edges spread their rank evenly
+    transition = np.where(out_weight > 0, similarity / np.where(out_weight > 0, out_weight, 1.0), 1.0 / size)
+
+    scores = np.full(size, 1.0 / size, dtype=np.float64)
+    for _ in range(TEXTRANK_MAX_ITERATIONS):
+        updated = (1.0 - damping) / size + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TEXTRANK_TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(document_content, max_words=200, max_candidates=TEXTRANK_MAX_CANDIDATES,
+                       min_sentence_words=TEXTRANK_MIN_SENTENCE_WORDS):
+    """
+    Summarize text by selecting its most central sentences with TextRank.
+
+    Args:
+        document_content (str or iterable): Document text, or (kind, text)
+            blocks such as those from iter_document_blocks
+        max_words (int, optional): Maximum summary length in words. Defaults to 200.
+        max_candidates (int, optional): Sentences ranked after pruning.
+            Defaults to TEXTRANK_MAX_CANDIDATES.
+        min_sentence_words (int, optional): Shorter sentences are ignored.
+            Defaults to TEXTRANK_MIN_SENTENCE_WORDS.
+
+    Returns:
+        str: Selected sentences in document order, or an empty string if the
+             content has no usable sentences
+    """
+    sentences, token_lists = _collect_sentences(document_content, min_sentence_words)
+    if not sentences:
+        return ""
+
+    candidates = list(range(len(sentences)))
+    if len(candidates) > max_candidates:
+        candidates = _prune_candidates(token_lists, max_candidates)
+
+    # Cosine similarity graph, keeping only meaningful edges
+    similarity = _cosine_similarity(_tfidf_vectors([token_lists[i] for i in candidates]))
+    similarity[similarity < TEXTRANK_SIMILARITY_THRESHOLD] = 0.0
+    scores = textrank_scores(similarity)
+
+    # Take the best sentences that fit, then restore document order
+    ranked = [candidates[position] for position in np.argsort(-scores, kind="stable")]
+    selected = []
+    word_count = 0
+    for index in ranked:
+        length = len(sentences[index].split())
+        if word_count + length <= max_words:
+            selected.append(index)
+            word_count += length
+
+    if not selected:
+        # Even the best sentence is too long; return its beginning
+        return " ".join(sentences[ranked[0]].split()[:max_words]) + "..."
+    return " ".join(sentences[i] for i in sorted(selected))
+
+
+def candidate_phrases(text, max_words=KEY_CONCEPT_MAX_WORDS):
+    """
+    List the noun-phrase-like candidates in a piece of text.
+    Without a part-of-speech tagger, phrases are approximated by runs of
+    content words between stop words, numbers and punctuation; every n-gram
+    of up to max_words words within a run is a candidate.
+
+    Args:
+        text (str): Text to scan
+        max_words (int, optional): Longest phrase. Defaults to KEY_CONCEPT_MAX_WORDS.
+
+    Returns:
+        list: Candidate phrases, lowercased, with repeats
+    """
+    phrases = []
+    for fragment in _PHRASE_BREAK.split(text or ""):
+        run = []
+        for token in tokenize(fragment) + [None]:
+            if token is not None and token not in STOP_WORDS and len(token) > 2 and not token.isdigit():
+                run.append(token)
+                continue
+            for n in range(1, min(max_words, len(run)) + 1):
+                for start in range(len(run) - n + 1):
+                    phrases.append(" ".join(run[start:start + n]))
+            run = []
+    return phrases
+
+
+def key_concepts(document_content, count=5, document_id=None, update_corpus=True):
+    """
+    Extract a document's key concepts by TF-IDF over candidate phrases.
+    Term rarity comes from the persistent corpus document-frequency table,
+    which this document is added to (once per document_id).
+
+    Args:
+        document_content (str or iterable): Document text, or (kind, text) blocks
+        count (int, optional): Number of concepts to return. Defaults to 5.
+        document_id (str, optional): Stable id such as the content hash, so the
+            same document is not counted twice in the corpus. Defaults to None.
+        update_corpus (bool, optional): Add the document to the corpus table. Defaults to True.
+
+    Returns:
+        list: Key concepts, most important first
+    """
+    if isinstance(document_content, str):
+        document_content = [("page", document_content)]
+
+    term_counts = {}
+    for block in document_content:
+        text = block if isinstance(block, str) else block[1]
+        for phrase in candidate_phrases(text):
+            term_counts[phrase] = term_counts.get(phrase, 0) + 1
+    if not term_counts:
+        return []
+
+    terms = list(term_counts)
+    corpus = get_corpus_statistics()
+    if update_corpus:
+        corpus.add_document(document_id, terms)
+    document_count, frequencies = corpus.frequencies(terms)
+
+    tf = np.fromiter(term_counts.values(), dtype=np.float64, count=len(terms))
+    df = np.asarray(frequencies, dtype=np.float64)
+    word_counts = np.fromiter((term.count(" ") + 1 for term in terms), dtype=np.float64, count=len(terms))
+
+    # Sublinear TF times smoothed IDF, favoring phrases over their single words
+    idf = np.log((1.0 + document_count) / (1.0 + df)) + 1.0
+    scores = (1.0 + np.log(tf)) * idf * (1.0 + 0.5 * (word_counts - 1.0))
+    # A phrase seen once is usually an accidental word pairing
+    scores[(word_counts > 1) & (tf < 2)] = 0.0
+
+    concepts = []
+    for position in np.argsort(-scores, kind="stable"):
+        if scores[position] <= 0 or len(concepts) >= count:
+            break
+        term = terms[position]
+        # Skip phrases overlapping one already chosen ("cell" after "cell membrane")
+        padded = f" {term} "
+        if any(padded in f" {chosen} " or f" {chosen} " in padded for chosen in concepts):
+            continue
+        concepts.append(term)
+    return concepts
+
+
+@lru_cache(maxsize=65536)
+def count_syllables(word):
+    """
+    Estimate the number of syllables in a lowercase English word.
+    Counts vowel groups, then corrects for a silent final "e" and silent
+    "-ed" and "-es" endings; a syllabic "-le" keeps its vowel group.
+
+    Args:
+        word (str): Lowercase word
+
+    Returns:
+        int: Syllable count, at least 1
+    """
+    word = word.replace("'", "")
+    if len(word) <= 3:
+        return 1
+    syllables = len(_VOWEL_GROUP.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee", "ye")):
+        syllables -= 1
+    elif word.endswith(("ed", "es")) and not word.endswith(("ted", "ded", "ses", "zes", "ces", "ges", "xes")):
+        syllables -= 1
+    return max(1, syllables)
+
+
+def _grade_to_level(grade):
+    """Map a U.S. grade level to the app's learning level names."""
+    for upper_grade, level in READING_LEVELS:
+        if grade <= upper_grade:
+            return level
+    return READING_LEVELS[-1][1]
+
+
+def readability_metrics(document_content):
+    """
+    Compute readability scores in a single pass over the text.
+    Words are tallied in a Counter while streaming; syllables are then
+    counted once per distinct word and combined with the word frequencies
+    as vectors, so cost grows with vocabulary rather than word count.
+
+    Dale-Chall normally uses a list of 3,000 familiar words; this
+    approximation treats words of three or more syllables, other than stop
+    words, as unfamiliar.
+
+    Args:
+        document_content (str or iterable): Text, or (kind, text) blocks
+
+    Returns:
+        dict: Counts, the Flesch reading ease, Flesch-Kincaid, SMOG,
+              Coleman-Liau and Dale-Chall scores, the consensus grade and the
+              matching reading level; None if the text has no words
+    """
+    if isinstance(document_content, str):
+        document_content = [("page", document_content)]
+
+    # Whitespace-separated tokens are tallied as they stream; the regex only
+    # runs once per distinct token afterwards
+    token_counts = Counter()
+    unterminated_blocks = 0
+    for block in document_content:
+        kind, text = ("page", block) if isinstance(block, str) else block
+        text = text.lower()
+        token_counts.update(text.split())
+        # Headings, table rows and text without final punctuation count as one sentence
+        if kind in ("heading", "table") or not _SENTENCE_END_RUN.search(text):
+            unterminated_blocks += 1
+
+    word_counts = Counter()
+    sentence_count = unterminated_blocks
+    for token, count in token_counts.items():
+        for word in _READABILITY_WORD.findall(token):
+            word_counts[word] += count
+        if token.rstrip("\"')]\u201d\u2019")[-1:] in (".", "!", "?"):
+            sentence_count += count
+
+    if not word_counts:
+        return None
+
+    words = list(word_counts)
+    frequencies = np.fromiter(word_counts.values(), dtype=np.float64, count=len(words))
+    syllables = np.fromiter((count_syllables(word) for word in words), dtype=np.float64, count=len(words))
+    letters = np.fromiter((len(word) - word.count("'") for word in words), dtype=np.float64, count=len(words))
+    unfamiliar = np.fromiter((word not in STOP_WORDS for word in words), dtype=bool, count=len(words)) & (syllables >= 3)
+
+    total_words = frequencies.sum()
+    total_syllables = frequencies @ syllables
+    total_letters = frequencies @ letters
+    polysyllables = frequencies[syllables >= 3].sum()
+    difficult_words = frequencies[unfamiliar].sum()
+    sentences = max(sentence_count, 1)
+
+    words_per_sentence = total_words / sentences
+    syllables_per_word = total_syllables / total_words
+    flesch_reading_ease = 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word
+    flesch_kincaid = 0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59
+    smog = 1.0430 * math.sqrt(polysyllables * 30.0 / sentences) + 3.1291
+    coleman_liau = 0.0588 * (100.0 * total_letters / total_words) - 0.296 * (100.0 * sentences / total_words) - 15.8
+    difficult_percent = 100.0 * difficult_words / total_words
+    dale_chall = 0.1579 * difficult_percent + 0.0496 * words_per_sentence
+    if difficult_percent > 5.0:
+        dale_chall += 3.6365
+    # Dale-Chall scores map to grade bands: 4.9 or lower is grade 4, each point above adds about two grades
+    dale_chall_grade = 4.0 if dale_chall < 5.0 else 2.0 * dale_chall - 5.0
+
+    grade = float(np.median([flesch_kincaid, smog, coleman_liau, dale_chall_grade]))
+    return {
+        "word_count": int(total_words),
+        "sentence_count": sentence_count,
+        "flesch_reading_ease": round(float(flesch_reading_ease), 1),
+        "flesch_kincaid_grade": round(float(flesch_kincaid), 1),
+        "smog_grade": round(float(smog), 1),
+        "coleman_liau_index": round(float(coleman_liau), 1),
+        "dale_chall_score": round(float(dale_chall), 1),
+        "grade_level": round(max(grade, 0.0), 1),
+        "reading_level": _grade_to_level(grade)
+    }
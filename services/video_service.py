@@ -6,10 +6,16 @@ Handles different video file types including MP4, MOV, and others.
 import os
 import streamlit as st
 from utils.file_utils import get_file_mime_type
+from utils.extraction_cache import cached_extraction
 
+# Bump when process_video_file's output changes
+VIDEO_EXTRACTOR_VERSION = 1
+
+@cached_extraction("video", VIDEO_EXTRACTOR_VERSION)
 def process_video_file(file_path, file_name=None):
     """
     Process a video file and extract basic information.
+    Results are cached on disk by content hash.
     In a production app, this would use a library like OpenCV or moviepy.
     
     Args:
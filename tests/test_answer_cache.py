@@ -0,0 +1,42 @@
+"""
+Regression tests for the Learning Assistant answer cache.
+"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.answer_cache import AnswerCache
+
+
+def test_questions_differing_only_in_numbers_do_not_share_answers():
+    cache = AnswerCache()
+    cache.put("Solve x^2 + 5x + 6 = 0", "High School", "Textual", "ANS6")
+
+    assert cache.get("Solve x^2 + 5x + 7 = 0", "High School", "Textual") is None
+    assert cache.get("Solve x^2 + 5x + 8 = 0", "High School", "Textual") is None
+    assert cache.get("Solve x^2 - 5x + 6 = 0", "High School", "Textual") is None
+    assert cache.get("solve x^2 + 5x + 6 = 0", "High School", "Textual") == "ANS6"
+
+
+def test_rephrased_question_still_hits():
+    cache = AnswerCache()
+    cache.put("Explain photosynthesis simply", "High School", "Visual", "ANSWER")
+
+    assert cache.get("explain photosynthesis, simply?", "High School", "Visual") == "ANSWER"
+    assert cache.get("Explain photosynthesis simply", "Graduate", "Visual") is None
+
+
+def test_evicted_entries_release_their_ngrams():
+    cache = AnswerCache(max_entries=2)
+    for number in range(50):
+        cache.put(f"Explain topic{number} in detail", "High School", "Visual", f"ANSWER {number}")
+
+    assert cache.stats()["entries"] == 2
+    # Only the n-grams of the two remaining questions are still indexed
+    remaining = set()
+    for _, _, grams, _, _ in cache._entries.values():
+        remaining |= grams
+    assert {gram for _, gram in cache._postings} == remaining
+    assert cache.get("Explain topic49 in detail", "High School", "Visual") == "ANSWER 49"
+    assert cache.get("Explain topic0 in detail", "High School", "Visual") is None
@@ -0,0 +1,46 @@
+"""
+Tests for the BM25 indexes used for chat history and document questions.
+"""
+
+import pytest
+
+from utils.text_utils import BM25Index, tokenize
+
+
+def test_bm25_ranks_by_term_rarity_and_frequency():
+    index = BM25Index()
+    for text in [
+        "photosynthesis uses light energy in plant cells",
+        "mitochondria release energy in animal cells",
+        "photosynthesis photosynthesis chlorophyll light",
+        "the french revolution began in 1789",
+    ]:
+        index.add(tokenize(text, remove_stop_words=True))
+
+    ranked = [doc_id for doc_id, _ in index.top_k(tokenize("photosynthesis light", remove_stop_words=True), 4)]
+
+    assert ranked == [2, 0]
+    assert index.top_k(tokenize("quantum chromodynamics", remove_stop_words=True), 4) == []
+    assert [doc_id for doc_id, _ in index.top_k(tokenize("energy", remove_stop_words=True), 4, max_doc=1)] == [0]
+
+
+def test_document_index_survives_a_save_and_load(tmp_path):
+    pytest.importorskip("streamlit")
+    from services.document_index import DocumentIndex
+    from utils.text_chunker import TextChunk
+
+    texts = [
+        ("Cells", "Osmosis moves water across a semipermeable membrane."),
+        ("Cells", "Diffusion spreads molecules from high to low concentration."),
+        ("Plants", "Transpiration pulls water from roots to leaves."),
+    ]
+    chunks = [TextChunk(i, text, section, 10) for i, (section, text) in enumerate(texts)]
+    index = DocumentIndex.from_chunks(chunks)
+    path = tmp_path / "index.bin"
+    index.save(str(path))
+    loaded = DocumentIndex.load(str(path))
+
+    for query in ["what is osmosis", "water movement in plants", "concentration"]:
+        assert loaded.search(query, 3) == index.search(query, 3)
+    assert loaded.search("osmosis", 1)[0][0] == 0
+    assert loaded.chunks == index.chunks and loaded.sections == index.sections
@@ -0,0 +1,36 @@
+"""
+Tests for the persistent extraction cache and the analyses saved in it.
+"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.extraction_cache import ExtractionCache
+from utils.prompt_templates import PROMPT_TEMPLATES, PromptTemplate
+
+
+def test_entries_are_keyed_by_kind_hash_and_version(tmp_path):
+    cache = ExtractionCache(root=tmp_path)
+    cache.put("document", "ab" * 32, 1, {"text": "hello"})
+
+    assert cache.get("document", "ab" * 32, 1) == {"text": "hello"}
+    assert cache.get("document", "ab" * 32, 2) is None
+    assert cache.get("image", "ab" * 32, 1) is None
+    assert ExtractionCache(root=tmp_path).get("document", "ab" * 32, 1) == {"text": "hello"}
+
+
+def test_saved_analysis_is_dropped_when_the_analysis_prompt_changes(tmp_path, monkeypatch):
+    pytest.importorskip("google.generativeai")
+    from services import document_service
+
+    cache = ExtractionCache(root=tmp_path)
+    monkeypatch.setattr(document_service, "get_extraction_cache", lambda: cache)
+    document_service.save_document_analysis("cd" * 32, ["Summary"], "notes.txt", "The analysis")
+    assert document_service.load_document_analysis("cd" * 32, ["Summary"])["response"] == "The analysis"
+
+    current = PROMPT_TEMPLATES["document_analysis"]
+    changed = PromptTemplate(current.name, current.version + 1, current.text + "\nBe brief.")
+    monkeypatch.setitem(PROMPT_TEMPLATES, "document_analysis", changed)
+
+    assert document_service.load_document_analysis("cd" * 32, ["Summary"]) is None
@@ -0,0 +1,59 @@
+"""
+Tests for content-based file type detection.
+"""
+
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.file_utils import DOCX_MIME_TYPE, detect_file_type, validate_file_type
+
+
+def _zip(member):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(member, "<xml/>")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("content, mime_type", [
+    (b"%PDF-1.7\n...", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n" + b"\x00" * 16, "image/png"),
+    (b"\xff\xd8\xff\xe0" + b"\x00" * 16, "image/jpeg"),
+    (b"RIFF\x24\x00\x00\x00WAVEfmt ", "audio/wav"),
+    (b"\x00\x00\x00\x20ftypM4A \x00\x00\x00\x00", "audio/mp4"),
+    (b"ID3\x04\x00\x00", "audio/mpeg"),
+    (b"\xff\xfeH\x00i\x00", "text/plain"),
+    ("Café notes\r\n".encode("utf-8"), "text/plain"),
+    ("Café notes\r\n".encode("cp1252"), "text/plain"),
+    (b"", "text/plain"),
+    (b"\x00\x01\x02\x03binary", None),
+])
+def test_detects_type_from_leading_bytes(content, mime_type):
+    assert detect_file_type(io.BytesIO(content)) == mime_type
+
+
+def test_tells_docx_from_other_zip_archives():
+    assert detect_file_type(io.BytesIO(_zip("word/document.xml"))) == DOCX_MIME_TYPE
+    assert detect_file_type(io.BytesIO(_zip("notes.txt"))) == "application/zip"
+
+
+def test_rejects_mislabeled_files(tmp_path):
+    disguised = tmp_path / "report.pdf"
+    disguised.write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 16)
+
+    with pytest.raises(ValueError):
+        validate_file_type(str(disguised), "pdf")
+    with pytest.raises(ValueError):
+        validate_file_type(io.BytesIO(_zip("notes.txt")), "docx")
+    assert validate_file_type(str(disguised), "PNG") == "image/png"
+
+
+def test_detection_is_cached_by_content_hash():
+    sha256 = "e" * 64
+    assert detect_file_type(io.BytesIO(b"%PDF-1.4"), sha256=sha256) == "application/pdf"
+    # A cached hash is trusted without reading the file again
+    assert detect_file_type(io.BytesIO(b"not a pdf"), sha256=sha256) == "application/pdf"
@@ -0,0 +1,53 @@
+"""
+Tests for the course library's search.
+"""
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("google.generativeai")
+
+from services import library_service
+from services.library_service import Library
+
+
+def _fill(library):
+    library.add("document", "Photosynthesis notes", "Light reactions happen in the thylakoid membrane.", course="Biology")
+    library.add("quiz", "Quiz: Cell division", "Mitosis produces two identical daughter cells.", course="Biology")
+    library.add("document", "Revolutions", "The French Revolution began in 1789.", course="History")
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def library(request, tmp_path, monkeypatch):
+    if not request.param:
+        # Simulate an SQLite build without the FTS5 module
+        monkeypatch.setattr(library_service, "_FTS_SCHEMA", "CREATE VIRTUAL TABLE library_fts USING no_such_module(x);")
+    library = Library(path=str(tmp_path / "library.db"))
+    if request.param and not library.full_text_search:
+        pytest.skip("SQLite was built without FTS5")
+    assert library.full_text_search is request.param
+    _fill(library)
+    return library
+
+
+def test_search_finds_matching_items_in_a_course(library):
+    hits = library.search("what are the light reactions?", course="Biology")
+
+    assert [hit.title for hit in hits] == ["Photosynthesis notes"]
+    assert library.search("revolution", course="Biology") == []
+    assert [hit.course for hit in library.search("revolution")] == ["History"]
+    assert library.search("the and of") == []
+
+
+def test_items_matching_more_terms_rank_first(library):
+    hits = library.search("mitosis thylakoid membrane")
+
+    assert [hit.title for hit in hits] == ["Photosynthesis notes", "Quiz: Cell division"]
+
+
+def test_saving_the_same_item_again_replaces_it(library):
+    library.add("quiz", "Quiz: Cell division (v2)", "Mitosis produces two identical daughter cells.", course="Biology")
+
+    assert library.stats(course="Biology") == {"document": 1, "quiz": 1}
+    assert [hit.title for hit in library.search("mitosis")] == ["Quiz: Cell division (v2)"]
+    assert library.courses() == ["Biology", "History"]
@@ -0,0 +1,60 @@
+"""
+Tests for MinHash near-duplicate detection.
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from services.near_duplicate_service import NearDuplicateIndex, compute_minhash, estimate_similarity
+
+
+def _chapter(seed, words=1500):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(800)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _edit(text, every=100):
+    # Replace one word in every hundred, like a light revision
+    words = text.split()
+    for position in range(0, len(words), every):
+        words[position] = "revised"
+    return " ".join(words)
+
+
+def test_lightly_edited_text_stays_similar():
+    original = compute_minhash(_chapter(1))
+
+    assert estimate_similarity(original, compute_minhash(_chapter(1))) == 1.0
+    assert estimate_similarity(original, compute_minhash(_edit(_chapter(1)))) > 0.8
+    assert estimate_similarity(original, compute_minhash(_chapter(2))) < 0.1
+    assert compute_minhash("too short") is None
+
+
+def test_query_finds_the_revision_but_never_the_document_itself(tmp_path):
+    index = NearDuplicateIndex(path=str(tmp_path / "minhash.json"))
+    original = compute_minhash(_chapter(1))
+    index.add("a" * 64, original, "chapter1.pdf")
+    index.add("b" * 64, compute_minhash(_chapter(2)), "chapter2.pdf")
+
+    assert index.query(original, exclude="a" * 64) == []
+    matches = index.query(compute_minhash(_edit(_chapter(1))), exclude="c" * 64)
+    assert [match.name for match in matches] == ["chapter1.pdf"]
+
+    reloaded = NearDuplicateIndex(path=str(tmp_path / "minhash.json"))
+    assert [match.name for match in reloaded.query(original)] == ["chapter1.pdf"]
+
+
+def test_index_forgets_the_least_recently_used_documents(tmp_path):
+    index = NearDuplicateIndex(path=str(tmp_path / "minhash.json"), max_documents=2)
+    signatures = [compute_minhash(_chapter(seed)) for seed in range(3)]
+    index.add("0" * 64, signatures[0], "first")
+    index.add("1" * 64, signatures[1], "second")
+    index.query(signatures[0])
+    index.add("2" * 64, signatures[2], "third")
+
+    assert [match.name for match in index.query(signatures[0])] == ["first"]
+    assert index.query(signatures[1]) == []
@@ -0,0 +1,92 @@
+"""
+Tests for the TextRank summarizer and readability metrics in the text
+analysis service.
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("streamlit")
+
+from services.text_analysis_service import (
+    _cosine_similarity,
+    _tfidf_vectors,
+    count_syllables,
+    extractive_summary,
+    readability_metrics,
+    textrank_scores,
+)
+
+
+def test_sparse_similarity_matches_dense_cosine():
+    token_lists = [
+        ["plant", "cell", "light", "energy"],
+        ["light", "energy", "chlorophyll"],
+        ["carbon", "sugar", "cycle"],
+        ["plant", "sugar", "growth", "growth"],
+    ]
+    vectors = _tfidf_vectors(token_lists)
+    vocabulary = sorted({term for vector in vectors for term in vector})
+    dense = np.array([[vector.get(term, 0.0) for term in vocabulary] for vector in vectors])
+    expected = dense @ dense.T
+    np.fill_diagonal(expected, 0.0)
+
+    assert np.allclose(_cosine_similarity(vectors), expected, atol=1e-6)
+
+
+def test_textrank_prefers_the_best_connected_node():
+    similarity = np.array([
+        [0.0, 0.5, 0.5, 0.5],
+        [0.5, 0.0, 0.0, 0.0],
+        [0.5, 0.0, 0.0, 0.0],
+        [0.5, 0.0, 0.0, 0.0],
+    ])
+    scores = textrank_scores(similarity)
+
+    assert scores.argmax() == 0
+    assert scores.sum() == pytest.approx(1.0)
+
+
+def test_summary_keeps_central_sentences_in_document_order():
+    text = (
+        "Photosynthesis lets plant cells turn light energy into chemical energy. "
+        "My neighbour painted the garden fence bright blue yesterday afternoon. "
+        "Chlorophyll in plant cells absorbs the light energy for photosynthesis. "
+        "Plant cells store the chemical energy from photosynthesis as sugar."
+    )
+    summary = extractive_summary(text, max_words=25, min_sentence_words=3)
+    picked = [sentence for sentence in text.split(". ") if sentence.rstrip(".") in summary]
+
+    assert "fence" not in summary
+    assert len(picked) == 2
+    assert summary.index(picked[0]) < summary.index(picked[1])
+
+
+@pytest.mark.parametrize("word, syllables", [
+    ("cat", 1), ("table", 2), ("jumped", 1), ("wanted", 2), ("boxes", 2),
+    ("photosynthesis", 5), ("education", 4), ("don't", 1),
+])
+def test_count_syllables(word, syllables):
+    assert count_syllables(word) == syllables
+
+
+def test_readability_counts_and_orders_difficulty():
+    simple = "The cat sat on the mat. The dog ran to the cat. It was fun."
+    complex_text = (
+        "Photosynthetic organisms convert electromagnetic radiation into chemical potential energy. "
+        "Consequently, heterotrophic populations ultimately depend on autotrophic productivity."
+    )
+    easy = readability_metrics(simple)
+    hard = readability_metrics(complex_text)
+
+    assert easy["word_count"] == 15 and easy["sentence_count"] == 3
+    assert easy["flesch_reading_ease"] > hard["flesch_reading_ease"]
+    assert easy["grade_level"] < hard["grade_level"]
+    assert readability_metrics("   ") is None
+
+
+def test_readability_of_blocks_matches_the_joined_text():
+    blocks = [("page", "Cells divide by mitosis. "), ("page", "Each daughter cell is identical.")]
+
+    assert readability_metrics(blocks) == readability_metrics("Cells divide by mitosis. Each daughter cell is identical.")
+    assert readability_metrics([("heading", "Cell Division")] + blocks)["sentence_count"] == 3
@@ -0,0 +1,57 @@
+"""
+Tests for the content-defined document chunker.
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.text_chunker import chunk_blocks
+
+
+def _paragraphs(count, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(500)]
+    return [
+        " ".join(rng.choice(vocabulary) for _ in range(rng.randint(20, 80))) + "."
+        for _ in range(count)
+    ]
+
+
+def _chunk_texts(paragraphs, **kwargs):
+    return [chunk.text for chunk in chunk_blocks([("paragraph", text) for text in paragraphs], **kwargs)]
+
+
+def test_chunks_respect_the_token_limit():
+    chunks = list(chunk_blocks([("paragraph", text) for text in _paragraphs(200)], max_tokens=400, overlap_tokens=60))
+
+    assert len(chunks) > 10
+    assert all(chunk.tokens <= 400 for chunk in chunks)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_local_edit_only_changes_nearby_chunks():
+    original = _paragraphs(300)
+    revised = list(original)
+    revised[150] = "A new sentence was inserted here. " + revised[150]
+    revised.insert(80, "An entirely new paragraph about something else.")
+
+    before = _chunk_texts(original, max_tokens=400, overlap_tokens=60)
+    after = _chunk_texts(revised, max_tokens=400, overlap_tokens=60)
+    unchanged = set(before) & set(after)
+
+    # Boundaries resynchronize right after each edit, so nearly every chunk is reused
+    assert len(unchanged) >= len(before) - 4
+    assert before[0] == after[0] and before[-1] == after[-1]
+
+
+def test_headings_start_new_sections():
+    blocks = [("heading", "Cells")] + [("paragraph", text) for text in _paragraphs(20, seed=1)]
+    blocks += [("heading", "Plants")] + [("paragraph", text) for text in _paragraphs(20, seed=2)]
+    chunks = list(chunk_blocks(blocks, max_tokens=300, overlap_tokens=40))
+
+    assert {chunk.section for chunk in chunks} == {"Cells", "Plants"}
+    plants = [chunk for chunk in chunks if chunk.section == "Plants"]
+    assert plants[0].text.startswith("Plants")
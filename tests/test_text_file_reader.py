@@ -0,0 +1,71 @@
+"""
+Tests for decoding plain text files in a single pass.
+"""
+
+import pytest
+
+from utils.document_readers import TextFileReader
+
+
+def _write(tmp_path, data):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_utf8_text_before_an_invalid_byte_keeps_its_decoding(tmp_path):
+    data = "Café crème. ".encode("utf-8") * 3 + b"caf\xe9 au lait"
+    reader = TextFileReader(_write(tmp_path, data), block_size=7)
+
+    text = "".join(reader)
+
+    assert text == "Café crème. " * 3 + "café au lait"
+    assert reader.encoding == "utf-8, then cp1252"
+
+
+def test_ascii_prefix_reports_only_the_fallback_encoding(tmp_path):
+    reader = TextFileReader(_write(tmp_path, b"plain text then caf\xe9"), block_size=4)
+
+    assert "".join(reader) == "plain text then café"
+    assert reader.encoding == "cp1252"
+
+
+def test_multibyte_character_split_across_blocks(tmp_path):
+    data = "naïve résumé".encode("utf-8")
+    for block_size in range(1, len(data) + 1):
+        reader = TextFileReader(_write(tmp_path, data), block_size=block_size)
+        assert "".join(reader) == "naïve résumé"
+        assert reader.encoding == "utf-8"
+
+
+def test_byte_order_marks_select_the_encoding(tmp_path):
+    reader = TextFileReader(_write(tmp_path, "﻿hello".encode("utf-16-le")))
+    assert "".join(reader) == "hello"
+    assert reader.encoding == "utf-16"
+
+    reader = TextFileReader(_write(tmp_path, b"\xef\xbb\xbfhello"))
+    assert "".join(reader) == "hello"
+    assert reader.encoding == "utf-8-sig"
+
+
+def test_lines_handle_every_line_ending_across_blocks(tmp_path):
+    data = b"one\r\ntwo\rthree\n\nfour\r\n"
+    for block_size in range(1, len(data) + 1):
+        lines = list(TextFileReader(_write(tmp_path, data), block_size=block_size).lines())
+        assert lines == ["one", "two", "three", "", "four"]
+
+
+def test_text_statistics_count_across_an_encoding_switch(tmp_path, monkeypatch):
+    pytest.importorskip("streamlit")
+    pytest.importorskip("google.generativeai")
+    from services import document_service
+
+    monkeypatch.setattr(document_service, "UPLOAD_CHUNK_SIZE", 5)
+    data = "Crème brûlée\nis ".encode("utf-8") + b"tr\xe8s bon"
+    stats = document_service.process_text_file(_write(tmp_path, data))
+
+    assert stats["encoding"] == "utf-8, then cp1252"
+    assert stats["char_count"] == len("Crème brûlée\nis très bon")
+    assert stats["word_count"] == 5
+    assert stats["line_count"] == 2
+    assert stats["sample_content"] == "Crème brûlée\nis très bon"
@@ -0,0 +1,54 @@
+"""
+Tests for the shared, reference-counted upload store.
+"""
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from utils.upload_store import UploadStore
+
+
+def test_identical_uploads_share_one_file(tmp_path):
+    store = UploadStore(root=str(tmp_path), quota_bytes=1024)
+    first = store.acquire(io.BytesIO(b"same content"), suffix=".txt")
+    second = store.acquire(io.BytesIO(b"same content"), suffix=".txt")
+
+    assert first == second
+    assert sorted(os.listdir(tmp_path)) == [first.sha256 + ".txt"]
+    assert store.stats() == {"files": 1, "bytes": len(b"same content"), "in_use": 1}
+
+
+def test_referenced_files_survive_eviction(tmp_path):
+    store = UploadStore(root=str(tmp_path), quota_bytes=250)
+    held = store.acquire(io.BytesIO(b"a" * 100))
+    released = store.acquire(io.BytesIO(b"b" * 100))
+    store.release(released.sha256)
+    newest = store.acquire(io.BytesIO(b"c" * 100))
+
+    # Over quota: only the unreferenced file may go, even though it is not the oldest
+    assert os.path.exists(held.path) and os.path.exists(newest.path)
+    assert not os.path.exists(released.path)
+    assert store.stats() == {"files": 2, "bytes": 200, "in_use": 2}
+
+    store.release(held.sha256)
+    store.release(held.sha256)
+    store.acquire(io.BytesIO(b"d" * 100))
+    assert not os.path.exists(held.path)
+    assert os.path.exists(newest.path)
+
+
+def test_prune_and_restart_keep_the_accounting(tmp_path):
+    store = UploadStore(root=str(tmp_path), quota_bytes=1024)
+    kept = store.acquire(io.BytesIO(b"kept"))
+    idle = store.acquire(io.BytesIO(b"idle"))
+    store.release(idle.sha256)
+
+    assert store.prune(max_age_seconds=-1) == (1, len(b"idle"))
+    assert os.path.exists(kept.path) and not os.path.exists(idle.path)
+
+    reopened = UploadStore(root=str(tmp_path), quota_bytes=1024)
+    assert reopened.stats() == {"files": 1, "bytes": len(b"kept"), "in_use": 0}
@@ -3,6 +3,11 @@ Reusable UI components for the EduGenius application.
 """
 
 import streamlit as st
+from utils.file_utils import validate_uploaded_file
+from utils.prompt_profiler import prompt_profiler
+from services.text_analysis_service import readability_metrics, READING_LEVELS
+from services.library_service import get_library, LIBRARY_KINDS
+from config.settings import STORAGE_METRICS_ENABLED, LIBRARY_DEFAULT_COURSE
 
 def welcome_screen():
     """
@@ -85,6 +90,48 @@ def chat_input_area(key_prefix="chat", placeholder="Type your question here...",
     return user_input, submit_button
 
 
+def checked_upload(uploaded_file):
+    """
+    Check that an upload's content matches its extension, showing an error if not.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile object, or None
+        
+    Returns:
+        The uploaded file, or None if there was no upload or it was rejected
+    """
+    if uploaded_file is None:
+        return None
+    
+    try:
+        validate_uploaded_file(uploaded_file)
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    
+    return uploaded_file
+
+
+def checked_uploads(uploaded_files):
+    """
+    Check a batch of uploads, dropping rejected files and any beyond the batch limit.
+    
+    Args:
+        uploaded_files (list): Streamlit UploadedFile objects, or None
+        
+    Returns:
+        list: Accepted uploads
+    """
+    from config.settings import BATCH_MAX_FILES
+    
+    uploaded_files = list(uploaded_files or [])
+    if len(uploaded_files) > BATCH_MAX_FILES:
+        st.warning(f"Only the first {BATCH_MAX_FILES} files will be processed.")
+        uploaded_files = uploaded_files[:BATCH_MAX_FILES]
+    
+    return [f for f in (checked_upload(f) for f in uploaded_files) if f is not None]
+
+
 def media_upload_area(key_prefix="upload"):
     """
     Create a standardized media upload area with selector and uploader.
@@ -134,6 +181,9 @@ def media_upload_area(key_prefix="upload"):
                 key=f"{key_prefix}_document"
             )
         
+        # Reject files whose content does not match their extension
+        uploaded_file = checked_upload(uploaded_file)
+        
         # Display success message if file is uploaded
         if uploaded_file is not None:
             st.success(f"File '{uploaded_file.name}' uploaded successfully! ({uploaded_file.type})")
@@ -204,3 +254,145 @@ def spinner_with_status(text="Processing..."):
     status_placeholder = st.empty()
     
     return spinner, status_placeholder
+
+
+def prompt_profile_panel():
+    """
+    Display the prompt size profile per page (development only).
+    Renders nothing unless prompt profiling is enabled with
+    EDUGENIUS_PROMPT_PROFILING=1.
+    """
+    if not prompt_profiler.enabled:
+        return
+    
+    with st.expander("Prompt Size Profile", expanded=False):
+        report = prompt_profiler.report()
+        if not report:
+            st.info("No prompts recorded yet.")
+            return
+        
+        for page, stats in report.items():
+            average = stats["total_tokens"] // max(1, stats["requests"])
+            st.markdown(f"**{page}** - {stats['requests']} requests, ~{average} tokens per request")
+            
+            # Largest sections first
+            for section, tokens in stats["sections"].items():
+                share = tokens / stats["total_tokens"] if stats["total_tokens"] else 0
+                st.markdown(f"- {section}: ~{tokens} tokens ({share:.0%})")
+        
+        if st.button("Reset Profile", key="prompt_profile_reset"):
+            prompt_profiler.reset()
+
+
+def temp_storage_panel():
+    """
+    Display temporary file storage metrics (development only).
+    Renders nothing unless EDUGENIUS_STORAGE_METRICS=1 is set.
+    """
+    if not STORAGE_METRICS_ENABLED:
+        return
+    
+    from utils.temp_janitor import get_temp_janitor
+    
+    with st.expander("Temporary Storage", expanded=False):
+        metrics = get_temp_janitor().metrics()
+        store = metrics.get("upload_store", {})
+        extraction = metrics.get("extraction_cache", {})
+        
+        st.markdown(f"- Temporary files: {metrics['files']} ({metrics['bytes'] / (1024 * 1024):.1f} MB)")
+        st.markdown(f"- Document indexes: {metrics['index_files']} ({metrics['index_bytes'] / (1024 * 1024):.1f} MB)")
+        st.markdown(f"- Upload store: {store.get('files', 0)} files ({store.get('bytes', 0) / (1024 * 1024):.1f} MB), {store.get('in_use', 0)} in use")
+        st.markdown(f"- Extraction cache: {extraction.get('hits', 0)} hits, {extraction.get('misses', 0)} misses")
+        st.markdown(f"- Cleaned up: {metrics['deleted_files']} files ({metrics['deleted_bytes'] / (1024 * 1024):.1f} MB) over {metrics['sweeps']} sweeps")
+        
+        if st.button("Clean Up Now", key="temp_storage_sweep"):
+            get_temp_janitor().sweep()
+
+
+def reading_level_caption(text, target_level=None):
+    """
+    Show the reading level of generated text, computed locally.
+    
+    Args:
+        text (str): Generated text, such as a quiz or a tutor answer
+        target_level (str, optional): Learning level the text was written for;
+            a mismatch is pointed out. Defaults to None.
+    """
+    metrics = readability_metrics(text)
+    if metrics is None:
+        return
+    
+    caption = (f"Reading level: {metrics['reading_level']} "
+               f"(grade {metrics['grade_level']:.1f}, Flesch reading ease {metrics['flesch_reading_ease']:.0f})")
+    
+    level_names = [name for _, name in READING_LEVELS]
+    if target_level in level_names and metrics["reading_level"] != target_level:
+        direction = "above" if level_names.index(metrics["reading_level"]) > level_names.index(target_level) else "below"
+        caption += f" - {direction} the selected {target_level} level"
+    
+    st.caption(caption)
+
+
+def current_course():
+    """
+    Get the course that new library items are saved to.
+    
+    Returns:
+        str: Course name chosen with course_selector()
+    """
+    return (st.session_state.get("library_course") or "").strip() or LIBRARY_DEFAULT_COURSE
+
+
+def course_selector():
+    """
+    Let the user choose the course that analyses, transcripts and quizzes are saved to.
+    Existing courses are suggested, and a new one can be named.
+    """
+    courses = get_library().courses()
+    st.markdown("### Course Library")
+    if courses:
+        st.caption(f"Saved courses: {', '.join(courses)}")
+    st.text_input("Course:", value=LIBRARY_DEFAULT_COURSE, key="library_course",
+                  help="Analyses, transcripts and quizzes are saved to this course's library")
+
+
+def library_search_panel(key_prefix="library"):
+    """
+    Search the saved materials of the current course, or of all courses.
+    
+    Args:
+        key_prefix (str, optional): Prefix for widget keys. Defaults to "library".
+    """
+    library = get_library()
+    course = current_course()
+    
+    with st.expander("Search Your Library", expanded=False):
+        counts = library.stats(course)
+        if counts:
+            summary = ", ".join(f"{count} {LIBRARY_KINDS[kind].lower()}" for kind, count in counts.items())
+            st.caption(f"{course}: {summary}")
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            query = st.text_input("Search your materials:", key=f"{key_prefix}_query",
+                                  placeholder="e.g., light-dependent reactions")
+        with col2:
+            all_courses = st.checkbox("All courses", key=f"{key_prefix}_all_courses")
+        
+        if not query:
+            return
+        
+        hits = library.search(query, course=None if all_courses else course)
+        if not hits:
+            st.info("No matching materials found.")
+            return
+        
+        for hit in hits:
+            st.markdown(f"**{hit.title}** - {LIBRARY_KINDS[hit.kind]}, {hit.course}")
+            st.markdown(hit.snippet)
+            # Full text is only loaded when asked for
+            if st.checkbox("Show full text", key=f"{key_prefix}_show_{hit.id}"):
+                item = library.get(hit.id)
+                if item is not None:
+                    st.markdown(item["content"])
+            st.markdown("---")
@@ -4,14 +4,20 @@ This provides functionality for analyzing educational audio content.
 """
 
 import streamlit as st
-from services.gemini_service import generate_text_content
-from services.audio_service import process_audio_file
-from utils.prompt_utils import create_audio_analysis_prompt
-from utils.file_utils import save_uploaded_file, TempFileManager
+from services.gemini_service import generate_text_content, summarize_conversation, ERROR_RESPONSE_PREFIX
+from services.batch_service import run_batch, prepare_audio
+from utils.prompt_utils import create_audio_analysis_prompt, create_media_chat_prompt
+from utils.conversation_utils import ConversationBuffer
+from utils.file_utils import TempFileManager
 from config.settings import ALLOWED_EXTENSIONS
+from services.library_service import add_to_library
+from ui.components import checked_uploads, current_course
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Audio Analysis page."""
+    set_profiling_page("Audio Analysis")
+
     # Reset chat history if switching to this mode
     if st.session_state.current_mode != "Audio Analysis":
         st.session_state.chat_history = []
@@ -23,17 +29,28 @@ def render():
     # Initialize audio chat history if not exists
     if "audio_chat_history" not in st.session_state:
         st.session_state.audio_chat_history = []
+    if "audio_chat_buffer" not in st.session_state:
+        st.session_state.audio_chat_buffer = ConversationBuffer(summarizer=summarize_conversation)
     
     # Page header
     st.markdown("### Audio Learning Assistant")
     st.markdown("Upload audio files for transcription, analysis, and educational insights")
     
     # Audio upload section
-    uploaded_audio = st.file_uploader("Upload an audio file:", type=ALLOWED_EXTENSIONS['audio'])
+    uploaded_audios = st.file_uploader(
+        "Upload audio files:",
+        type=ALLOWED_EXTENSIONS['audio'],
+        accept_multiple_files=True
+    )
+
+    # Reject files whose content does not match their extension
+    uploaded_audios = checked_uploads(uploaded_audios)
     
-    if uploaded_audio is not None:
-        # Display audio player
-        st.audio(uploaded_audio, format="audio/mp3")
+    if uploaded_audios:
+        # Display audio players
+        for uploaded_audio in uploaded_audios:
+            st.caption(uploaded_audio.name)
+            st.audio(uploaded_audio, format=uploaded_audio.type or "audio/mp3")
         
         # Analysis options
         analysis_options = st.multiselect(
@@ -66,51 +83,65 @@ def render():
         )
         
         # Process audio when button is clicked
-        if st.button("Analyze Audio", use_container_width=True):
+        button_label = "Analyze Audio" if len(uploaded_audios) == 1 else f"Analyze {len(uploaded_audios)} Audio Files"
+        if st.button(button_label, use_container_width=True):
             with st.spinner("Processing audio..."):
-                try:
-                    # Use context manager for temporary file handling
-                    with TempFileManager() as temp_manager:
-                        # Save uploaded file
-                        temp_file_path = temp_manager.save_uploaded_file(uploaded_audio)
-                        
-                        # Process audio file
-                        audio_info = process_audio_file(temp_file_path, uploaded_audio.name)
-                        
+                # Uploads are released from the shared store when the block exits
+                with TempFileManager() as temp_manager:
+                    # Save uploaded files to the shared upload store
+                    files = []
+                    for uploaded_audio in uploaded_audios:
+                        try:
+                            files.append((temp_manager.save_uploaded_file(uploaded_audio), uploaded_audio.name))
+                        except ValueError as e:
+                            st.error(f"{uploaded_audio.name}: {str(e)}")
+                    
+                    # Read in this thread; the analyses run in worker threads
+                    course = current_course()
+                    kind = "transcript" if "Transcription" in analysis_options else "audio"
+                    
+                    def analyze(file_path, file_name, prepared):
                         # Create prompt for audio analysis
                         analysis_prompt = create_audio_analysis_prompt(
-                            audio_name=uploaded_audio.name,
+                            audio_name=file_name,
                             analysis_types=analysis_options,
                             language=language
                         )
+                        response_text = generate_text_content(
+                            prompt=analysis_prompt,
+                            temperature=0.2,  # Lower temperature for more factual responses
+                            show_errors=False  # Runs on a worker thread; failures are shown below
+                        )
+                        
+                        # Keep the transcript or analysis in the course library
+                        add_to_library(kind, file_name, response_text, course)
+                        return response_text
+                    
+                    # One placeholder per file, filled in as its analysis finishes
+                    placeholders = [st.empty() for _ in files]
+                    for index, _, response_text in run_batch(files, prepare_audio, analyze):
+                        file_name = files[index][1]
+                        placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                        if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                            st.error(f"{file_name}: {response_text}")
                         
                         # Add to history
                         st.session_state.chat_history.append({
                             "role": "user", 
-                            "content": f"[Audio uploaded] Please analyze with: {', '.join(analysis_options)}"
+                            "content": f"[Audio uploaded: {file_name}] Please analyze with: {', '.join(analysis_options)}"
                         })
-                        
-                        # Generate content analysis
-                        response_text = generate_text_content(
-                            prompt=analysis_prompt,
-                            temperature=0.2  # Lower temperature for more factual responses
-                        )
-                        
-                        # Add response to chat history
                         st.session_state.chat_history.append({
                             "role": "assistant", 
                             "content": response_text
                         })
-                        
-                        # Show audio chat interface
-                        display_audio_chat(uploaded_audio.name)
+                    
+                    # The results are shown with the history below
+                    for placeholder in placeholders:
+                        placeholder.empty()
                 
-                except Exception as e:
-                    st.error(f"Error analyzing audio: {str(e)}")
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": f"I apologize, but I encountered an error: {str(e)}"
-                    })
+                # Show audio chat interface for the first file
+                if files:
+                    display_audio_chat(files[0][1])
     
     # Display audio analysis history
     st.markdown("### Analysis Results")
@@ -155,8 +186,13 @@ def display_audio_chat(audio_name):
                 "content": audio_chat_input
             })
             
-            # Generate audio chat response
-            prompt = f"Regarding the audio file '{audio_name}', the user asks: {audio_chat_input}"
+            # Generate audio chat response with earlier turns as context
+            st.session_state.audio_chat_buffer.sync(
+                st.session_state.audio_chat_history, end=len(st.session_state.audio_chat_history) - 1
+            )
+            prompt = create_media_chat_prompt(
+                "audio", audio_name, audio_chat_input, st.session_state.audio_chat_buffer
+            )
             
             try:
                 # Generate content
@@ -5,10 +5,17 @@ This provides functionality for creating concept maps for educational topics.
 
 import streamlit as st
 from services.gemini_service import generate_text_content
-from utils.prompt_utils import create_concept_mapping_prompt
+from utils.prompt_utils import (
+    create_concept_mapping_prompt,
+    create_concept_map_customization_prompt,
+    create_mermaid_diagram_prompt
+)
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Concept Mapper page."""
+    set_profiling_page("Concept Mapper")
+
     # Reset state if switching to this mode
     if st.session_state.current_mode != "Concept Mapper":
         st.session_state.current_mode = "Concept Mapper"
@@ -102,37 +109,20 @@ def render():
                     if related_concepts:
                         related_concepts_list = [concept.strip() for concept in related_concepts.split('\n') if concept.strip()]
                     
-                    # Create additional context from advanced options
-                    additional_context = f"\nTarget educational level: {educational_level}"
-                    
-                    if map_format:
-                        additional_context += f"\nUse a {map_format.lower()} map format."
-                    
-                    if specific_focus:
-                        additional_context += f"\nFocus specifically on: {specific_focus}"
-                    
-                    if include_examples:
-                        additional_context += "\nInclude relevant examples for key concepts."
-                    
-                    if include_definitions:
-                        additional_context += "\nInclude concise definitions for each concept."
-                    
-                    if additional_instructions:
-                        additional_context += f"\nAdditional instructions: {additional_instructions}"
-                    
-                    # Create prompt for concept mapping
+                    # Create prompt for concept mapping, including a Mermaid diagram
                     prompt = create_concept_mapping_prompt(
                         topic=main_concept,
                         complexity=complexity,
-                        related_concepts=related_concepts_list
+                        related_concepts=related_concepts_list,
+                        educational_level=educational_level,
+                        map_format=map_format,
+                        specific_focus=specific_focus,
+                        include_examples=include_examples,
+                        include_definitions=include_definitions,
+                        additional_instructions=additional_instructions,
+                        include_mermaid=True
                     )
                     
-                    # Add additional context
-                    prompt += additional_context
-                    
-                    # Add request for Mermaid diagram
-                    prompt += "\n\nYour response should include:\n1. A brief explanation of the concept map\n2. A textual representation of the relationships\n3. A Mermaid.js diagram code for visualizing the concept map (use flowchart or graph syntax)"
-                    
                     # Generate concept map content
                     map_content = generate_text_content(
                         prompt=prompt,
@@ -204,13 +194,7 @@ def display_concept_map(map_data):
             st.warning("No diagram code found in the generated content. Generating visualization...")
             
             # Request specifically a Mermaid diagram
-            visualization_prompt = f"""
-            Create a Mermaid.js diagram code (using flowchart or graph syntax) to visualize the following concept map about {metadata['main_concept']}:
-            
-            {content}
-            
-            Return ONLY the Mermaid code (no explanations), starting with the word 'graph' or 'flowchart'.
-            """
+            visualization_prompt = create_mermaid_diagram_prompt(metadata['main_concept'], content)
             
             try:
                 mermaid_code = generate_text_content(visualization_prompt, temperature=0.1)
@@ -276,17 +260,9 @@ def display_concept_map(map_data):
                 # Prepare customization prompt
                 instruction = customization_option if customization_option != "Custom modification" else custom_instruction
                 
-                customization_prompt = f"""
-                I have a concept map for '{metadata['main_concept']}' with the following specifications:
-                - Complexity level: {metadata['complexity']}
-                - Educational level: {metadata['educational_level']}
-                - Format: {metadata['map_format']}
-                
-                Here is the current concept map:
-                {map_data['content']}
-                
-                Please modify this concept map to {instruction}. Maintain the same overall structure and include a Mermaid.js diagram code.
-                """
+                customization_prompt = create_concept_map_customization_prompt(
+                    metadata, map_data['content'], instruction
+                )
                 
                 # Generate customized concept map
                 customized_content = generate_text_content(
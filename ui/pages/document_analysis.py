@@ -4,15 +4,31 @@ This provides functionality for analyzing educational documents.
 """
 
 import streamlit as st
-import tempfile
-import os
-from services.gemini_service import generate_text_content
-from services.document_service import process_document
-from utils.file_utils import save_uploaded_file, get_file_preview
-from config.settings import ALLOWED_EXTENSIONS
+from services.gemini_service import generate_text_content, ERROR_RESPONSE_PREFIX
+from services.batch_service import run_batch, prepare_document
+from services.document_service import (
+    generate_summary,
+    extract_key_concepts,
+    iter_document_blocks,
+    save_document_analysis
+)
+from services.document_index import retrieve_document_chunks
+from services.near_duplicate_service import (
+    find_saved_analysis,
+    find_near_duplicate_analysis,
+    register_document
+)
+from services.library_service import add_to_library, add_document_to_library
+from utils.file_utils import TempFileManager, file_sha256
+from utils.prompt_utils import create_document_analysis_prompt, create_document_qa_prompt
+from config.settings import ALLOWED_EXTENSIONS, DOCUMENT_QA_TOP_K
+from ui.components import checked_uploads, chat_input_area, current_course
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Document Analysis page."""
+    set_profiling_page("Document Analysis")
+
     # Reset chat history if switching to this mode
     if st.session_state.current_mode != "Document Analysis":
         st.session_state.chat_history = []
@@ -23,12 +39,16 @@ def render():
     st.markdown("Upload study materials, textbooks, or notes for AI analysis and insights")
     
     # Document upload section
-    uploaded_file = st.file_uploader(
-        "Upload a document (PDF, DOCX, or TXT):", 
-        type=ALLOWED_EXTENSIONS['document']
+    uploaded_files = st.file_uploader(
+        "Upload documents (PDF, DOCX, or TXT):", 
+        type=ALLOWED_EXTENSIONS['document'],
+        accept_multiple_files=True
     )
     
-    if uploaded_file is not None:
+    # Reject files whose content does not match their extension
+    uploaded_files = checked_uploads(uploaded_files)
+    
+    if uploaded_files:
         # Analysis options
         analysis_type = st.multiselect(
             "Select analysis types:", 
@@ -41,56 +61,155 @@ def render():
             ]
         )
         
-        # Process document when button is clicked
-        if st.button("Analyze Document", use_container_width=True):
-            with st.spinner("Analyzing document..."):
-                try:
-                    # Save uploaded file to a temporary location
-                    temp_file_path = save_uploaded_file(uploaded_file)
+        # Offer saved analyses of the same files; near duplicates are found when analyzing
+        for file_index, uploaded_file in enumerate(uploaded_files):
+            saved = find_saved_analysis(uploaded_file, analysis_type)
+            if saved is None:
+                continue
+            st.info(f"**{uploaded_file.name}** was analyzed earlier for the same analysis types.")
+            if st.button(f"Use Earlier Analysis of {uploaded_file.name}", key=f"reuse_analysis_{file_index}"):
+                st.session_state.chat_history.append({
+                    "role": "user", 
+                    "content": f"Please analyze my document '{uploaded_file.name}' for: {', '.join(analysis_type)}"
+                })
+                st.session_state.chat_history.append({
+                    "role": "assistant", 
+                    "content": saved["response"]
+                })
+        
+        reuse_similar = st.checkbox(
+            "Reuse analyses of nearly identical documents", value=False,
+            help="Another scan, export or revision of a document analyzed earlier is answered from that analysis"
+        )
+        
+        # Process documents when button is clicked
+        button_label = "Analyze Document" if len(uploaded_files) == 1 else f"Analyze {len(uploaded_files)} Documents"
+        if st.button(button_label, use_container_width=True):
+            with st.spinner("Analyzing documents..."):
+                # Uploads are released from the shared store when the block exits
+                with TempFileManager() as temp_manager:
+                    # Save uploaded files to the shared upload store
+                    files = []
+                    for uploaded_file in uploaded_files:
+                        try:
+                            files.append((temp_manager.save_uploaded_file(uploaded_file), uploaded_file.name))
+                        except ValueError as e:
+                            st.error(f"{uploaded_file.name}: {str(e)}")
                     
-                    # Get a preview of the document content
-                    file_content_preview = get_file_preview(temp_file_path, max_length=1000)
+                    # Read in this thread; the analyses run in worker threads
+                    course = current_course()
                     
-                    # Create prompt with analysis instructions
-                    analysis_prompt = f"I'm uploading a document named '{uploaded_file.name}'. "
-                    analysis_prompt += f"Please perform the following analyses: {', '.join(analysis_type)}. "
-                    analysis_prompt += "Here's a preview of the document content: " + file_content_preview
+                    def generate_analysis(file_path, file_name, prepared, sha256):
+                        # Summarize the whole document, not just the preview, when asked to
+                        document_summary = None
+                        if "Summary Generation" in analysis_type:
+                            document_summary = generate_summary(
+                                iter_document_blocks(file_path), document_name=file_name
+                            )
+                        
+                        # Locally ranked concepts give the model a head start
+                        document_metadata = prepared["info"]
+                        if "Key Concepts Extraction" in analysis_type:
+                            concepts = extract_key_concepts(
+                                iter_document_blocks(file_path), count=10, document_id=sha256
+                            )
+                            document_metadata = dict(document_metadata, candidate_key_concepts=", ".join(concepts))
+                        
+                        # Create prompt with analysis instructions from the extracted preview
+                        analysis_prompt = create_document_analysis_prompt(
+                            document_name=file_name,
+                            analysis_types=analysis_type,
+                            document_preview=prepared["preview"],
+                            document_metadata=document_metadata,
+                            document_summary=document_summary
+                        )
+                        return generate_text_content(
+                            prompt=analysis_prompt,
+                            temperature=0.2,  # Lower temperature for more factual responses
+                            show_errors=False  # Runs on a worker thread; failures are shown below
+                        )
                     
-                    # Add to history
-                    st.session_state.chat_history.append({
-                        "role": "user", 
-                        "content": f"Please analyze my document '{uploaded_file.name}' for: {', '.join(analysis_type)}"
-                    })
+                    def analyze(file_path, file_name, prepared):
+                        sha256 = file_sha256(file_path)
+                        
+                        # A nearly identical document analyzed earlier is answered instantly
+                        earlier = None
+                        if reuse_similar:
+                            earlier = find_near_duplicate_analysis(file_path, sha256, analysis_type)
+                        if earlier is not None:
+                            match, saved = earlier
+                            # Already saved under the earlier document, so nothing is stored again
+                            add_document_to_library(file_path, sha256, file_name, course)
+                            return (f"*Reused the analysis of {saved['document_name']}, "
+                                    f"which is {match.similarity:.0%} similar.*\n\n{saved['response']}")
+                        
+                        response_text = generate_analysis(file_path, file_name, prepared, sha256)
+                        
+                        # Remember the analysis for later uploads of this or a revised version
+                        save_document_analysis(sha256, analysis_type, file_name, response_text)
+                        register_document(file_path, sha256, file_name)
+                        
+                        # Keep the document and its analysis in the course library
+                        add_document_to_library(file_path, sha256, file_name, course)
+                        add_to_library("analysis", f"Analysis of {file_name}", response_text, course)
+                        return response_text
                     
-                    # Process document and generate content
-                    document_info = process_document(temp_file_path, uploaded_file.name)
-                    analysis_prompt += f"\n\nDocument metadata: {document_info}"
+                    # One placeholder per document, filled in as its analysis finishes
+                    placeholders = [st.empty() for _ in files]
+                    for index, _, response_text in run_batch(files, prepare_document, analyze):
+                        file_name = files[index][1]
+                        placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                        if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                            st.error(f"{file_name}: {response_text}")
+                        
+                        # Add to history
+                        st.session_state.chat_history.append({
+                            "role": "user", 
+                            "content": f"Please analyze my document '{file_name}' for: {', '.join(analysis_type)}"
+                        })
+                        st.session_state.chat_history.append({
+                            "role": "assistant", 
+                            "content": response_text
+                        })
+                    
+                    # The results are shown with the history below
+                    for placeholder in placeholders:
+                        placeholder.empty()
+        
+        # Questions are answered from the most relevant passages only
+        st.markdown("### Ask About Your Documents")
+        question, ask_button = chat_input_area(
+            key_prefix="document_qa",
+            placeholder="e.g., How does the author define opportunity cost?"
+        )
+        
+        if ask_button and question:
+            with st.spinner("Searching your documents..."):
+                # Add to history
+                st.session_state.chat_history.append({"role": "user", "content": question})
+                
+                try:
+                    with TempFileManager() as temp_manager:
+                        documents = []
+                        for uploaded_file in uploaded_files:
+                            try:
+                                documents.append((temp_manager.save_uploaded_file(uploaded_file), uploaded_file.name))
+                            except ValueError as e:
+                                st.error(f"{uploaded_file.name}: {str(e)}")
+                        
+                        # Indexes are built once per document and reused afterwards
+                        excerpts = retrieve_document_chunks(documents, question, DOCUMENT_QA_TOP_K)
                     
-                    # Generate content analysis
                     response_text = generate_text_content(
-                        prompt=analysis_prompt,
-                        temperature=0.2  # Lower temperature for more factual responses
+                        prompt=create_document_qa_prompt(question, excerpts),
+                        temperature=0.2
                     )
-                    
-                    # Add response to chat history
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": response_text
-                    })
-                    
-                    # Clean up the temporary file
-                    os.unlink(temp_file_path)
                 
                 except Exception as e:
-                    st.error(f"Error analyzing document: {str(e)}")
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": f"I apologize, but I encountered an error: {str(e)}"
-                    })
-                    
-                    # Ensure temporary file is cleaned up even if error occurs
-                    if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
+                    st.error(f"Error answering question: {str(e)}")
+                    response_text = f"I apologize, but I encountered an error: {str(e)}"
+                
+                st.session_state.chat_history.append({"role": "assistant", "content": response_text})
     
     # Display analysis history
     st.markdown("### Analysis Results")
@@ -4,12 +4,28 @@ This provides a chat-based interface for asking educational questions.
 """
 
 import streamlit as st
-from services.gemini_service import generate_text_content, generate_multimodal_content
+from services.gemini_service import (
+    generate_text_content, generate_multimodal_content, summarize_conversation, ERROR_RESPONSE_PREFIX
+)
+from utils.answer_cache import get_answer_cache
+from utils.file_utils import get_upload_buffer
+from utils.conversation_utils import ConversationBuffer
+from utils.prompt_utils import create_learning_assistant_prompt
+from utils.prompt_templates import get_template
 from ui.styles import render_chat_history
-from ui.components import chat_input_area, media_upload_area, learning_settings_expander
+from ui.components import (
+    chat_input_area,
+    media_upload_area,
+    learning_settings_expander,
+    reading_level_caption,
+    library_search_panel
+)
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Learning Assistant page."""
+    set_profiling_page("Learning Assistant")
+
     # Reset chat history if switching to this mode
     if st.session_state.current_mode != "Learning Assistant":
         st.session_state.tutor_messages = []
@@ -28,10 +44,17 @@ def render():
     # Learning settings section
     settings = learning_settings_expander()
     
+    # Earlier analyses, transcripts and quizzes of the course
+    library_search_panel(key_prefix="tutor_library")
+    
     # Display chat messages
     chat_container = st.container()
     with chat_container:
         render_chat_history(st.session_state.tutor_messages)
+        
+        # Reading level of the latest answer, computed locally
+        if len(st.session_state.tutor_messages) > 1 and st.session_state.tutor_messages[-1]["role"] == "assistant":
+            reading_level_caption(st.session_state.tutor_messages[-1]["content"], settings["learning_level"])
     
     # Chat input area
     st.markdown("<br>", unsafe_allow_html=True)
@@ -48,43 +71,63 @@ def render():
         # Add user message to chat
         st.session_state.tutor_messages.append({"role": "user", "content": user_input})
         
-        # Create system context based on selected options
-        system_context = f"You are EduGenius, an educational AI tutor. Adapt your explanation for {settings['learning_level']} level students. Use a {settings['learning_style']} learning style in your response."
-        
-        # Create conversation history for context
-        conversation_history = ""
-        if settings['memory_option'] and len(st.session_state.tutor_messages) > 1:
-            for msg in st.session_state.tutor_messages[:-1]:  # Exclude the current message
-                role = "User" if msg["role"] == "user" else "EduGenius"
-                conversation_history += f"{role}: {msg['content']}\n\n"
-        
-        # Create complete prompt
-        if conversation_history:
-            prompt = f"{system_context}\n\nConversation history:\n{conversation_history}\n\nCurrent question: {user_input}"
-        else:
-            prompt = f"{system_context}\n\nStudent question: {user_input}"
+        # Keep the serialized conversation history in sync with the chat,
+        # excluding the message that was just added
+        if "tutor_buffer" not in st.session_state:
+            st.session_state.tutor_buffer = ConversationBuffer(summarizer=summarize_conversation)
+        st.session_state.tutor_buffer.sync(
+            st.session_state.tutor_messages, end=len(st.session_state.tutor_messages) - 1
+        )
         
         # Check if there's a multimedia upload to process
         has_multimedia = False
         media_type = None
         media_bytes = None
+        uploaded_media = None
         
         if hasattr(st.session_state, 'tutor_current') and st.session_state.tutor_current is not None:
             has_multimedia = True
             media_type = st.session_state.tutor_current["type"].lower()
-            media_bytes = st.session_state.tutor_current["file"].getvalue()
+            uploaded_media = (media_type, st.session_state.tutor_current['name'])
             
-            # Add multimedia context to prompt
-            prompt += f"\n\nNote: The student has also uploaded a {media_type} file named '{st.session_state.tutor_current['name']}'. Please incorporate this into your response if relevant."
+            # Only images are sent with the prompt; view the upload without copying it
+            if media_type == "image":
+                media_bytes = get_upload_buffer(st.session_state.tutor_current["file"])
+        
+        # Create complete prompt
+        prompt = create_learning_assistant_prompt(
+            question=user_input,
+            learning_level=settings['learning_level'],
+            learning_style=settings['learning_style'],
+            chat_history=st.session_state.tutor_buffer if settings['memory_option'] else None,
+            uploaded_media=uploaded_media
+        )
+        
+        # Standalone questions (no media, no earlier student turns in context)
+        # can be answered from the shared answer cache
+        has_prior_turns = settings['memory_option'] and any(
+            msg["role"] == "user" for msg in st.session_state.tutor_messages[:-1]
+        )
+        is_standalone = not has_multimedia and not has_prior_turns
+        answer_cache = get_answer_cache()
+        template_key = get_template("learning_assistant").cache_key
+        cached_answer = None
+        if is_standalone:
+            cached_answer = answer_cache.get(
+                user_input, settings['learning_level'], settings['learning_style'],
+                context_key=template_key
+            )
         
         with st.spinner("Thinking..."):
             try:
                 # Generate response based on whether there's multimedia
-                if has_multimedia and media_type == "image":
+                if cached_answer is not None:
+                    response_text = cached_answer
+                elif has_multimedia and media_type == "image":
                     response_text = generate_multimodal_content(
                         prompt=prompt,
                         media_data=media_bytes,
-                        media_type="image/jpeg",  # Adjust based on actual file type
+                        media_type=st.session_state.tutor_current["file"].type or "image/jpeg",
                         temperature=0.7
                     )
                 else:
@@ -93,6 +136,16 @@ def render():
                         prompt=prompt,
                         temperature=0.7
                     )
+                    
+                    # Remember successful standalone answers for other students
+                    if is_standalone and not response_text.startswith(ERROR_RESPONSE_PREFIX):
+                        answer_cache.put(
+                            user_input,
+                            settings['learning_level'],
+                            settings['learning_style'],
+                            response_text,
+                            context_key=template_key
+                        )
                 
                 # Add AI response to chat
                 st.session_state.tutor_messages.append({"role": "assistant", "content": response_text})
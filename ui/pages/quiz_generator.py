@@ -6,10 +6,15 @@ This provides functionality for generating educational quizzes.
 import streamlit as st
 import json
 from services.gemini_service import generate_text_content
-from utils.prompt_utils import create_quiz_generation_prompt
+from utils.prompt_utils import create_quiz_generation_prompt, create_quiz_customization_prompt
+from services.library_service import add_to_library
+from utils.prompt_profiler import set_profiling_page
+from ui.components import reading_level_caption, current_course
 
 def render():
     """Render the Quiz Generator page."""
+    set_profiling_page("Quiz Generator")
+
     # Reset state if switching to this mode
     if st.session_state.current_mode != "Quiz Generator":
         st.session_state.current_mode = "Quiz Generator"
@@ -87,33 +92,26 @@ def render():
         else:
             with st.spinner(f"Creating {difficulty} level quiz on {quiz_topic}..."):
                 try:
-                    # Create additional context from advanced options
-                    additional_context = ""
-                    if specific_focus:
-                        additional_context += f"\nFocus specifically on: {specific_focus}"
-                    if educational_standards:
-                        additional_context += f"\nAlign with these educational standards: {educational_standards}"
-                    if additional_instructions:
-                        additional_context += f"\nAdditional instructions: {additional_instructions}"
-                    
                     # Create prompt for quiz generation
                     prompt = create_quiz_generation_prompt(
                         topic=quiz_topic,
                         difficulty=difficulty,
                         question_count=question_count,
-                        format_type=format_type
+                        format_type=format_type,
+                        specific_focus=specific_focus,
+                        standards=educational_standards,
+                        additional_instructions=additional_instructions
                     )
                     
-                    # Add additional context if any
-                    if additional_context:
-                        prompt += additional_context
-                    
                     # Generate quiz content
                     quiz_content = generate_text_content(
                         prompt=prompt,
                         temperature=0.3  # Lower temperature for more consistent quiz generation
                     )
                     
+                    # Keep the quiz in the course library
+                    add_to_library("quiz", f"Quiz: {quiz_topic}", quiz_content, current_course())
+                    
                     # Store generated quiz in session state
                     st.session_state.generated_quiz = {
                         "content": quiz_content,
@@ -156,6 +154,9 @@ def display_generated_quiz(quiz_data):
     with st.container():
         st.markdown(quiz_data["content"])
     
+    # Check the reading level against the requested difficulty without another API call
+    reading_level_caption(quiz_data["content"], metadata["difficulty"])
+    
     # Export options
     st.markdown("### Export Options")
     
@@ -219,17 +220,9 @@ def display_generated_quiz(quiz_data):
                 # Prepare customization prompt
                 instruction = customization_option if customization_option != "Custom modification" else custom_instruction
                 
-                customization_prompt = f"""
-                I have a quiz on {metadata['topic']} with the following specifications:
-                - Difficulty level: {metadata['difficulty']}
-                - Question format: {metadata['format']}
-                - Question count: {metadata['question_count']}
-                
-                Here is the current quiz:
-                {quiz_data['content']}
-                
-                Please modify this quiz to {instruction}. Maintain the same overall structure and format.
-                """
+                customization_prompt = create_quiz_customization_prompt(
+                    metadata, quiz_data['content'], instruction
+                )
                 
                 # Generate customized quiz
                 customized_content = generate_text_content(
@@ -4,14 +4,19 @@ This provides functionality for analyzing educational video content.
 """
 
 import streamlit as st
-from services.gemini_service import generate_text_content
+from services.gemini_service import generate_text_content, summarize_conversation
 from services.video_service import process_video_file, identify_key_video_moments, generate_video_timestamps
-from utils.prompt_utils import create_video_analysis_prompt
-from utils.file_utils import save_uploaded_file, TempFileManager
+from utils.prompt_utils import create_video_analysis_prompt, create_media_chat_prompt, create_video_quiz_prompt
+from utils.conversation_utils import ConversationBuffer
+from utils.file_utils import TempFileManager
 from config.settings import ALLOWED_EXTENSIONS
+from ui.components import checked_upload
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Video Learning page."""
+    set_profiling_page("Video Learning")
+
     # Reset chat history if switching to this mode
     if st.session_state.current_mode != "Video Learning":
         st.session_state.chat_history = []
@@ -23,6 +28,8 @@ def render():
     # Initialize video chat history if not exists
     if "video_chat_history" not in st.session_state:
         st.session_state.video_chat_history = []
+    if "video_chat_buffer" not in st.session_state:
+        st.session_state.video_chat_buffer = ConversationBuffer(summarizer=summarize_conversation)
     
     # Page header
     st.markdown("### Video Learning Assistant")
@@ -30,11 +37,13 @@ def render():
     
     # Video upload section
     uploaded_video = st.file_uploader("Upload a video file:", type=ALLOWED_EXTENSIONS['video'])
+
+    # Reject files whose content does not match their extension
+    uploaded_video = checked_upload(uploaded_video)
     
     if uploaded_video is not None:
         # Display video player
-        video_bytes = uploaded_video.getvalue()
-        st.video(video_bytes)
+        st.video(uploaded_video)
         
         # Analysis options
         video_analysis_options = st.multiselect(
@@ -177,8 +186,13 @@ def display_video_chat(video_name):
                 "content": video_chat_input
             })
             
-            # Generate video chat response
-            prompt = f"Regarding the video file '{video_name}', the user asks: {video_chat_input}"
+            # Generate video chat response with earlier turns as context
+            st.session_state.video_chat_buffer.sync(
+                st.session_state.video_chat_history, end=len(st.session_state.video_chat_history) - 1
+            )
+            prompt = create_media_chat_prompt(
+                "video", video_name, video_chat_input, st.session_state.video_chat_buffer
+            )
             
             try:
                 # Generate content
@@ -266,9 +280,7 @@ def display_video_quiz_generator(video_name):
         with st.spinner("Creating quiz..."):
             try:
                 # Generate video quiz prompt
-                prompt = f"""Create a {quiz_question_count}-question educational quiz based on the video '{video_name}'. 
-Use {quiz_format} format. Include questions that assess understanding of key concepts, 
-visual elements, and important points from the video. Include answers and explanations."""
+                prompt = create_video_quiz_prompt(video_name, quiz_question_count, quiz_format)
                 
                 # Generate quiz content
                 quiz_content = generate_text_content(
@@ -4,13 +4,19 @@ This provides functionality for analyzing images and visual content.
 """
 
 import streamlit as st
-from PIL import Image
-from services.gemini_service import generate_multimodal_content
+from services.gemini_service import generate_multimodal_content, summarize_conversation, ERROR_RESPONSE_PREFIX
+from services.batch_service import run_batch, prepare_image
 from ui.styles import render_chat_history
-from ui.components import chat_input_area
+from ui.components import chat_input_area, checked_uploads
+from utils.conversation_utils import ConversationBuffer
+from utils.file_utils import TempFileManager, get_upload_buffer
+from utils.prompt_utils import create_media_chat_prompt, create_image_analysis_prompt
+from utils.prompt_profiler import set_profiling_page
 
 def render():
     """Render the Visual Learning page."""
+    set_profiling_page("Visual Learning")
+
     # Reset chat history if switching to this mode
     if st.session_state.current_mode != "Visual Learning":
         st.session_state.chat_history = []
@@ -22,18 +28,22 @@ def render():
     # Initialize image chat history if not exists
     if "image_chat_history" not in st.session_state:
         st.session_state.image_chat_history = []
+    if "image_chat_buffer" not in st.session_state:
+        st.session_state.image_chat_buffer = ConversationBuffer(summarizer=summarize_conversation)
     
     # Page header
     st.markdown("### Visual Learning Assistant")
     st.markdown("Upload images of diagrams, problems, or visual concepts for AI explanation")
     
     # Image upload section
-    uploaded_image = st.file_uploader("Upload an image:", type=["jpg", "jpeg", "png"])
+    uploaded_images = st.file_uploader("Upload images:", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+
+    # Reject files whose content does not match their extension
+    uploaded_images = checked_uploads(uploaded_images)
     
-    if uploaded_image is not None:
-        # Display the uploaded image
-        image = Image.open(uploaded_image)
-        st.image(image, caption="Uploaded Image", use_column_width=True)
+    if uploaded_images:
+        # Display the uploaded images
+        st.image(uploaded_images, caption=[f.name for f in uploaded_images], use_column_width=True)
         
         # Query type selection
         query_type = st.radio(
@@ -56,6 +66,16 @@ def render():
         st.markdown("### Image Chat")
         st.info("You can have a conversation about this image by entering questions below.")
         
+        # The chat is about one image at a time
+        uploaded_image = uploaded_images[0]
+        if len(uploaded_images) > 1:
+            chat_index = st.selectbox(
+                "Image to chat about:",
+                range(len(uploaded_images)),
+                format_func=lambda i: uploaded_images[i].name
+            )
+            uploaded_image = uploaded_images[chat_index]
+        
         # Display image chat history
         chat_container = st.container()
         with chat_container:
@@ -72,16 +92,24 @@ def render():
             # Add to image chat history
             st.session_state.image_chat_history.append({"role": "user", "content": image_chat_input})
             
+            # Earlier turns about this image, summarized once they grow long
+            st.session_state.image_chat_buffer.sync(
+                st.session_state.image_chat_history, end=len(st.session_state.image_chat_history) - 1
+            )
+            image_chat_prompt = create_media_chat_prompt(
+                "image", uploaded_image.name, image_chat_input, st.session_state.image_chat_buffer
+            )
+            
             with st.spinner("Analyzing..."):
                 try:
-                    # Convert image for API
-                    img_byte_arr = uploaded_image.getvalue()
+                    # View the upload without copying it
+                    img_byte_arr = get_upload_buffer(uploaded_image)
                     
                     # Generate multimodal content
                     response_text = generate_multimodal_content(
-                        prompt=image_chat_input,
+                        prompt=image_chat_prompt,
                         media_data=img_byte_arr,
-                        media_type="image/jpeg",  # Adjust based on actual file type
+                        media_type=uploaded_image.type or "image/jpeg",
                         temperature=0.2
                     )
                     
@@ -100,38 +128,51 @@ def render():
                     st.experimental_rerun()
         
         # Main image analysis button
-        if st.button("Analyze Image", use_container_width=True, key="main_analysis"):
-            with st.spinner("Analyzing image..."):
-                try:
-                    # Create prompt with image query
-                    image_prompt = f"{query_type}: {specific_question}" if specific_question else query_type
+        button_label = "Analyze Image" if len(uploaded_images) == 1 else f"Analyze {len(uploaded_images)} Images"
+        if st.button(button_label, use_container_width=True, key="main_analysis"):
+            with st.spinner("Analyzing images..."):
+                # Describe the image request for the history
+                image_prompt = f"{query_type}: {specific_question}" if specific_question else query_type
+                analysis_prompt = create_image_analysis_prompt(query_type, specific_question)
+                
+                # Uploads are released from the shared store when the block exits
+                with TempFileManager() as temp_manager:
+                    # Save uploaded images to the shared upload store
+                    files = []
+                    for image_file in uploaded_images:
+                        try:
+                            files.append((temp_manager.save_uploaded_file(image_file), image_file.name))
+                        except ValueError as e:
+                            st.error(f"{image_file.name}: {str(e)}")
                     
-                    # Add to history
-                    st.session_state.chat_history.append({
-                        "role": "user", 
-                        "content": f"[Image uploaded] {image_prompt}"
-                    })
+                    def analyze(file_path, file_name, prepared):
+                        # Passed by path: read once when the request is built, or sent through the Files API if large
+                        return generate_multimodal_content(
+                            prompt=analysis_prompt,
+                            media_data=file_path,
+                            media_type=prepared["info"].get("mime_type", "image/jpeg"),
+                            temperature=0.2,
+                            show_errors=False  # Runs on a worker thread; failures are shown below
+                        )
                     
-                    # Get image data
-                    img_byte_arr = uploaded_image.getvalue()
+                    # One placeholder per image, filled in as its analysis finishes
+                    placeholders = [st.empty() for _ in files]
+                    for index, _, response_text in run_batch(files, prepare_image, analyze):
+                        file_name = files[index][1]
+                        placeholders[index].markdown(f"**{file_name}**\n\n{response_text}")
+                        if response_text.startswith(ERROR_RESPONSE_PREFIX):
+                            st.error(f"{file_name}: {response_text}")
+                        
+                        # Add to history
+                        st.session_state.chat_history.append({
+                            "role": "user", 
+                            "content": f"[Image uploaded: {file_name}] {image_prompt}"
+                        })
+                        st.session_state.chat_history.append({"role": "assistant", "content": response_text})
                     
-                    # Generate multimodal content
-                    response_text = generate_multimodal_content(
-                        prompt=image_prompt,
-                        media_data=img_byte_arr,
-                        media_type="image/jpeg",  # Adjust based on actual file type
-                        temperature=0.2
-                    )
-                    
-                    # Add response to chat history
-                    st.session_state.chat_history.append({"role": "assistant", "content": response_text})
-                
-                except Exception as e:
-                    st.error(f"Error analyzing image: {str(e)}")
-                    st.session_state.chat_history.append({
-                        "role": "assistant", 
-                        "content": f"I apologize, but I encountered an error: {str(e)}"
-                    })
+                    # The results are shown with the history below
+                    for placeholder in placeholders:
+                        placeholder.empty()
     
     # Display visual analysis history
     st.markdown("### Analysis Results")
@@ -0,0 +1,196 @@
+"""
+Semantic answer cache for the Learning Assistant.
+Near-identical standalone questions asked at the same learning level and style
+are answered from earlier responses instead of calling the Gemini API again.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+import streamlit as st
+from config.settings import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_NGRAM_SIZE
+)
+from utils.text_utils import tokenize, char_ngrams, STOP_WORDS
+
+# Words, numbers and arithmetic operators, for the literals a fuzzy match must preserve
+_LITERAL_PATTERN = re.compile(r"[a-z0-9]+|[-+*/^=<>%]")
+
+
+class AnswerCache:
+    """
+    Cache of tutor answers keyed on a normalized question.
+
+    Questions are normalized (case, punctuation and stop words removed) and
+    compared by character n-gram similarity. Numbers, operators and short
+    tokens such as variable names must match exactly, so "x + 7 = 0" is never
+    answered with the answer for "x + 6 = 0". Each (learning_level,
+    learning_style) pair gets its own bucket so an answer written for
+    elementary students is never served to graduate students.
+
+    Example:
+        cache = AnswerCache()
+        cache.put("Explain photosynthesis simply", "High School", "Visual", answer)
+        cache.get("explain photosynthesis, simply?", "High School", "Visual")
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES,
+                 threshold=ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                 ngram_size=ANSWER_CACHE_NGRAM_SIZE):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        # entry id -> (bucket, normalized key, n-grams, answer, literals), in LRU order
+        self._entries = OrderedDict()
+        # (bucket, normalized key, literals) -> entry id, for exact matches
+        self._exact = {}
+        # (bucket, n-gram) -> set of entry ids; removed with the last entry using them,
+        # so memory stays bounded by max_entries
+        self._postings = {}
+
+    def _normalize(self, question):
+        """Return the stop-word-free token list used as the cache key."""
+        return tokenize(question, remove_stop_words=True)
+
+    def _literals(self, question):
+        """Return the numbers, operators and short tokens, in order, that must match exactly."""
+        return tuple(
+            token for token in _LITERAL_PATTERN.findall((question or "").lower())
+            if not token.isalnum() or any(char.isdigit() for char in token)
+            or (len(token) <= 2 and token not in STOP_WORDS)
+        )
+
+    def get(self, question, learning_level, learning_style, context_key=""):
+        """
+        Look up a cached answer for a question.
+
+        Args:
+            question (str): Student question
+            learning_level (str): Learning level the answer was written for
+            learning_style (str): Learning style the answer was written for
+            context_key (str, optional): Extra key component, such as a prompt
+                template hash. Defaults to "".
+
+        Returns:
+            str: Cached answer, or None if no similar question is cached
+        """
+        tokens = self._normalize(question)
+        if not tokens:
+            return None
+
+        bucket = (learning_level, learning_style, context_key)
+        key = " ".join(tokens)
+        literals = self._literals(question)
+
+        with self._lock:
+            # Fast path: identical normalized question
+            entry_id = self._exact.get((bucket, key, literals))
+
+            if entry_id is None:
+                grams = char_ngrams(tokens, self.ngram_size)
+                query_size = len(grams)
+
+                # Count shared n-grams per candidate using the postings
+                overlaps = {}
+                for gram in grams:
+                    for candidate in self._postings.get((bucket, gram), ()):
+                        overlaps[candidate] = overlaps.get(candidate, 0) + 1
+
+                # Dice coefficient between the query and each candidate
+                best_score = 0.0
+                for candidate, overlap in overlaps.items():
+                    # Similar wording with other numbers or variables is a different question
+                    if self._entries[candidate][4] != literals:
+                        continue
+                    candidate_size = len(self._entries[candidate][2])
+                    score = 2.0 * overlap / (query_size + candidate_size)
+                    if score > best_score:
+                        best_score = score
+                        entry_id = candidate
+
+                if best_score < self.threshold:
+                    entry_id = None
+
+            if entry_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(entry_id)
+            return self._entries[entry_id][3]
+
+    def put(self, question, learning_level, learning_style, answer, context_key=""):
+        """
+        Store an answer for a question.
+
+        Args:
+            question (str): Student question
+            learning_level (str): Learning level the answer was written for
+            learning_style (str): Learning style the answer was written for
+            answer (str): Generated answer
+            context_key (str, optional): Extra key component, such as a prompt
+                template hash. Defaults to "".
+        """
+        tokens = self._normalize(question)
+        if not tokens or not answer:
+            return
+
+        bucket = (learning_level, learning_style, context_key)
+        key = " ".join(tokens)
+        literals = self._literals(question)
+
+        with self._lock:
+            existing = self._exact.get((bucket, key, literals))
+            if existing is not None:
+                self._remove(existing)
+
+            entry_id = self._next_id
+            self._next_id += 1
+
+            grams = char_ngrams(tokens, self.ngram_size)
+            self._entries[entry_id] = (bucket, key, grams, answer, literals)
+            self._exact[(bucket, key, literals)] = entry_id
+            for gram in grams:
+                self._postings.setdefault((bucket, gram), set()).add(entry_id)
+
+            # Evict least recently used answers
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        """Remove an entry and its postings. Caller must hold the lock."""
+        bucket, key, grams, _, literals = self._entries.pop(entry_id)
+        self._exact.pop((bucket, key, literals), None)
+        for gram in grams:
+            postings = self._postings.get((bucket, gram))
+            if postings is not None:
+                postings.discard(entry_id)
+                if not postings:
+                    del self._postings[(bucket, gram)]
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Entry count, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource
+def get_answer_cache():
+    """
+    Get the answer cache shared by all sessions of this server process.
+
+    Returns:
+        AnswerCache: Shared answer cache
+    """
+    return AnswerCache()
@@ -0,0 +1,215 @@
+"""
+Utilities for building conversation context for chat prompts.
+Keeps a serialized copy of the chat history that grows one message at a time,
+so long study sessions do not rebuild the whole transcript on every turn.
+Once the history exceeds its token budget, the oldest turns are folded into a
+running summary generated in the background, and earlier turns can be selected
+by relevance to the current question instead of sent wholesale.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import HISTORY_TOKEN_BUDGET, HISTORY_KEEP_RECENT_TURNS, HISTORY_RELEVANT_TURNS
+from utils.text_utils import estimate_tokens, tokenize, BM25Index
+
+# Shared worker pool for background history summaries
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+
+def format_chat_message(message):
+    """
+    Serialize a chat message the way it appears in prompt history.
+
+    Args:
+        message (dict): Message dictionary with 'role' and 'content' keys
+
+    Returns:
+        str: Serialized message
+    """
+    role = "User" if message["role"] == "user" else "EduGenius"
+    return f"{role}: {message['content']}\n\n"
+
+
+class ConversationBuffer:
+    """
+    Rolling buffer of serialized chat messages with running token counts.
+
+    Each message is serialized once when it is appended; rendering the history
+    is a single join over the stored segments.
+
+    When a summarizer is provided and the verbatim history grows past
+    token_budget, everything except the last keep_recent messages is handed to
+    the summarizer on a background thread. Until the summary arrives those
+    turns stay in the prompt verbatim, so no context is lost while waiting.
+
+    Every message is also added to a small BM25 index. Rendering with a query
+    keeps the last keep_recent messages plus the relevant_turns earlier
+    exchanges that best match the query, and drops the rest.
+
+    Example:
+        buffer = ConversationBuffer(summarizer=summarize_conversation)
+        buffer.sync(st.session_state.tutor_messages)
+        history_text = buffer.render(query=user_input)
+    """
+
+    def __init__(self, messages=None, summarizer=None,
+                 token_budget=HISTORY_TOKEN_BUDGET,
+                 keep_recent=HISTORY_KEEP_RECENT_TURNS,
+                 relevant_turns=HISTORY_RELEVANT_TURNS):
+        self.summarizer = summarizer
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.relevant_turns = relevant_turns
+        self.segments = []
+        self.roles = []
+        self.token_counts = []
+        self.total_tokens = 0
+        self.index = BM25Index()
+        # Running summary of segments[:summarized_count]
+        self.summary = ""
+        self.summarized_count = 0
+        self.summarized_tokens = 0
+        # In-flight summary job and the segment index it covers up to
+        self._pending = None
+        self._pending_end = 0
+        if messages:
+            self.sync(messages)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def append(self, message):
+        """
+        Serialize and append a single message.
+
+        Args:
+            message (dict): Message dictionary with 'role' and 'content' keys
+        """
+        segment = format_chat_message(message)
+        tokens = estimate_tokens(segment)
+        self.segments.append(segment)
+        self.roles.append(message["role"])
+        self.token_counts.append(tokens)
+        self.total_tokens += tokens
+        self.index.add(tokenize(message["content"], remove_stop_words=True))
+
+    def sync(self, messages, end=None):
+        """
+        Append any messages not yet in the buffer.
+
+        Args:
+            messages (list): Full list of chat messages
+            end (int, optional): Only sync messages before this index.
+                Defaults to None (all messages).
+        """
+        if end is None:
+            end = len(messages)
+
+        # The chat was reset or truncated; start over
+        if end < len(self.segments):
+            self.clear()
+
+        for message in messages[len(self.segments):end]:
+            self.append(message)
+
+        if self.summarizer is not None:
+            self._compact()
+
+    def clear(self):
+        """Remove all messages and any summary from the buffer."""
+        self.segments = []
+        self.roles = []
+        self.token_counts = []
+        self.total_tokens = 0
+        self.index = BM25Index()
+        self.summary = ""
+        self.summarized_count = 0
+        self.summarized_tokens = 0
+        self._pending = None
+        self._pending_end = 0
+
+    @property
+    def verbatim_tokens(self):
+        """Estimated tokens of the history not yet folded into the summary."""
+        return self.total_tokens - self.summarized_tokens
+
+    def _compact(self):
+        """Adopt a finished summary and start a new one if over budget."""
+        # Adopt the result of a finished background summary
+        if self._pending is not None and self._pending.done():
+            pending, self._pending = self._pending, None
+            try:
+                summary = pending.result()
+            except Exception:
+                summary = None
+            # A failed summary leaves the turns verbatim; they are retried below
+            if summary:
+                self.summary = summary
+                self.summarized_tokens += sum(self.token_counts[self.summarized_count:self._pending_end])
+                self.summarized_count = self._pending_end
+
+        if self._pending is not None or self.verbatim_tokens <= self.token_budget:
+            return
+
+        fold_end = len(self.segments) - self.keep_recent
+        if fold_end <= self.summarized_count:
+            return
+
+        # Summarize off the critical path; this turn still sends the turns verbatim
+        folded_text = "".join(self.segments[self.summarized_count:fold_end])
+        self._pending = _summary_executor.submit(self.summarizer, self.summary, folded_text)
+        self._pending_end = fold_end
+
+    def _relevant_indexes(self, query, end):
+        """
+        Pick earlier messages relevant to a query.
+
+        Args:
+            query (str): Current question
+            end (int): Only consider messages before this index
+
+        Returns:
+            set: Indexes of the selected messages, with their question/answer partners
+        """
+        selected = set()
+        for index, _ in self.index.top_k(tokenize(query, remove_stop_words=True), self.relevant_turns, max_doc=end):
+            selected.add(index)
+            # Keep question and answer together
+            partner = index + 1 if self.roles[index] == "user" else index - 1
+            if 0 <= partner < end:
+                selected.add(partner)
+        return selected
+
+    def render(self, query=None):
+        """
+        Render the buffered history as prompt text.
+
+        Args:
+            query (str, optional): Current question. When given and the history
+                is long, only the most recent messages and the earlier
+                exchanges most relevant to the question are included.
+                Defaults to None.
+
+        Returns:
+            str: Running summary (if any) followed by the selected messages
+        """
+        recent_start = max(0, len(self.segments) - self.keep_recent)
+
+        if query is None or not self.relevant_turns or recent_start <= self.summarized_count:
+            # Everything not yet summarized, verbatim
+            history = "".join(self.segments[self.summarized_count:])
+        else:
+            # Relevant earlier exchanges (summarized or not) plus the recent window
+            selected = sorted(self._relevant_indexes(query, recent_start))
+            selected.extend(range(recent_start, len(self.segments)))
+            parts = []
+            previous = -1
+            for index in selected:
+                if index != previous + 1:
+                    parts.append("[...]\n\n")
+                parts.append(self.segments[index])
+                previous = index
+            history = "".join(parts)
+
+        if not self.summary:
+            return history
+        return f"Summary of the earlier conversation:\n{self.summary}\n\n{history}"
@@ -0,0 +1,225 @@
+"""
+Corpus-level document frequencies for TF-IDF scoring.
+Every analyzed document adds its distinct terms once, and the table is saved
+to disk so term rarity is judged against everything seen across sessions and
+restarts rather than against a single document.
+"""
+
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+from collections import OrderedDict, Counter
+import streamlit as st
+from config.settings import (
+    CORPUS_STATS_PATH,
+    CORPUS_MAX_TERMS,
+    CORPUS_MAX_DOCUMENT_IDS,
+    CORPUS_SAVE_EVERY_DOCUMENTS,
+    CORPUS_SAVE_INTERVAL_SECONDS
+)
+
+# Bumped whenever the term extraction changes, so old counts are discarded
+CORPUS_STATS_VERSION = 1
+
+# Pruning shrinks the table to this fraction of the limit, so it does not run on every document
+_PRUNE_TARGET = 0.9
+
+
+class CorpusStatistics:
+    """
+    Incrementally updated document-frequency table.
+
+    Updates are saved in batches: after CORPUS_SAVE_EVERY_DOCUMENTS new
+    documents, after CORPUS_SAVE_INTERVAL_SECONDS, and by flush() at exit.
+    The table is serialized outside the update lock, so analyses are not
+    blocked while it is written.
+
+    Example:
+        stats = get_corpus_statistics()
+        stats.add_document(sha256, terms)
+        document_count, frequencies = stats.frequencies(["photosynthesis"])
+    """
+
+    def __init__(self, path=CORPUS_STATS_PATH, max_terms=CORPUS_MAX_TERMS,
+                 max_document_ids=CORPUS_MAX_DOCUMENT_IDS, save_every=CORPUS_SAVE_EVERY_DOCUMENTS,
+                 save_interval_seconds=CORPUS_SAVE_INTERVAL_SECONDS):
+        self.path = path
+        self.max_terms = max_terms
+        self.max_document_ids = max_document_ids
+        self.save_every = save_every
+        self.save_interval_seconds = save_interval_seconds
+        self._lock = threading.Lock()
+        # Serializes writers, so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+        self.document_count = 0
+        # term -> number of documents containing it
+        self.document_frequency = {}
+        # Ids of documents already counted, oldest first
+        self._document_ids = OrderedDict()
+        # Documents counted since the last save
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+        self._load()
+
+    def _load(self):
+        """Read the saved table, starting empty if it is missing or outdated."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CORPUS_STATS_VERSION:
+            return
+        self.document_count = data.get("document_count", 0)
+        self.document_frequency = data.get("document_frequency", {})
+        self._document_ids = OrderedDict.fromkeys(data.get("document_ids", []))
+
+    def _write(self, data):
+        """
+        Write a snapshot of the table atomically.
+
+        Args:
+            data (dict): Snapshot to write
+
+        Returns:
+            bool: True if the snapshot was written
+        """
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(temp_path, self.path)
+            return True
+        except OSError:
+            return False
+
+    def flush(self):
+        """Save the documents counted since the last save."""
+        with self._save_lock:
+            # Copy the table under the lock, then serialize it without holding the lock
+            with self._lock:
+                if not self._unsaved:
+                    return
+                unsaved = self._unsaved
+                self._unsaved = 0
+                self._last_save = time.monotonic()
+                data = {
+                    "version": CORPUS_STATS_VERSION,
+                    "document_count": self.document_count,
+                    "document_frequency": dict(self.document_frequency),
+                    "document_ids": list(self._document_ids)
+                }
+            if not self._write(data):
+                # The in-memory table is still up to date; saving is retried with the next update
+                with self._lock:
+                    self._unsaved += unsaved
+
+    def _prune(self):
+        """
+        Forget the rarest terms until the table is back under its limit.
+        Caller must hold the lock.
+        """
+        target = int(self.max_terms * _PRUNE_TARGET)
+        excess = len(self.document_frequency) - target
+        if excess <= 0:
+            return
+        # Find the frequency below which every term goes, from a histogram of the counts
+        histogram = Counter(self.document_frequency.values())
+        cutoff = 0
+        below = 0
+        for count in sorted(histogram):
+            if below + histogram[count] >= excess:
+                cutoff = count
+                break
+            below += histogram[count]
+        # Every term rarer than the cutoff, plus as many at the cutoff as still needed
+        at_cutoff = excess - below
+        kept = {}
+        for term, count in self.document_frequency.items():
+            if count < cutoff:
+                continue
+            if count == cutoff and at_cutoff > 0:
+                at_cutoff -= 1
+                continue
+            kept[term] = count
+        self.document_frequency = kept
+
+    def add_document(self, document_id, terms):
+        """
+        Count a document's distinct terms, once per document.
+
+        Args:
+            document_id (str): Stable document id, such as its content hash;
+                None counts the document without deduplication
+            terms (iterable): Terms occurring in the document
+
+        Returns:
+            bool: True if the document was counted, False if it was already known
+        """
+        with self._lock:
+            if document_id is not None:
+                if document_id in self._document_ids:
+                    self._document_ids.move_to_end(document_id)
+                    return False
+                self._document_ids[document_id] = None
+                while len(self._document_ids) > self.max_document_ids:
+                    self._document_ids.popitem(last=False)
+
+            self.document_count += 1
+            for term in set(terms):
+                self.document_frequency[term] = self.document_frequency.get(term, 0) + 1
+
+            if len(self.document_frequency) > self.max_terms:
+                self._prune()
+
+            self._unsaved += 1
+            save_due = (
+                self._unsaved >= self.save_every
+                or time.monotonic() - self._last_save >= self.save_interval_seconds
+            )
+
+        if save_due:
+            self.flush()
+        return True
+
+    def frequencies(self, terms):
+        """
+        Look up the document frequencies of several terms.
+
+        Args:
+            terms (list): Terms to look up
+
+        Returns:
+            tuple: (document count, list of document frequencies in the order of terms)
+        """
+        with self._lock:
+            return self.document_count, [self.document_frequency.get(term, 0) for term in terms]
+
+    def stats(self):
+        """
+        Get corpus statistics.
+
+        Returns:
+            dict: Document count and vocabulary size
+        """
+        with self._lock:
+            return {"documents": self.document_count, "terms": len(self.document_frequency)}
+
+
+@st.cache_resource
+def get_corpus_statistics():
+    """
+    Get the corpus statistics shared by all sessions of this server process.
+
+    Returns:
+        CorpusStatistics: Shared document-frequency table
+    """
+    stats = CorpusStatistics()
+    # Save the documents counted since the last batch when the server stops
+    atexit.register(stats.flush)
+    return stats
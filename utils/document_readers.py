@@ -0,0 +1,331 @@
+"""
+Incremental readers for PDF, Word and plain text documents.
+Text is produced page by page or block by block so that callers can stop as
+soon as they have enough, without parsing the rest of the file.
+"""
+
+import codecs
+import zipfile
+import xml.etree.ElementTree as ET
+
+# PyPDF2 is optional; PDF text extraction is unavailable without it
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+# WordprocessingML namespace
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def pdf_support_available():
+    """
+    Check whether PDF text extraction is available.
+
+    Returns:
+        bool: True if PyPDF2 is installed
+    """
+    return PdfReader is not None
+
+
+def open_pdf(file_path):
+    """
+    Open a PDF for page-by-page reading.
+
+    Args:
+        file_path (str): Path to the PDF file
+
+    Returns:
+        PdfReader: Reader whose pages are parsed on access
+
+    Raises:
+        ImportError: If PyPDF2 is not installed
+    """
+    if PdfReader is None:
+        raise ImportError("PyPDF2 is required for PDF processing")
+    return PdfReader(file_path)
+
+
+def get_pdf_page_count(file_path):
+    """
+    Get the number of pages in a PDF.
+
+    Args:
+        file_path (str): Path to the PDF file
+
+    Returns:
+        int: Page count
+
+    Raises:
+        ImportError: If PyPDF2 is not installed
+    """
+    return len(open_pdf(file_path).pages)
+
+
+def iter_pdf_pages(file_path, start=0, stop=None):
+    """
+    Yield the text of a PDF's pages one at a time.
+    PyPDF2 parses page objects on access, so only the pages consumed are read.
+
+    Args:
+        file_path (str): Path to the PDF file
+        start (int, optional): First page index. Defaults to 0.
+        stop (int, optional): Page index to stop before. Defaults to the page count.
+
+    Yields:
+        tuple: (page index, page text)
+
+    Raises:
+        ImportError: If PyPDF2 is not installed
+    """
+    reader = open_pdf(file_path)
+    page_count = len(reader.pages)
+    stop = page_count if stop is None else min(stop, page_count)
+    for index in range(start, stop):
+        yield index, reader.pages[index].extract_text() or ""
+
+
+def _paragraph_text(paragraph):
+    """Join the text runs, tabs and breaks of a w:p element."""
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == _W + "t" and node.text:
+            parts.append(node.text)
+        elif node.tag == _W + "tab":
+            parts.append("\t")
+        elif node.tag in (_W + "br", _W + "cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _paragraph_style(paragraph):
+    """Get the style id of a w:p element, or an empty string."""
+    style = paragraph.find(f"{_W}pPr/{_W}pStyle")
+    return style.get(_W + "val", "") if style is not None else ""
+
+
+def _release(body, element):
+    """Drop a processed block so the partial tree does not grow with the document."""
+    element.clear()
+    if body is not None:
+        # Processed siblings are no longer needed; open elements are still held by the parser
+        body.clear()
+
+
+def _table_rows(table, cell_separator=" | "):
+    """
+    Get the text of a table's rows from its direct children only.
+    A table nested in a cell is flattened into that cell's text (cells joined
+    by ", ", rows by "; "), so its text appears exactly once.
+
+    Args:
+        table (Element): A w:tbl element
+        cell_separator (str, optional): Separator between cells. Defaults to " | ".
+
+    Returns:
+        list: One string per row
+    """
+    rows = []
+    for row in table.findall(_W + "tr"):
+        cells = []
+        for cell in row.findall(_W + "tc"):
+            parts = []
+            for child in cell:
+                if child.tag == _W + "p":
+                    parts.append(_paragraph_text(child))
+                elif child.tag == _W + "tbl":
+                    parts.append("; ".join(_table_rows(child, ", ")))
+            cells.append(" ".join(part for part in parts if part.strip()).strip())
+        rows.append(cell_separator.join(cells))
+    return rows
+
+
+def iter_docx_blocks(file_path):
+    """
+    Yield the paragraphs, headings and tables of a DOCX file in document order.
+    Only word/document.xml is read, as a stream, and each block is discarded
+    once yielded, so memory stays bounded and embedded media is never loaded.
+
+    Args:
+        file_path (str): Path to the DOCX file
+
+    Yields:
+        tuple: (kind, text) where kind is "heading", "paragraph" or "table";
+               table rows are separated by newlines and cells by " | "
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as stream:
+            body = None
+            table_depth = 0
+            for event, element in ET.iterparse(stream, events=("start", "end")):
+                if element.tag == _W + "body" and event == "start":
+                    body = element
+                    continue
+
+                if element.tag == _W + "tbl":
+                    if event == "start":
+                        table_depth += 1
+                        continue
+                    table_depth -= 1
+                    if table_depth == 0:
+                        rows = _table_rows(element)
+                        _release(body, element)
+                        if any(rows):
+                            yield "table", "\n".join(rows)
+                    continue
+
+                # Paragraphs inside tables are emitted with their table
+                if event != "end" or element.tag != _W + "p" or table_depth:
+                    continue
+
+                text = _paragraph_text(element).strip()
+                style = _paragraph_style(element).lower()
+                _release(body, element)
+                if not text:
+                    continue
+                if style.startswith("heading") or style == "title":
+                    yield "heading", text
+                else:
+                    yield "paragraph", text
+
+
+class TextFileReader:
+    """
+    Decode a plain text file block by block, reading it once.
+
+    The encoding is taken from a byte order mark. Otherwise the file is
+    decoded as UTF-8 up to the first byte that is not valid UTF-8, and as
+    Windows-1252 from that byte on; text before it keeps its UTF-8 decoding.
+    After iterating, encoding names what was used: "utf-8, then cp1252"
+    when both decoded non-ASCII text.
+
+    Example:
+        reader = TextFileReader("notes.txt")
+        for line in reader.lines():
+            print(line)
+        print(reader.encoding)
+    """
+
+    # Legacy Windows text is the most common alternative to UTF-8
+    FALLBACK_ENCODING = "cp1252"
+
+    def __init__(self, file_path, block_size=1024 * 1024):
+        self.file_path = file_path
+        self.block_size = block_size
+        self.encoding = None
+
+    def __iter__(self):
+        """Yield the decoded text of each block."""
+        with open(self.file_path, 'rb') as f:
+            head = f.read(4)
+            f.seek(0)
+
+            # Byte order marks identify the encoding outright
+            if head.startswith(codecs.BOM_UTF8):
+                self.encoding, fallback = "utf-8-sig", None
+            elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+                self.encoding, fallback = "utf-16", None
+            else:
+                self.encoding, fallback = "utf-8", self.FALLBACK_ENCODING
+            decoder = codecs.getincrementaldecoder(self.encoding)(errors='strict' if fallback else 'replace')
+            # Whether UTF-8 decoded anything other than ASCII before a switch
+            decoded_non_ascii = False
+
+            while True:
+                data = f.read(self.block_size)
+                final = not data
+                try:
+                    text = decoder.decode(data, final=final)
+                except UnicodeDecodeError as e:
+                    # The offset counts from the bytes the decoder held back from the
+                    # previous block; everything before it is valid UTF-8
+                    pending, _ = decoder.getstate()
+                    data = pending + data
+                    prefix = data[:e.start].decode("utf-8")
+                    decoded_non_ascii = decoded_non_ascii or not prefix.isascii()
+                    self.encoding = f"utf-8, then {fallback}" if decoded_non_ascii else fallback
+                    decoder = codecs.getincrementaldecoder(fallback)(errors='replace')
+                    fallback = None
+                    text = prefix + decoder.decode(data[e.start:], final=final)
+                else:
+                    if fallback and not decoded_non_ascii:
+                        decoded_non_ascii = not text.isascii()
+                if text:
+                    yield text
+                if final:
+                    break
+
+    def lines(self):
+        """
+        Yield the file's lines without line endings.
+        Lines end at \\n, \\r\\n or \\r, as in text mode.
+
+        Yields:
+            str: Each line
+        """
+        buffer = ""
+        for text in self:
+            buffer += text
+            # A trailing \r may be the first half of a \r\n split between blocks
+            held = buffer.endswith("\r")
+            if held:
+                buffer = buffer[:-1]
+            lines = buffer.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+            # The last line may continue in the next block
+            buffer = lines.pop() + ("\r" if held else "")
+            yield from lines
+        if buffer:
+            yield buffer.rstrip("\r")
+
+
+def _bounded_join(chunks, max_length, separator="\n\n"):
+    """
+    Join text chunks until max_length characters are collected.
+
+    Args:
+        chunks (iterable): Text chunks, consumed lazily
+        max_length (int): Maximum preview length
+        separator (str, optional): Separator between chunks. Defaults to "\\n\\n".
+
+    Returns:
+        str: Preview, with "..." appended if it was cut short
+    """
+    parts = []
+    length = 0
+    for chunk in chunks:
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        parts.append(chunk)
+        length += len(chunk) + len(separator)
+        if length >= max_length:
+            return separator.join(parts)[:max_length] + "..."
+    return separator.join(parts)
+
+
+def read_pdf_preview(file_path, max_length=1000):
+    """
+    Extract text from the first pages of a PDF, stopping once max_length is reached.
+
+    Args:
+        file_path (str): Path to the PDF file
+        max_length (int, optional): Maximum preview length. Defaults to 1000.
+
+    Returns:
+        str: Preview text
+    """
+    return _bounded_join((text for _, text in iter_pdf_pages(file_path)), max_length)
+
+
+def read_docx_preview(file_path, max_length=1000):
+    """
+    Extract text from the start of a DOCX file, stopping once max_length is reached.
+
+    Args:
+        file_path (str): Path to the DOCX file
+        max_length (int, optional): Maximum preview length. Defaults to 1000.
+
+    Returns:
+        str: Preview text
+    """
+    return _bounded_join((text for _, text in iter_docx_blocks(file_path)), max_length)
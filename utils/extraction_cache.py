@@ -0,0 +1,192 @@
+"""
+Persistent cache of file extraction results.
+Metadata and extracted text are stored as JSON under the file's SHA-256 and
+the extractor's version, so a file uploaded again (by any session, after any
+restart) is not processed again until its extractor changes.
+"""
+
+import os
+import json
+import inspect
+import tempfile
+import threading
+import functools
+import streamlit as st
+from config.settings import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_QUOTA_MB
+from utils.file_utils import file_sha256
+
+
+class ExtractionCache:
+    """
+    Content-addressed JSON store for extraction results.
+
+    Entries live at <root>/<kind>/<hash prefix>/<sha256>.v<version>.json and
+    are written atomically, so concurrent sessions and worker processes can
+    share one directory. Reads refresh an entry's modification time, which
+    prune() uses to evict the least recently used entries.
+
+    Example:
+        cache = get_extraction_cache()
+        info = cache.get("document", sha256, 1)
+        if info is None:
+            info = extract(file_path)
+            cache.put("document", sha256, 1, info)
+    """
+
+    def __init__(self, root=EXTRACTION_CACHE_DIR, quota_bytes=EXTRACTION_CACHE_QUOTA_MB * 1024 * 1024):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, kind, sha256, version):
+        """Get the file path of an entry."""
+        return os.path.join(self.root, kind, sha256[:2], f"{sha256}.v{version}.json")
+
+    def get(self, kind, sha256, version):
+        """
+        Look up an extraction result.
+
+        Args:
+            kind (str): Extractor name, such as "document" or "image"
+            sha256 (str): Content hash of the file
+            version (int or str): Extractor version
+
+        Returns:
+            The stored value, or None if there is no (readable) entry
+        """
+        path = self._path(kind, sha256, version)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, kind, sha256, version, value):
+        """
+        Store an extraction result. Failures to write are ignored.
+
+        Args:
+            kind (str): Extractor name
+            sha256 (str): Content hash of the file
+            version (int or str): Extractor version
+            value: JSON-serializable result
+        """
+        path = self._path(kind, sha256, version)
+        directory = os.path.dirname(path)
+        temp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, separators=(",", ":"), default=str)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError):
+            if temp_path is not None and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def prune(self):
+        """
+        Delete the least recently used entries while the cache is over its quota.
+
+        Returns:
+            tuple: (number of entries deleted, bytes freed)
+        """
+        entries = []
+        for directory, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        deleted = 0
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+            freed += size
+        return deleted, freed
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits and misses in this process
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource
+def get_extraction_cache():
+    """
+    Get the extraction cache shared by all sessions of this server process.
+
+    Returns:
+        ExtractionCache: Shared extraction cache
+    """
+    return ExtractionCache()
+
+
+def cached_extraction(kind, version):
+    """
+    Decorate a file extractor so its results are cached by content hash.
+
+    The extractor must take (file_path, file_name=None) and may take a
+    sha256 keyword; it returns a metadata dict. Results containing an
+    "error" or "processing_error" key are not cached, so transient failures
+    are retried. The file name is not part of the key: a hit is returned
+    with the current file name.
+
+    Args:
+        kind (str): Extractor name
+        version (int): Extractor version; bump it whenever the output changes
+
+    Returns:
+        function: Decorator
+    """
+    def decorator(extract):
+        passes_hash = "sha256" in inspect.signature(extract).parameters
+
+        @functools.wraps(extract)
+        def wrapper(file_path, file_name=None, sha256=None):
+            if file_name is None:
+                file_name = os.path.basename(file_path)
+            if sha256 is None:
+                sha256 = file_sha256(file_path)
+
+            cache = get_extraction_cache()
+            info = cache.get(kind, sha256, version)
+            if info is not None:
+                info["file_name"] = file_name
+                return info
+
+            if passes_hash:
+                info = extract(file_path, file_name, sha256=sha256)
+            else:
+                info = extract(file_path, file_name)
+            if "error" not in info and "processing_error" not in info:
+                cache.put(kind, sha256, version, info)
+            return info
+
+        return wrapper
+    return decorator
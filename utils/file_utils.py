@@ -3,31 +3,78 @@ File utilities for handling uploads, processing different file types, and managi
 """
 
 import os
+import codecs
+import hashlib
 import tempfile
 import mimetypes
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
 from pathlib import Path
 import streamlit as st
-from config.settings import MAX_FILE_SIZE_MB, ALLOWED_EXTENSIONS
+from config.settings import (
+    MAX_FILE_SIZE_MB,
+    ALLOWED_EXTENSIONS,
+    UPLOAD_CHUNK_SIZE,
+    TEMP_FILE_DIR,
+    FILE_SNIFF_BYTES,
+    FILE_TYPE_CACHE_SIZE
+)
+from utils.document_readers import pdf_support_available, read_pdf_preview, read_docx_preview
 
-def save_uploaded_file(uploaded_file):
+# Load the system MIME type tables once
+mimetypes.init()
+
+# Result of copying an upload to disk
+SpooledUpload = namedtuple("SpooledUpload", ["path", "sha256", "size"])
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Detected MIME types accepted for each allowed extension
+EXTENSION_MIME_TYPES = {
+    'pdf': {'application/pdf'},
+    'docx': {DOCX_MIME_TYPE},
+    'txt': {'text/plain'},
+    'jpg': {'image/jpeg'},
+    'jpeg': {'image/jpeg'},
+    'png': {'image/png'},
+    'mp3': {'audio/mpeg'},
+    'wav': {'audio/wav'},
+    'm4a': {'audio/mp4', 'video/mp4'},
+    'ogg': {'audio/ogg'},
+    'mp4': {'video/mp4', 'audio/mp4'},
+    'mov': {'video/quicktime', 'video/mp4'},
+    'avi': {'video/x-msvideo'},
+    'mkv': {'video/x-matroska'}
+}
+
+# ISO base media brands that hold audio only
+_AUDIO_MP4_BRANDS = {b'M4A ', b'M4B ', b'M4P '}
+
+# Byte order marks of UTF-8, UTF-32 and UTF-16 text
+_TEXT_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+# Control characters that occur in ordinary text: backspace, tab, newlines, form feed, escape
+_TEXT_CONTROL_BYTES = {0x08, 0x09, 0x0A, 0x0C, 0x0D, 0x1B}
+
+# Detected types by content hash, in LRU order
+_detected_types = OrderedDict()
+_detected_types_lock = threading.Lock()
+
+
+def get_upload_extension(uploaded_file):
     """
-    Save an uploaded file to a temporary location.
+    Get the extension of an uploaded file and check that it is allowed.
     
     Args:
         uploaded_file: Streamlit UploadedFile object
         
     Returns:
-        str: Path to the saved temporary file
+        str: Lowercase file extension without the leading dot
     
     Raises:
-        ValueError: If file size exceeds limit or file type is not allowed
+        ValueError: If the file type is not allowed
     """
-    # Check file size
-    file_size_mb = uploaded_file.size / (1024 * 1024)  # Convert bytes to MB
-    if file_size_mb > MAX_FILE_SIZE_MB:
-        raise ValueError(f"File size exceeds the maximum limit of {MAX_FILE_SIZE_MB}MB")
-    
-    # Get file extension
     file_extension = Path(uploaded_file.name).suffix.lower().lstrip('.')
     
     # Check if extension is allowed (in any category)
@@ -38,10 +85,276 @@ def save_uploaded_file(uploaded_file):
     if file_extension not in allowed_extensions_list:
         raise ValueError(f"File type .{file_extension} is not supported")
     
-    # Create a temporary file with the correct extension
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_extension}") as temp_file:
-        temp_file.write(uploaded_file.getvalue())
-        return temp_file.name
+    return file_extension
+
+
+def spool_uploaded_file(uploaded_file, suffix="", directory=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Copy an uploaded file to disk in fixed-size blocks.
+    The SHA-256 and the size limit are computed while copying, so memory use
+    stays at one block regardless of the file size.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile object (or any readable binary file)
+        suffix (str, optional): Suffix of the file on disk. Defaults to "".
+        directory (str, optional): Directory for the file. Defaults to TEMP_FILE_DIR.
+        chunk_size (int, optional): Block size in bytes. Defaults to UPLOAD_CHUNK_SIZE.
+        
+    Returns:
+        SpooledUpload: Path, hex SHA-256 digest and size in bytes of the copy
+    
+    Raises:
+        ValueError: If the file size exceeds the limit
+    """
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    
+    # Reject early when the reported size is already too large
+    if getattr(uploaded_file, "size", 0) > max_bytes:
+        raise ValueError(f"File size exceeds the maximum limit of {MAX_FILE_SIZE_MB}MB")
+    
+    if directory is None:
+        directory = TEMP_FILE_DIR
+        os.makedirs(directory, exist_ok=True)
+    
+    digest = hashlib.sha256()
+    size = 0
+    uploaded_file.seek(0)
+    
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=directory) as temp_file:
+        try:
+            while True:
+                block = uploaded_file.read(chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise ValueError(f"File size exceeds the maximum limit of {MAX_FILE_SIZE_MB}MB")
+                digest.update(block)
+                temp_file.write(block)
+        except BaseException:
+            # Never leave a partial copy behind
+            temp_file.close()
+            os.unlink(temp_file.name)
+            raise
+        finally:
+            # Leave the upload readable for callers that display it afterwards
+            uploaded_file.seek(0)
+    
+    return SpooledUpload(temp_file.name, digest.hexdigest(), size)
+
+
+def file_sha256(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Compute the SHA-256 of a file, reading it in blocks.
+    
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int, optional): Block size in bytes. Defaults to UPLOAD_CHUNK_SIZE.
+        
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_upload_buffer(uploaded_file):
+    """
+    Get the contents of an in-memory upload without copying them.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile object
+        
+    Returns:
+        memoryview: View of the upload's buffer (bytes for objects without one)
+    """
+    if hasattr(uploaded_file, 'getbuffer'):
+        return uploaded_file.getbuffer()
+    return uploaded_file.getvalue()
+
+
+def get_upload_sha256(uploaded_file):
+    """
+    Get the SHA-256 of an in-memory upload, hashing it once per session.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile object
+        
+    Returns:
+        str: Hex SHA-256 digest of the upload's contents
+    """
+    # Uploads keep their id across reruns; without one (older Streamlit) the upload is hashed every time
+    upload_id = getattr(uploaded_file, 'file_id', None)
+    if upload_id is None:
+        return hashlib.sha256(get_upload_buffer(uploaded_file)).hexdigest()
+    hashes = st.session_state.setdefault('upload_sha256', {})
+    if upload_id not in hashes:
+        hashes[upload_id] = hashlib.sha256(get_upload_buffer(uploaded_file)).hexdigest()
+    return hashes[upload_id]
+
+
+def _sniff_mime_type(header, source):
+    """
+    Classify a file from its leading bytes.
+    
+    Args:
+        header (bytes): First bytes of the file
+        source: Path or seekable binary file, used to list ZIP members
+        
+    Returns:
+        str: Detected MIME type, or None if the content is not recognized
+    """
+    # Empty files and text with a byte order mark, before audio frame syncs
+    # (a UTF-16LE BOM is also a valid MPEG frame sync)
+    if not header or header.startswith(_TEXT_BOMS):
+        return 'text/plain'
+    if header.startswith(b'%PDF-'):
+        return 'application/pdf'
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if header.startswith(b'PK\x03\x04'):
+        # DOCX files are ZIP archives with a word/document.xml member
+        try:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            with zipfile.ZipFile(source) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return DOCX_MIME_TYPE
+        except zipfile.BadZipFile:
+            return None
+        return 'application/zip'
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in _AUDIO_MP4_BRANDS:
+            return 'audio/mp4'
+        if brand == b'qt  ':
+            return 'video/quicktime'
+        return 'video/mp4'
+    if header.startswith(b'RIFF'):
+        if header[8:12] == b'WAVE':
+            return 'audio/wav'
+        if header[8:12] == b'AVI ':
+            return 'video/x-msvideo'
+        return None
+    if header.startswith(b'ID3'):
+        return 'audio/mpeg'
+    if len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        # MPEG audio frame sync
+        return 'audio/mpeg'
+    if header.startswith(b'OggS'):
+        return 'audio/ogg'
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'video/x-matroska'
+    
+    if _looks_like_text(header):
+        return 'text/plain'
+    return None
+
+
+def _looks_like_text(header):
+    """
+    Check whether leading bytes are plain text without a byte order mark.
+    UTF-8 is decoded strictly; other 8-bit text must be almost entirely
+    printable, which binary formats never are.
+    
+    Args:
+        header (bytes): First bytes of the file
+        
+    Returns:
+        bool: True if the bytes look like text
+    """
+    if b'\x00' in header:
+        return False
+    control = sum(1 for byte in header if byte < 0x20 and byte not in _TEXT_CONTROL_BYTES) + header.count(0x7F)
+    try:
+        # The window may end inside a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(header, final=False)
+        is_utf8 = True
+    except UnicodeDecodeError:
+        is_utf8 = False
+    if is_utf8:
+        return control <= len(header) * 0.01
+    return control == 0 and sum(1 for byte in header if byte >= 0x80) <= len(header) * 0.3
+
+
+def detect_file_type(source, sha256=None):
+    """
+    Detect a file's MIME type from its content instead of its name.
+    Only the first FILE_SNIFF_BYTES are read (plus the ZIP directory for DOCX).
+    
+    Args:
+        source: Path to the file, or a seekable binary file such as an UploadedFile
+        sha256 (str, optional): Content hash; when given the result is cached. Defaults to None.
+        
+    Returns:
+        str: Detected MIME type, or None if the content is not recognized
+    """
+    if sha256 is not None:
+        with _detected_types_lock:
+            if sha256 in _detected_types:
+                _detected_types.move_to_end(sha256)
+                return _detected_types[sha256]
+    
+    if hasattr(source, 'read'):
+        source.seek(0)
+        header = source.read(FILE_SNIFF_BYTES)
+        mime_type = _sniff_mime_type(header, source)
+        source.seek(0)
+    else:
+        with open(source, 'rb') as f:
+            header = f.read(FILE_SNIFF_BYTES)
+        mime_type = _sniff_mime_type(header, source)
+    
+    if sha256 is not None:
+        with _detected_types_lock:
+            _detected_types[sha256] = mime_type
+            while len(_detected_types) > FILE_TYPE_CACHE_SIZE:
+                _detected_types.popitem(last=False)
+    
+    return mime_type
+
+
+def validate_file_type(source, file_extension, sha256=None):
+    """
+    Check that a file's content matches its extension.
+    
+    Args:
+        source: Path to the file, or a seekable binary file such as an UploadedFile
+        file_extension (str): Extension without the leading dot
+        sha256 (str, optional): Content hash, used to cache detection. Defaults to None.
+        
+    Returns:
+        str: Detected MIME type
+    
+    Raises:
+        ValueError: If the content does not match the extension
+    """
+    mime_type = detect_file_type(source, sha256)
+    expected = EXTENSION_MIME_TYPES.get(file_extension.lower(), set())
+    if mime_type not in expected:
+        raise ValueError(f"File content does not match its .{file_extension} extension")
+    return mime_type
+
+
+def validate_uploaded_file(uploaded_file):
+    """
+    Check an upload's extension and content type before it is processed.
+    
+    Args:
+        uploaded_file: Streamlit UploadedFile object
+        
+    Returns:
+        str: Detected MIME type
+    
+    Raises:
+        ValueError: If the file type is not allowed or the content does not match the extension
+    """
+    return validate_file_type(uploaded_file, get_upload_extension(uploaded_file))
 
 
 def get_file_mime_type(file_path):
@@ -54,9 +367,6 @@ def get_file_mime_type(file_path):
     Returns:
         str: MIME type of the file
     """
-    # Initialize mimetypes
-    mimetypes.init()
-    
     # Get mime type based on file extension
     mime_type, _ = mimetypes.guess_type(file_path)
     
@@ -77,8 +387,8 @@ def get_file_type_category(file_path):
     Returns:
         str: Category of the file (image, document, audio, video, or unknown)
     """
-    # Get mime type
-    mime_type = get_file_mime_type(file_path)
+    # Get mime type, preferring the detected content type over the extension
+    mime_type = detect_file_type(file_path) or get_file_mime_type(file_path)
     
     # Determine category based on mime type
     mime_prefix = mime_type.split('/')[0] if mime_type else ''
@@ -97,13 +407,37 @@ def get_file_type_category(file_path):
         return 'unknown'
 
 
-def get_file_preview(file_path, max_length=1000):
+@st.cache_data(max_entries=512, show_spinner=False)
+def _cached_document_preview(sha256, _file_path, file_extension, max_length):
+    """
+    Extract a PDF or DOCX preview, cached by content hash.
+    
+    Args:
+        sha256 (str): Content hash of the file, used as the cache key
+        _file_path (str): Path to the file (not part of the cache key)
+        file_extension (str): '.pdf' or '.docx'
+        max_length (int): Maximum length of the preview
+        
+    Returns:
+        str: Preview text
+    """
+    if file_extension == '.pdf':
+        preview = read_pdf_preview(_file_path, max_length)
+    else:
+        preview = read_docx_preview(_file_path, max_length)
+    return preview or "[No extractable text found in this document]"
+
+
+def get_file_preview(file_path, max_length=1000, sha256=None):
     """
     Get a preview of a file's content.
+    PDF and Word previews read only the pages or paragraphs needed to fill
+    max_length and are cached by content hash.
     
     Args:
         file_path (str): Path to the file
         max_length (int): Maximum length of the preview
+        sha256 (str, optional): Content hash of the file, if already known. Defaults to None.
         
     Returns:
         str: Preview of the file content
@@ -124,12 +458,12 @@ def get_file_preview(file_path, max_length=1000):
                     return content + ("..." if len(content) >= max_length else "")
                     
             elif file_extension == '.pdf':
-                # For PDF files, return a placeholder - in a real app, use PyPDF2 or similar
-                return "[PDF content preview - In a production app, extract text from PDF here]"
+                if not pdf_support_available():
+                    return "[PDF content preview unavailable - PyPDF2 is not installed]"
+                return _cached_document_preview(sha256 or file_sha256(file_path), file_path, file_extension, max_length)
                 
-            elif file_extension in ['.docx', '.doc']:
-                # For Word files, return a placeholder - in a real app, use python-docx
-                return "[Word document content preview - In a production app, extract text from DOCX here]"
+            elif file_extension == '.docx':
+                return _cached_document_preview(sha256 or file_sha256(file_path), file_path, file_extension, max_length)
                 
         elif file_category == 'image':
             # For images, return metadata instead of content
@@ -155,35 +489,21 @@ def get_file_preview(file_path, max_length=1000):
         return f"[Error previewing file: {str(e)}]"
 
 
-def clean_temp_files(file_paths):
-    """
-    Clean up temporary files.
-    
-    Args:
-        file_paths (list): List of file paths to remove
-    """
-    for file_path in file_paths:
-        try:
-            if os.path.exists(file_path):
-                os.unlink(file_path)
-        except Exception as e:
-            st.warning(f"Failed to remove temporary file {file_path}: {str(e)}")
-
-
 class TempFileManager:
     """
-    Context manager for handling temporary files.
-    Ensures all temporary files are cleaned up.
+    Context manager for handling uploaded files.
+    Uploads are placed in the shared upload store and released when the
+    context exits.
     
     Example:
         with TempFileManager() as manager:
             file_path = manager.save_uploaded_file(uploaded_file)
             # Do something with file_path
-        # All temporary files are cleaned up automatically
+        # All uploads are released automatically
     """
     
     def __init__(self):
-        self.temp_files = []
+        self.stored_uploads = []
     
     def __enter__(self):
         return self
@@ -193,19 +513,43 @@ class TempFileManager:
     
     def save_uploaded_file(self, uploaded_file):
         """
-        Save an uploaded file and track it for cleanup.
+        Save an uploaded file to the shared upload store and track it for release.
+        The returned file may be shared with other sessions and must not be
+        modified or deleted by the caller.
         
         Args:
             uploaded_file: Streamlit UploadedFile object
             
         Returns:
-            str: Path to the saved temporary file
+            str: Path to the stored file
+        
+        Raises:
+            ValueError: If file size exceeds limit or file type is not allowed
         """
-        temp_file_path = save_uploaded_file(uploaded_file)
-        self.temp_files.append(temp_file_path)
-        return temp_file_path
+        # Imported here because the upload store depends on this module
+        from utils.upload_store import get_upload_store
+        
+        file_extension = get_upload_extension(uploaded_file)
+        
+        store = get_upload_store()
+        stored = store.acquire(uploaded_file, suffix=f".{file_extension}")
+        
+        # Reject mislabeled files before they are processed
+        try:
+            validate_file_type(stored.path, file_extension, stored.sha256)
+        except ValueError:
+            store.release(stored.sha256)
+            raise
+        
+        self.stored_uploads.append(stored.sha256)
+        return stored.path
     
     def cleanup(self):
-        """Clean up all tracked temporary files."""
-        clean_temp_files(self.temp_files)
-        self.temp_files = []
+        """Release all tracked uploads."""
+        if self.stored_uploads:
+            from utils.upload_store import get_upload_store
+            
+            store = get_upload_store()
+            for sha256 in self.stored_uploads:
+                store.release(sha256)
+            self.stored_uploads = []
@@ -0,0 +1,137 @@
+"""
+Prompt size profiler for development.
+Breaks the estimated token count of every prompt down by section (system
+context, history, metadata, document preview, media, ...) and aggregates the
+results per page, so the sections that drive input-token cost can be found.
+"""
+
+import threading
+from contextvars import ContextVar
+from config.settings import PROMPT_PROFILING_ENABLED
+from utils.text_utils import estimate_tokens
+
+# Page whose prompts are being built on the current script thread
+_current_page = ContextVar("prompt_profiler_page", default=None)
+
+# Rough media token costs, following Gemini's published rates
+IMAGE_TOKENS = 258
+AUDIO_TOKENS_PER_SECOND = 32
+VIDEO_TOKENS_PER_SECOND = 263
+AUDIO_BYTES_PER_SECOND = 16000  # ~128 kbps compressed audio
+VIDEO_BYTES_PER_SECOND = 250000  # ~2 Mbps compressed video
+
+
+def estimate_media_tokens(mime_type, size_bytes):
+    """
+    Estimate the input tokens a media attachment costs.
+
+    Args:
+        mime_type (str): MIME type of the media
+        size_bytes (int): Size of the media in bytes
+
+    Returns:
+        int: Estimated token count
+    """
+    kind = (mime_type or "").split("/")[0]
+    if kind == "image":
+        return IMAGE_TOKENS
+    if kind == "audio":
+        return int(size_bytes / AUDIO_BYTES_PER_SECOND * AUDIO_TOKENS_PER_SECOND)
+    if kind == "video":
+        return int(size_bytes / VIDEO_BYTES_PER_SECOND * VIDEO_TOKENS_PER_SECOND)
+    # Documents and other binary data are billed roughly like text
+    return size_bytes // 4
+
+
+class PromptProfiler:
+    """
+    Aggregates per-section prompt token counts by page.
+
+    Example:
+        set_profiling_page("Document Analysis")
+        prompt_profiler.record("document_analysis", prompt, {"document preview": preview})
+        prompt_profiler.report()
+    """
+
+    def __init__(self, enabled=PROMPT_PROFILING_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # page -> {"requests": int, "sections": {section: tokens}}
+        self._pages = {}
+
+    def _add(self, page, sections, count_request):
+        with self._lock:
+            stats = self._pages.setdefault(page, {"requests": 0, "sections": {}})
+            if count_request:
+                stats["requests"] += 1
+            for section, tokens in sections.items():
+                stats["sections"][section] = stats["sections"].get(section, 0) + tokens
+
+    def record(self, source, prompt, sections):
+        """
+        Record the section breakdown of a rendered prompt.
+        Whatever is not covered by the named sections is counted as system context.
+
+        Args:
+            source (str): Prompt builder or template name, used when no page is set
+            prompt (str): Complete rendered prompt
+            sections (dict): Section name -> section text
+        """
+        if not self.enabled:
+            return
+
+        section_tokens = {name: estimate_tokens(text) for name, text in sections.items() if text}
+        total = estimate_tokens(prompt)
+        section_tokens["system context"] = max(0, total - sum(section_tokens.values()))
+        self._add(_current_page.get() or source, section_tokens, count_request=True)
+
+    def record_media(self, mime_type, size_bytes, source="media"):
+        """
+        Record a media attachment sent with the current page's prompt.
+
+        Args:
+            mime_type (str): MIME type of the media
+            size_bytes (int): Size of the media in bytes
+            source (str, optional): Name used when no page is set. Defaults to "media".
+        """
+        if not self.enabled:
+            return
+        tokens = estimate_media_tokens(mime_type, size_bytes)
+        self._add(_current_page.get() or source, {"media": tokens}, count_request=False)
+
+    def report(self):
+        """
+        Get the aggregated token counts.
+
+        Returns:
+            dict: page -> {"requests", "total_tokens", "sections"}, sections sorted by size
+        """
+        with self._lock:
+            report = {}
+            for page, stats in self._pages.items():
+                sections = dict(sorted(stats["sections"].items(), key=lambda item: item[1], reverse=True))
+                report[page] = {
+                    "requests": stats["requests"],
+                    "total_tokens": sum(sections.values()),
+                    "sections": sections
+                }
+            return report
+
+    def reset(self):
+        """Discard all recorded statistics."""
+        with self._lock:
+            self._pages = {}
+
+
+def set_profiling_page(page):
+    """
+    Attribute prompts built from now on (on this thread) to a page.
+
+    Args:
+        page (str): Page name
+    """
+    _current_page.set(page)
+
+
+# Process-wide profiler used by the prompt builders
+prompt_profiler = PromptProfiler()
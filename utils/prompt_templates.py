@@ -0,0 +1,342 @@
+"""
+Registry of precompiled, versioned prompt templates.
+Every prompt sent to Gemini is rendered from a template registered here. Each
+template is parsed once at import time, carries a version and a stable content
+hash (used in response-cache keys), and keeps its static instructions ahead of
+any variables so that consecutive requests share the longest possible prefix
+for provider-side implicit prefix caching.
+"""
+
+import hashlib
+from string import Formatter
+
+
+class PromptTemplate:
+    """
+    A prompt template compiled into literal parts and variable slots.
+
+    Template text uses str.format field syntax ({name}) without format specs;
+    literal braces are written as {{ and }}. Optional fragments are named
+    pieces of prompt text chosen by the prompt builders (for example the
+    instruction for each image query type); they are part of the content hash.
+
+    Example:
+        template = PromptTemplate("greeting", 1, "Hello {name}.")
+        template.render(name="Ada")
+    """
+
+    def __init__(self, name, version, text, fragments=None):
+        self.name = name
+        self.version = version
+        self.text = text
+        self.fragments = dict(fragments or {})
+
+        # Compile the template into alternating literals and variable names
+        literals = []
+        fields = []
+        for literal, field, format_spec, conversion in Formatter().parse(text):
+            if format_spec or conversion:
+                raise ValueError(f"Template '{name}' uses unsupported format options in '{field}'")
+            literals.append(literal)
+            fields.append(field)
+
+        # Declared variables, in order of first appearance
+        self.variables = list(dict.fromkeys(field for field in fields if field is not None))
+
+        # Text before the first variable never changes between requests; every
+        # rendered prompt starts with it, followed by each variable and the
+        # literal text up to the next one
+        self.static_prefix = literals[0] if literals else ""
+        self._segments = list(zip(fields, literals[1:] + [""]))
+
+        # Stable hash of everything that shapes the rendered prompt
+        digest = hashlib.sha256()
+        digest.update(f"{name}\0{version}\0{text}".encode("utf-8"))
+        for key in sorted(self.fragments):
+            digest.update(f"\0{key}\0{self.fragments[key]}".encode("utf-8"))
+        self.content_hash = digest.hexdigest()[:16]
+
+    @property
+    def cache_key(self):
+        """Key identifying this template revision, for response caches."""
+        return f"{self.name}:v{self.version}:{self.content_hash}"
+
+    def fragment(self, key, default=None):
+        """
+        Get a named fragment of prompt text.
+
+        Args:
+            key (str): Fragment name
+            default (str, optional): Value if the fragment does not exist. Defaults to None.
+
+        Returns:
+            str: Fragment text
+        """
+        return self.fragments.get(key, default)
+
+    def render(self, **values):
+        """
+        Render the template.
+
+        Args:
+            **values: Value for every declared variable
+
+        Returns:
+            str: Rendered prompt
+
+        Raises:
+            KeyError: If a declared variable is missing
+        """
+        missing = [variable for variable in self.variables if variable not in values]
+        if missing:
+            raise KeyError(f"Template '{self.name}' is missing variables: {', '.join(missing)}")
+
+        parts = [self.static_prefix]
+        for field, literal in self._segments:
+            if field is not None:
+                parts.append(str(values[field]))
+            parts.append(literal)
+        return "".join(parts)
+
+
+# All registered templates, by name
+PROMPT_TEMPLATES = {}
+
+
+def register_template(name, version, text, fragments=None):
+    """
+    Compile and register a prompt template.
+
+    Args:
+        name (str): Template name
+        version (int): Template version; bump it when the wording changes
+        text (str): Template text
+        fragments (dict, optional): Named optional prompt fragments. Defaults to None.
+
+    Returns:
+        PromptTemplate: The registered template
+    """
+    template = PromptTemplate(name, version, text, fragments)
+    PROMPT_TEMPLATES[name] = template
+    return template
+
+
+def get_template(name):
+    """
+    Get a registered prompt template.
+
+    Args:
+        name (str): Template name
+
+    Returns:
+        PromptTemplate: The template
+
+    Raises:
+        KeyError: If no template with that name is registered
+    """
+    return PROMPT_TEMPLATES[name]
+
+
+def render_template(name, **values):
+    """
+    Render a registered prompt template.
+
+    Args:
+        name (str): Template name
+        **values: Value for every declared variable
+
+    Returns:
+        str: Rendered prompt
+    """
+    return PROMPT_TEMPLATES[name].render(**values)
+
+
+# Learning Assistant
+register_template("learning_assistant", 4, """You are EduGenius, an educational AI tutor.
+Provide clear, accurate, and engaging educational content.
+Include examples and analogies where helpful.
+{conversation_context}
+Adapt your explanation for {learning_level} level students.
+Use a {learning_style} learning style in your response.
+Student question: {question}{upload_note}""", fragments={
+    "upload_note": "Note: The student has also uploaded a {media_kind} file named '{media_name}'. Please incorporate this into your response if relevant.",
+})
+
+register_template("history_summary", 1, """You are EduGenius, an educational AI tutor.
+Your task is to summarize a tutoring conversation so it can continue without the full transcript.
+Keep the topics covered, the student's level of understanding, open questions, and any facts or examples the tutor relied on.
+Write at most 200 words in plain prose.{previous_summary_section}
+
+New conversation turns to add:
+{history_text}
+Updated summary:""")
+
+register_template("media_chat", 1, """You are EduGenius, an AI learning assistant answering follow-up questions about an uploaded file.
+
+{conversation_context}Regarding the {media_kind} file '{media_name}', the user asks: {question}""")
+
+# Document analysis
+register_template("document_analysis", 3, """You are EduGenius, an AI educational document analyst.
+Your task is to analyze educational documents and provide insights.
+Focus on educational value, key concepts, and learning opportunities.
+
+Please analyze the document '{document_name}' and perform the following analyses: {analysis_types}.{metadata_section}{summary_section}
+
+Here's a preview of the document content:
+
+{document_preview}""")
+
+register_template("document_qa", 1, """You are EduGenius, an AI educational document analyst.
+Answer the student's question using only the document excerpts below.
+If the excerpts do not contain the answer, say so instead of guessing.
+Refer to the excerpts you used by their numbers, like [2].
+
+Excerpts:
+
+{excerpts}
+
+Student question: {question}""")
+
+register_template("chunk_summary", 1, """You are EduGenius, an AI educational document analyst.
+Your task is to summarize one part of a longer educational document.
+Keep the key concepts, definitions, facts, and examples a student would need; leave out filler.
+Write at most {max_words} words in plain prose.
+
+Part {chunk_number} of the document '{document_name}'{section_note}:
+
+{chunk_text}
+
+Summary:""")
+
+register_template("summary_reduce", 1, """You are EduGenius, an AI educational document analyst.
+Your task is to combine summaries of consecutive parts of an educational document into one summary.
+Keep the order of the material, merge repeated points, and keep the key concepts, definitions, and examples.
+Write at most {max_words} words in plain prose.
+
+Summaries of the parts of '{document_name}', in order:
+
+{summaries}
+
+Combined summary:""")
+
+# Visual learning
+register_template("image_analysis", 2, """You are EduGenius, an AI visual learning assistant.
+Your task is to analyze educational images and provide insights.
+Focus on educational value, key concepts, and visual explanations.
+
+{instructions}{question_section}""", fragments={
+    "Explain the concept shown": "Please explain the educational concept shown in this image. Identify key elements and their relationships.",
+    "Identify elements": "Please identify and label all significant elements in this image. Explain their educational relevance.",
+    "Solve the problem shown": "Please solve the problem shown in this image. Explain your solution step by step.",
+    "Create a related exercise": "Based on this image, please create a related educational exercise or problem that would reinforce the concepts shown.",
+    "default": "Please analyze this image from an educational perspective.",
+})
+
+# Audio and video
+register_template("audio_analysis", 2, """You are EduGenius, an AI audio learning assistant.
+Your task is to analyze educational audio content and provide insights.
+Focus on educational value, key concepts, and learning opportunities.
+Please provide a detailed analysis focusing on educational value.
+
+Please analyze the audio file '{audio_name}' and perform the following analyses: {analysis_types}.{language_section}""")
+
+register_template("video_analysis", 2, """You are EduGenius, an AI video learning assistant.
+Your task is to analyze educational video content and provide insights.
+Focus on educational value, key moments, and learning opportunities.
+Provide a detailed analysis of the educational value of this video.
+
+Please analyze the video file '{video_name}' and perform the following analyses: {analysis_types}.
+
+Focus on {focus} educational aspects.""")
+
+register_template("video_insights", 1, """You are EduGenius, an AI video learning assistant.
+
+Provide a detailed analysis organized with markdown headings, including:
+1. Content summary
+2. Key educational moments with timestamps
+3. Educational value assessment
+4. Suggested learning activities
+
+Format your response in clear, organized markdown.
+
+Please analyze this educational video and provide insights on the following aspects:
+{analysis_types}
+
+Focus on {focus} educational aspects.""")
+
+register_template("video_quiz", 1, """Include questions that assess understanding of key concepts, visual elements, and important points from the video. Include answers and explanations.
+
+Create a {question_count}-question educational quiz based on the video '{video_name}'. Use {quiz_format} format.""")
+
+register_template("video_timestamps", 1, """Generate educational timestamps for a video about {video_name} focusing on {purpose}.""")
+
+# Quizzes
+register_template("quiz_generation", 2, """You are EduGenius, an AI educational quiz generator.
+Your task is to create effective educational assessment questions.
+Focus on clear, engaging questions that assess understanding.
+Ensure questions assess different cognitive levels, from recall to application and analysis.
+
+Please create a quiz on the topic of '{topic}' with the following specifications:
+- Difficulty level: {difficulty}
+- Number of questions: {question_count}
+- Question format: {format_type}{requirements_section}""", fragments={
+    "answers_with_explanations": "Include correct answers and brief explanations for each question.",
+    "answers_only": "Include an answer key.",
+    "explanations_only": "Include explanations for each answer.",
+    "education_level": "The quiz is for {value} level students.",
+    "content_focus": "Focus on {value}.",
+    "specific_focus": "Focus specifically on: {value}",
+    "standards": "Align with these educational standards: {value}",
+    "additional_instructions": "Additional instructions: {value}",
+})
+
+register_template("quiz_customization", 1, """You are EduGenius, an AI educational quiz generator.
+Modify the quiz below as requested. Maintain the same overall structure and format.
+
+I have a quiz on {topic} with the following specifications:
+- Difficulty level: {difficulty}
+- Question format: {format_type}
+- Question count: {question_count}
+
+Here is the current quiz:
+{quiz_content}
+
+Please modify this quiz to {instruction}.""")
+
+# Concept maps
+register_template("concept_mapping", 2, """You are EduGenius, an AI educational concept mapper.
+Your task is to map concepts and their relationships for educational purposes.
+Focus on clear hierarchies, connections, and educational relevance.
+Identify key concepts, sub-concepts, and their relationships.
+Organize information in a hierarchical structure and show cross-relationships.
+
+Please create a concept map for '{topic}' with {complexity} complexity level.{requirements_section}""", fragments={
+    "related_concepts": "Please include these related concepts in the map: {value}",
+    "educational_level": "Target educational level: {value}",
+    "map_format": "Use a {value} map format.",
+    "specific_focus": "Focus specifically on: {value}",
+    "examples": "Include relevant examples for key concepts.",
+    "definitions": "Include concise definitions for each concept.",
+    "resources": "Suggest additional resources for further learning.",
+    "additional_instructions": "Additional instructions: {value}",
+    "mermaid_output": "Your response should include:\n1. A brief explanation of the concept map\n2. A textual representation of the relationships\n3. A Mermaid.js diagram code for visualizing the concept map (use flowchart or graph syntax)",
+})
+
+register_template("concept_map_customization", 1, """You are EduGenius, an AI educational concept mapper.
+Modify the concept map below as requested. Maintain the same overall structure and include a Mermaid.js diagram code.
+
+I have a concept map for '{topic}' with the following specifications:
+- Complexity level: {complexity}
+- Educational level: {educational_level}
+- Format: {map_format}
+
+Here is the current concept map:
+{map_content}
+
+Please modify this concept map to {instruction}.""")
+
+register_template("mermaid_diagram", 1, """Return ONLY Mermaid.js diagram code (no explanations), using flowchart or graph syntax and starting with the word 'graph' or 'flowchart'.
+
+Create the diagram to visualize the following concept map about {topic}:
+
+{map_content}""")
@@ -1,238 +1,568 @@
 """
 Utilities for generating and formatting prompts for the Gemini API.
 These utilities create consistent, well-structured prompts for different use cases.
+The prompt wording lives in the template registry (utils/prompt_templates.py);
+the builders here only assemble the variable parts.
 """
 
-def create_learning_assistant_prompt(question, learning_level, learning_style, chat_history=None):
+from utils.conversation_utils import ConversationBuffer
+from utils.prompt_templates import get_template
+from utils.prompt_profiler import prompt_profiler
+
+def _render_history(chat_history, question=None):
+    """
+    Render chat history passed as a message list or a ConversationBuffer.
+
+    Args:
+        chat_history (list or ConversationBuffer): Previous chat messages
+        question (str, optional): Current question, used to select the most
+            relevant earlier turns of long histories. Defaults to None.
+
+    Returns:
+        str: Serialized history, or an empty string if there is none
+    """
+    if chat_history is None or len(chat_history) == 0:
+        return ""
+    if not isinstance(chat_history, ConversationBuffer):
+        chat_history = ConversationBuffer(chat_history)
+    return chat_history.render(query=question)
+
+
+def _profiled(source, prompt, sections=None):
+    """
+    Record a prompt's section sizes with the prompt profiler and return it.
+
+    Args:
+        source (str): Template name
+        prompt (str): Rendered prompt
+        sections (dict, optional): Section name -> section text. Defaults to None.
+
+    Returns:
+        str: The prompt, unchanged
+    """
+    prompt_profiler.record(source, prompt, sections or {})
+    return prompt
+
+
+def _requirement_lines(lines):
+    """
+    Format optional requirement lines as a prompt section.
+
+    Args:
+        lines (list): Requirement sentences (empty entries are skipped)
+
+    Returns:
+        str: Section text starting with a blank line, or an empty string
+    """
+    lines = [line for line in lines if line]
+    if not lines:
+        return ""
+    return "\n\n" + "\n".join(lines)
+
+
+def create_learning_assistant_prompt(question, learning_level, learning_style, chat_history=None, uploaded_media=None):
     """
     Create a prompt for the Learning Assistant mode.
-    
+
     Args:
         question (str): User's question
         learning_level (str): Learning level (Elementary, Middle School, etc.)
         learning_style (str): Learning style (Visual, Interactive, etc.)
-        chat_history (list, optional): Previous chat messages. Defaults to None.
-        
+        chat_history (list or ConversationBuffer, optional): Previous chat messages.
+            Pass the session's ConversationBuffer to avoid re-serializing the
+            history on every turn. Long histories are reduced to the recent
+            turns plus the earlier turns most relevant to the question.
+            Defaults to None.
+        uploaded_media (tuple, optional): (media kind, file name) of a file the
+            student uploaded alongside the question. Defaults to None.
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = f"""You are EduGenius, an educational AI tutor. 
-Adapt your explanation for {learning_level} level students.
-Use a {learning_style} learning style in your response.
-Provide clear, accurate, and engaging educational content.
-Include examples and analogies where helpful."""
+    template = get_template("learning_assistant")
 
     # Add chat history if provided
-    conversation_context = ""
-    if chat_history and len(chat_history) > 0:
-        conversation_context = "\n\nConversation history:\n"
-        for msg in chat_history:
-            role = "User" if msg["role"] == "user" else "EduGenius"
-            conversation_context += f"{role}: {msg['content']}\n\n"
-    
-    # Combine all parts
-    prompt = f"{system_context}\n{conversation_context}\nStudent question: {question}"
-    
-    return prompt
+    history_text = _render_history(chat_history, question)
+    conversation_context = f"\nConversation history:\n{history_text.rstrip()}\n" if history_text else ""
+
+    # Mention an uploaded file
+    upload_note = ""
+    if uploaded_media:
+        media_kind, media_name = uploaded_media
+        upload_note = "\n\n" + template.fragment("upload_note").format(media_kind=media_kind, media_name=media_name)
+
+    prompt = template.render(
+        learning_level=learning_level,
+        learning_style=learning_style,
+        conversation_context=conversation_context,
+        question=question,
+        upload_note=upload_note
+    )
+
+    return _profiled("learning_assistant", prompt, {"history": conversation_context, "question": question})
+
+
+def create_history_summary_prompt(previous_summary, history_text):
+    """
+    Create a prompt that folds older chat turns into a running summary.
+
+    Args:
+        previous_summary (str): Existing summary of earlier turns (may be empty)
+        history_text (str): Serialized chat turns to fold into the summary
+
+    Returns:
+        str: Formatted prompt
+    """
+    # Existing summary, if any
+    previous_summary_section = ""
+    if previous_summary:
+        previous_summary_section = f"\n\nSummary so far:\n{previous_summary}"
+
+    prompt = get_template("history_summary").render(
+        previous_summary_section=previous_summary_section,
+        history_text=history_text
+    )
+
+    return _profiled("history_summary", prompt, {"history": previous_summary_section + history_text})
+
+
+def create_media_chat_prompt(media_kind, media_name, question, chat_history=None):
+    """
+    Create a prompt for a follow-up question about an uploaded media file.
+
+    Args:
+        media_kind (str): Kind of media (image, audio, video)
+        media_name (str): Name of the uploaded file
+        question (str): User's question
+        chat_history (list or ConversationBuffer, optional): Previous chat messages
+            about this file. Defaults to None.
+
+    Returns:
+        str: Formatted prompt
+    """
+    # Add chat history if provided
+    history_text = _render_history(chat_history, question)
+    conversation_context = f"Conversation history:\n{history_text}\n" if history_text else ""
+
+    prompt = get_template("media_chat").render(
+        conversation_context=conversation_context,
+        media_kind=media_kind,
+        media_name=media_name,
+        question=question
+    )
+
+    return _profiled("media_chat", prompt, {"history": conversation_context, "question": question})
 
 
-def create_document_analysis_prompt(document_name, analysis_types, document_preview, document_metadata=None):
+def create_document_analysis_prompt(document_name, analysis_types, document_preview, document_metadata=None,
+                                    document_summary=None):
     """
     Create a prompt for document analysis.
-    
+
     Args:
         document_name (str): Name of the document
         analysis_types (list): Types of analysis to perform
         document_preview (str): Preview of document content
         document_metadata (dict, optional): Document metadata. Defaults to None.
-        
+        document_summary (str, optional): Summary of the whole document. Defaults to None.
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = """You are EduGenius, an AI educational document analyst.
-Your task is to analyze educational documents and provide insights.
-Focus on educational value, key concepts, and learning opportunities."""
-
-    # Analysis instructions
-    analysis_instructions = f"Please analyze the document '{document_name}' and perform the following analyses: {', '.join(analysis_types)}."
-    
     # Add metadata if provided
-    metadata_text = ""
+    metadata_section = ""
     if document_metadata:
-        metadata_text = "\n\nDocument metadata:\n"
-        for key, value in document_metadata.items():
-            metadata_text += f"- {key}: {value}\n"
-    
-    # Document preview
-    preview_text = f"\n\nHere's a preview of the document content:\n\n{document_preview}"
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{analysis_instructions}{metadata_text}{preview_text}"
-    
-    return prompt
+        metadata_section = "\n\nDocument metadata:\n" + "".join(
+            f"- {key}: {value}\n" for key, value in document_metadata.items()
+        )
+
+    # Add the whole-document summary if provided
+    summary_section = ""
+    if document_summary:
+        summary_section = f"\n\nSummary of the full document:\n{document_summary}"
+
+    prompt = get_template("document_analysis").render(
+        document_name=document_name,
+        analysis_types=", ".join(analysis_types),
+        metadata_section=metadata_section,
+        summary_section=summary_section,
+        document_preview=document_preview
+    )
+
+    return _profiled("document_analysis", prompt, {
+        "metadata": metadata_section,
+        "document summary": summary_section,
+        "document preview": document_preview
+    })
+
+
+def create_document_qa_prompt(question, excerpts):
+    """
+    Create a prompt that answers a question from retrieved document excerpts.
+
+    Args:
+        question (str): The student's question
+        excerpts (list): (document name, section, text) tuples, most relevant first
+
+    Returns:
+        str: Formatted prompt
+    """
+    excerpts_text = "\n\n".join(
+        f"[{number}] {document_name}" + (f", {section}" if section else "") + f":\n{text}"
+        for number, (document_name, section, text) in enumerate(excerpts, 1)
+    )
+
+    prompt = get_template("document_qa").render(
+        excerpts=excerpts_text or "(no matching excerpts)",
+        question=question
+    )
+
+    return _profiled("document_qa", prompt, {"excerpts": excerpts_text, "question": question})
+
+
+def create_chunk_summary_prompt(document_name, chunk_text, chunk_number, section=None, max_words=150):
+    """
+    Create a prompt that summarizes one chunk of a long document.
+
+    Args:
+        document_name (str): Name of the document
+        chunk_text (str): Text of the chunk
+        chunk_number (int): 1-based position of the chunk in the document
+        section (str, optional): Heading of the section the chunk belongs to. Defaults to None.
+        max_words (int, optional): Summary length limit. Defaults to 150.
+
+    Returns:
+        str: Formatted prompt
+    """
+    section_note = f", from the section '{section}'" if section else ""
+
+    prompt = get_template("chunk_summary").render(
+        max_words=max_words,
+        chunk_number=chunk_number,
+        document_name=document_name,
+        section_note=section_note,
+        chunk_text=chunk_text
+    )
+
+    return _profiled("chunk_summary", prompt, {"chunk": chunk_text})
+
+
+def create_summary_reduce_prompt(document_name, summaries, max_words=200):
+    """
+    Create a prompt that combines summaries of consecutive document chunks.
+
+    Args:
+        document_name (str): Name of the document
+        summaries (list): Chunk or partial summaries, in document order
+        max_words (int, optional): Combined summary length limit. Defaults to 200.
+
+    Returns:
+        str: Formatted prompt
+    """
+    summaries_text = "\n\n".join(f"[{number}] {summary}" for number, summary in enumerate(summaries, 1))
+
+    prompt = get_template("summary_reduce").render(
+        max_words=max_words,
+        document_name=document_name,
+        summaries=summaries_text
+    )
+
+    return _profiled("summary_reduce", prompt, {"summaries": summaries_text})
 
 
 def create_image_analysis_prompt(query_type, specific_question=None):
     """
     Create a prompt for image analysis.
-    
+
     Args:
         query_type (str): Type of analysis to perform
         specific_question (str, optional): Specific question about the image. Defaults to None.
-        
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = """You are EduGenius, an AI visual learning assistant.
-Your task is to analyze educational images and provide insights.
-Focus on educational value, key concepts, and visual explanations."""
+    template = get_template("image_analysis")
 
     # Query instructions based on type
-    if query_type == "Explain the concept shown":
-        instructions = "Please explain the educational concept shown in this image. Identify key elements and their relationships."
-    elif query_type == "Identify elements":
-        instructions = "Please identify and label all significant elements in this image. Explain their educational relevance."
-    elif query_type == "Solve the problem shown":
-        instructions = "Please solve the problem shown in this image. Explain your solution step by step."
-    elif query_type == "Create a related exercise":
-        instructions = "Based on this image, please create a related educational exercise or problem that would reinforce the concepts shown."
-    else:
-        instructions = "Please analyze this image from an educational perspective."
-    
+    instructions = template.fragment(query_type, template.fragment("default"))
+
     # Add specific question if provided
+    question_section = ""
     if specific_question:
-        instructions += f"\n\nPlease also address this specific question: {specific_question}"
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{instructions}"
-    
-    return prompt
+        question_section = f"\n\nPlease also address this specific question: {specific_question}"
+
+    prompt = template.render(instructions=instructions, question_section=question_section)
+
+    return _profiled("image_analysis", prompt, {"question": question_section})
 
 
 def create_audio_analysis_prompt(audio_name, analysis_types, language="Auto-detect"):
     """
     Create a prompt for audio analysis.
-    
+
     Args:
         audio_name (str): Name of the audio file
         analysis_types (list): Types of analysis to perform
         language (str, optional): Language of the audio. Defaults to "Auto-detect".
-        
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = """You are EduGenius, an AI audio learning assistant.
-Your task is to analyze educational audio content and provide insights.
-Focus on educational value, key concepts, and learning opportunities."""
-
-    # Analysis instructions
-    analysis_instructions = f"Please analyze the audio file '{audio_name}' and perform the following analyses: {', '.join(analysis_types)}."
-    
     # Add language context if specified
-    language_text = ""
+    language_section = ""
     if language and language != "Auto-detect":
-        language_text = f"\n\nThe audio is in {language}."
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{analysis_instructions}{language_text}\n\nPlease provide a detailed analysis focusing on educational value."
-    
-    return prompt
+        language_section = f"\n\nThe audio is in {language}."
+
+    prompt = get_template("audio_analysis").render(
+        audio_name=audio_name,
+        analysis_types=", ".join(analysis_types),
+        language_section=language_section
+    )
+
+    return _profiled("audio_analysis", prompt)
 
 
 def create_video_analysis_prompt(video_name, analysis_types, focus="General Analysis"):
     """
     Create a prompt for video analysis.
-    
+
     Args:
         video_name (str): Name of the video file
         analysis_types (list): Types of analysis to perform
         focus (str, optional): Educational focus. Defaults to "General Analysis".
-        
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = """You are EduGenius, an AI video learning assistant.
-Your task is to analyze educational video content and provide insights.
-Focus on educational value, key moments, and learning opportunities."""
+    prompt = get_template("video_analysis").render(
+        video_name=video_name,
+        analysis_types=", ".join(analysis_types),
+        focus=focus
+    )
 
-    # Analysis instructions
-    analysis_instructions = f"Please analyze the video file '{video_name}' and perform the following analyses: {', '.join(analysis_types)}."
-    
-    # Add focus context
-    focus_text = f"\n\nFocus on {focus} educational aspects."
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{analysis_instructions}{focus_text}\n\nProvide a detailed analysis of the educational value of this video."
-    
-    return prompt
+    return _profiled("video_analysis", prompt)
+
+
+def create_video_insights_prompt(analysis_types, focus="General Analysis"):
+    """
+    Create a prompt for analyzing video content sent alongside the prompt.
 
+    Args:
+        analysis_types (list): Types of analysis to perform
+        focus (str, optional): Educational focus. Defaults to "General Analysis".
 
-def create_quiz_generation_prompt(topic, difficulty, question_count, format_type):
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("video_insights").render(
+        analysis_types=", ".join(analysis_types),
+        focus=focus
+    )
+
+    return _profiled("video_insights", prompt)
+
+
+def create_video_quiz_prompt(video_name, question_count, quiz_format):
+    """
+    Create a prompt for a quiz based on a video.
+
+    Args:
+        video_name (str): Name of the video file
+        question_count (int): Number of questions
+        quiz_format (str): Question format
+
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("video_quiz").render(
+        video_name=video_name,
+        question_count=question_count,
+        quiz_format=quiz_format
+    )
+
+    return _profiled("video_quiz", prompt)
+
+
+def create_video_timestamps_prompt(video_name, purpose):
+    """
+    Create a prompt for educational timestamps of a video.
+
+    Args:
+        video_name (str): Name of the video file
+        purpose (str): What the timestamps are for (Key Concepts, Quiz Questions, etc.)
+
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("video_timestamps").render(video_name=video_name, purpose=purpose)
+
+    return _profiled("video_timestamps", prompt)
+
+
+def create_quiz_generation_prompt(topic, difficulty, question_count, format_type,
+                                  education_level=None, content_focus=None,
+                                  include_answers=True, include_explanations=True,
+                                  specific_focus=None, standards=None, additional_instructions=None):
     """
     Create a prompt for quiz generation.
-    
+
     Args:
         topic (str): Quiz topic
         difficulty (str): Difficulty level
         question_count (int): Number of questions
         format_type (str): Question format
-        
+        education_level (str, optional): Target education level. Defaults to None.
+        content_focus (list, optional): Cognitive skills to focus on. Defaults to None.
+        include_answers (bool, optional): Include an answer key. Defaults to True.
+        include_explanations (bool, optional): Include answer explanations. Defaults to True.
+        specific_focus (str, optional): Specific focus area. Defaults to None.
+        standards (str, optional): Educational standards to align with. Defaults to None.
+        additional_instructions (str, optional): Free-form instructions. Defaults to None.
+
     Returns:
         str: Formatted prompt
     """
-    # System context
-    system_context = """You are EduGenius, an AI educational quiz generator.
-Your task is to create effective educational assessment questions.
-Focus on clear, engaging questions that assess understanding."""
+    template = get_template("quiz_generation")
 
-    # Generation instructions
-    generation_instructions = f"""Please create a quiz on the topic of '{topic}' with the following specifications:
-- Difficulty level: {difficulty}
-- Number of questions: {question_count}
-- Question format: {format_type}
+    # Answer key instructions
+    if include_answers and include_explanations:
+        answers = template.fragment("answers_with_explanations")
+    elif include_answers:
+        answers = template.fragment("answers_only")
+    elif include_explanations:
+        answers = template.fragment("explanations_only")
+    else:
+        answers = ""
 
-Ensure questions assess different cognitive levels, from recall to application and analysis.
-Include correct answers and brief explanations for each question."""
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{generation_instructions}"
-    
-    return prompt
+    # Optional requirements
+    requirements_section = _requirement_lines([
+        education_level and template.fragment("education_level").format(value=education_level),
+        content_focus and template.fragment("content_focus").format(value=", ".join(content_focus)),
+        specific_focus and template.fragment("specific_focus").format(value=specific_focus),
+        standards and template.fragment("standards").format(value=standards),
+        answers,
+        additional_instructions and template.fragment("additional_instructions").format(value=additional_instructions),
+    ])
+
+    prompt = template.render(
+        topic=topic,
+        difficulty=difficulty,
+        question_count=question_count,
+        format_type=format_type,
+        requirements_section=requirements_section
+    )
+
+    return _profiled("quiz_generation", prompt, {"requirements": requirements_section})
+
+
+def create_quiz_customization_prompt(quiz_metadata, quiz_content, instruction):
+    """
+    Create a prompt that modifies an existing quiz.
+
+    Args:
+        quiz_metadata (dict): Quiz metadata (topic, difficulty, format, question_count)
+        quiz_content (str): Current quiz content
+        instruction (str): Requested modification
+
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("quiz_customization").render(
+        topic=quiz_metadata["topic"],
+        difficulty=quiz_metadata["difficulty"],
+        format_type=quiz_metadata["format"],
+        question_count=quiz_metadata["question_count"],
+        quiz_content=quiz_content,
+        instruction=instruction
+    )
+
+    return _profiled("quiz_customization", prompt, {"quiz content": quiz_content})
 
 
-def create_concept_mapping_prompt(topic, complexity, related_concepts=None):
+def create_concept_mapping_prompt(topic, complexity, related_concepts=None,
+                                  educational_level=None, map_format=None, specific_focus=None,
+                                  include_examples=False, include_definitions=False,
+                                  include_resources=False, additional_instructions=None,
+                                  include_mermaid=False):
     """
     Create a prompt for concept mapping.
-    
+
     Args:
         topic (str): Main concept topic
         complexity (str): Complexity level
         related_concepts (list, optional): List of related concepts. Defaults to None.
-        
-    Returns:
-        str: Formatted prompt
-    """
-    # System context
-    system_context = """You are EduGenius, an AI educational concept mapper.
-Your task is to map concepts and their relationships for educational purposes.
-Focus on clear hierarchies, connections, and educational relevance."""
-
-    # Mapping instructions
-    mapping_instructions = f"""Please create a concept map for '{topic}' with {complexity} complexity level.
-Identify key concepts, sub-concepts, and their relationships.
-Organize information in a hierarchical structure and show cross-relationships."""
-    
-    # Add related concepts if provided
-    related_text = ""
-    if related_concepts and len(related_concepts) > 0:
-        related_text = "\n\nPlease include these related concepts in the map: " + ", ".join(related_concepts)
-    
-    # Combine all parts
-    prompt = f"{system_context}\n\n{mapping_instructions}{related_text}"
-    
-    return prompt
+        educational_level (str, optional): Target educational level. Defaults to None.
+        map_format (str, optional): Map format or visual style. Defaults to None.
+        specific_focus (str, optional): Specific focus area. Defaults to None.
+        include_examples (bool, optional): Ask for examples. Defaults to False.
+        include_definitions (bool, optional): Ask for definitions. Defaults to False.
+        include_resources (bool, optional): Ask for further resources. Defaults to False.
+        additional_instructions (str, optional): Free-form instructions. Defaults to None.
+        include_mermaid (bool, optional): Ask for a Mermaid.js diagram. Defaults to False.
+
+    Returns:
+        str: Formatted prompt
+    """
+    template = get_template("concept_mapping")
+
+    # Optional requirements
+    requirements_section = _requirement_lines([
+        related_concepts and template.fragment("related_concepts").format(value=", ".join(related_concepts)),
+        educational_level and template.fragment("educational_level").format(value=educational_level),
+        map_format and template.fragment("map_format").format(value=map_format.lower()),
+        specific_focus and template.fragment("specific_focus").format(value=specific_focus),
+        include_examples and template.fragment("examples"),
+        include_definitions and template.fragment("definitions"),
+        include_resources and template.fragment("resources"),
+        additional_instructions and template.fragment("additional_instructions").format(value=additional_instructions),
+    ])
+    if include_mermaid:
+        requirements_section += "\n\n" + template.fragment("mermaid_output")
+
+    prompt = template.render(
+        topic=topic,
+        complexity=complexity,
+        requirements_section=requirements_section
+    )
+
+    return _profiled("concept_mapping", prompt, {"requirements": requirements_section})
+
+
+def create_concept_map_customization_prompt(map_metadata, map_content, instruction):
+    """
+    Create a prompt that modifies an existing concept map.
+
+    Args:
+        map_metadata (dict): Map metadata (main_concept, complexity, educational_level, map_format)
+        map_content (str): Current concept map content
+        instruction (str): Requested modification
+
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("concept_map_customization").render(
+        topic=map_metadata["main_concept"],
+        complexity=map_metadata["complexity"],
+        educational_level=map_metadata["educational_level"],
+        map_format=map_metadata["map_format"],
+        map_content=map_content,
+        instruction=instruction
+    )
+
+    return _profiled("concept_map_customization", prompt, {"map content": map_content})
+
+
+def create_mermaid_diagram_prompt(topic, map_content):
+    """
+    Create a prompt that turns a concept map description into Mermaid.js code.
+
+    Args:
+        topic (str): Main concept topic
+        map_content (str): Concept map description
+
+    Returns:
+        str: Formatted prompt
+    """
+    prompt = get_template("mermaid_diagram").render(topic=topic, map_content=map_content)
+
+    return _profiled("mermaid_diagram", prompt, {"map content": map_content})
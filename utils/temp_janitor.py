@@ -0,0 +1,216 @@
+"""
+Background janitor for files the application writes to disk.
+Keeps the temporary directory, the shared upload store, the extraction cache
+and the persisted document indexes within age and size limits, deletes
+partial files left by crashes, and reports disk usage metrics.
+"""
+
+import os
+import time
+import threading
+import streamlit as st
+from config.settings import (
+    TEMP_FILE_DIR,
+    TEMP_FILE_MAX_AGE_HOURS,
+    TEMP_DIR_QUOTA_MB,
+    TEMP_ORPHAN_GRACE_SECONDS,
+    TEMP_JANITOR_INTERVAL_SECONDS,
+    DOCUMENT_INDEX_DIR,
+    DOCUMENT_INDEX_QUOTA_MB
+)
+from utils.upload_store import get_upload_store
+from utils.extraction_cache import get_extraction_cache
+
+
+class TempFileJanitor:
+    """
+    Periodically deletes stale files.
+
+    Files in the temporary directory are only written while an upload is
+    being copied, so they are deleted when:
+    - they are older than the grace period (left behind by a crash);
+    - the directory exceeds its quota, oldest first.
+    The upload store and extraction cache prune themselves, and persisted
+    document indexes are deleted least recently used first above their quota.
+
+    Example:
+        janitor = get_temp_janitor()
+        janitor.sweep()
+    """
+
+    def __init__(self, directory=TEMP_FILE_DIR, max_age_seconds=TEMP_FILE_MAX_AGE_HOURS * 3600,
+                 quota_bytes=TEMP_DIR_QUOTA_MB * 1024 * 1024, grace_seconds=TEMP_ORPHAN_GRACE_SECONDS,
+                 interval_seconds=TEMP_JANITOR_INTERVAL_SECONDS, upload_store=None,
+                 extraction_cache=None, index_directory=DOCUMENT_INDEX_DIR,
+                 index_quota_bytes=DOCUMENT_INDEX_QUOTA_MB * 1024 * 1024):
+        self.directory = os.path.abspath(directory)
+        self.max_age_seconds = max_age_seconds
+        self.quota_bytes = quota_bytes
+        self.grace_seconds = grace_seconds
+        self.interval_seconds = interval_seconds
+        self.upload_store = upload_store
+        self.extraction_cache = extraction_cache
+        self.index_directory = os.path.abspath(index_directory)
+        self.index_quota_bytes = index_quota_bytes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            "sweeps": 0,
+            "deleted_files": 0,
+            "deleted_bytes": 0,
+            "last_sweep": None,
+            "files": 0,
+            "bytes": 0,
+            "index_files": 0,
+            "index_bytes": 0
+        }
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _scan(self, directory):
+        """List (path, size, modified time) for the files in a directory."""
+        files = []
+        if not os.path.isdir(directory):
+            return files
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append((entry.path, stat.st_size, stat.st_mtime))
+                except FileNotFoundError:
+                    continue
+        return files
+
+    def _delete(self, path, size):
+        """Delete a file and count it. Returns True if it was removed."""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return False
+        with self._lock:
+            self._metrics["deleted_files"] += 1
+            self._metrics["deleted_bytes"] += size
+        return True
+
+    def _enforce_quota(self, files, quota_bytes):
+        """
+        Delete the oldest files until the rest fit in a quota.
+
+        Args:
+            files (list): (path, size, modified time) entries; deleted entries are removed
+            quota_bytes (int): Size limit
+
+        Returns:
+            int: Total size of the remaining files
+        """
+        total = sum(size for _, size, _ in files)
+        if total <= quota_bytes:
+            return total
+        files.sort(key=lambda item: item[2])
+        kept = []
+        for path, size, modified in files:
+            if total > quota_bytes and self._delete(path, size):
+                total -= size
+            else:
+                kept.append((path, size, modified))
+        files[:] = kept
+        return total
+
+    def sweep(self):
+        """
+        Apply the age and quota rules once.
+
+        Returns:
+            dict: Current metrics
+        """
+        now = time.time()
+        remaining = []
+        for path, size, modified in self._scan(self.directory):
+            # Spooling a file takes seconds; anything older was left behind by a crash
+            if now - modified > self.grace_seconds and self._delete(path, size):
+                continue
+            remaining.append((path, size, modified))
+
+        # Over quota: delete the oldest files first
+        total = self._enforce_quota(remaining, self.quota_bytes)
+        remaining_count = len(remaining)
+
+        # Document indexes are rebuilt on demand; keep the most recently used ones
+        indexes = self._scan(self.index_directory)
+        index_total = self._enforce_quota(indexes, self.index_quota_bytes)
+
+        # Stored uploads nobody has used for a while
+        if self.upload_store is not None:
+            deleted, freed = self.upload_store.prune(self.max_age_seconds)
+            with self._lock:
+                self._metrics["deleted_files"] += deleted
+                self._metrics["deleted_bytes"] += freed
+
+        # Least recently used extraction results over the cache quota
+        if self.extraction_cache is not None:
+            deleted, freed = self.extraction_cache.prune()
+            with self._lock:
+                self._metrics["deleted_files"] += deleted
+                self._metrics["deleted_bytes"] += freed
+
+        with self._lock:
+            self._metrics["sweeps"] += 1
+            self._metrics["last_sweep"] = now
+            self._metrics["files"] = remaining_count
+            self._metrics["bytes"] = total
+            self._metrics["index_files"] = len(indexes)
+            self._metrics["index_bytes"] = index_total
+        return self.metrics()
+
+    def metrics(self):
+        """
+        Get disk usage and cleanup metrics.
+
+        Returns:
+            dict: Temporary directory and document index usage, deletion
+                  counts, and upload store and extraction cache statistics
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        if self.upload_store is not None:
+            metrics["upload_store"] = self.upload_store.stats()
+        if self.extraction_cache is not None:
+            metrics["extraction_cache"] = self.extraction_cache.stats()
+        return metrics
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                # A failed sweep is retried on the next interval
+                pass
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        """Start sweeping on a background daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="temp-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+
+
+@st.cache_resource
+def get_temp_janitor():
+    """
+    Get the janitor shared by all sessions of this server process, starting it on first use.
+
+    Returns:
+        TempFileJanitor: Running janitor
+    """
+    janitor = TempFileJanitor(upload_store=get_upload_store(), extraction_cache=get_extraction_cache())
+    janitor.start()
+    return janitor
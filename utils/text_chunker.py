@@ -0,0 +1,203 @@
+"""
+Splits extracted document text into overlapping, token-sized chunks.
+Chunks are cut on section and paragraph boundaries wherever possible, so each
+one can be summarized or searched on its own while a little trailing context
+is repeated at the start of the next chunk.
+
+Boundaries are content-defined: whether a chunk ends after a paragraph
+depends on a hash of that paragraph's closing text, not on its position. An
+edit therefore only changes the chunks around it, and every other chunk of a
+revised document is identical to the previous revision's, so its cached
+results can be reused.
+"""
+
+import re
+import zlib
+import hashlib
+from collections import namedtuple
+from config.settings import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_BOUNDARY_WINDOW_CHARS
+from utils.text_utils import estimate_tokens
+
+# A chunk of document text; section is the most recent heading, if any
+TextChunk = namedtuple("TextChunk", ["index", "text", "section", "tokens"])
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_paragraphs(text):
+    """
+    Split a block of text on blank lines.
+
+    Args:
+        text (str): Text such as a PDF page
+
+    Returns:
+        list: Non-empty paragraphs
+    """
+    return [paragraph.strip() for paragraph in _PARAGRAPH_BREAK.split(text or "") if paragraph.strip()]
+
+
+def _split_oversized(text, max_tokens):
+    """
+    Split a paragraph that does not fit in one chunk, on sentences and then words.
+
+    Args:
+        text (str): Paragraph text
+        max_tokens (int): Token limit per piece
+
+    Returns:
+        list: Pieces of at most max_tokens estimated tokens
+    """
+    pieces = []
+    current = []
+    current_tokens = 0
+    for sentence in _SENTENCE_END.split(text):
+        sentence_tokens = estimate_tokens(sentence) + 1
+        if sentence_tokens > max_tokens:
+            # A single run-on sentence is cut into word windows
+            words = sentence.split()
+            window = []
+            window_tokens = 0
+            for word in words:
+                word_tokens = estimate_tokens(word) + 1
+                if window and window_tokens + word_tokens > max_tokens:
+                    pieces.append(" ".join(window))
+                    window, window_tokens = [], 0
+                window.append(word)
+                window_tokens += word_tokens
+            if current:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            if window:
+                pieces.append(" ".join(window))
+            continue
+        if current and current_tokens + sentence_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(sentence)
+        current_tokens += sentence_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_digest(chunk):
+    """
+    Get a stable digest of a chunk's content, for per-chunk caches.
+
+    Args:
+        chunk (TextChunk): The chunk
+
+    Returns:
+        str: Hex SHA-256 of the chunk's section and text
+    """
+    return hashlib.sha256(f"{chunk.section or ''}\0{chunk.text}".encode("utf-8")).hexdigest()
+
+
+def _is_boundary(paragraph, tokens, spread):
+    """
+    Decide from its content whether a chunk may end after a paragraph.
+    The window of closing text is hashed like a rolling hash sampled at
+    paragraph ends; the cut probability grows with the paragraph's size so
+    that chunks end on average about spread tokens past the minimum.
+
+    Args:
+        paragraph (str): Paragraph text
+        tokens (int): Estimated tokens in the paragraph
+        spread (int): Tokens between the minimum and maximum chunk size
+
+    Returns:
+        bool: True if the chunk should end here
+    """
+    window = paragraph[-CHUNK_BOUNDARY_WINDOW_CHARS:].encode("utf-8")
+    return zlib.crc32(window) < min(1.0, tokens / max(spread, 1)) * 0xFFFFFFFF
+
+
+def chunk_blocks(blocks, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, min_tokens=None):
+    """
+    Group document blocks into overlapping chunks of bounded size.
+    Blocks are consumed lazily, so a whole document never has to be held in
+    memory. Once a chunk reaches min_tokens, it ends at the next heading or
+    at the next paragraph whose content hash marks a boundary; it never grows
+    past max_tokens. The next chunk repeats up to overlap_tokens of trailing
+    paragraphs from the same section.
+
+    Args:
+        blocks (iterable): (kind, text) pairs, where kind is "heading",
+            "paragraph", "table" or "page"; plain strings are treated as pages
+        max_tokens (int, optional): Estimated token limit per chunk. Defaults to CHUNK_MAX_TOKENS.
+        overlap_tokens (int, optional): Tokens repeated between consecutive chunks.
+            Defaults to CHUNK_OVERLAP_TOKENS.
+        min_tokens (int, optional): Size before a chunk may end at a
+            content-defined boundary. Defaults to half of max_tokens.
+
+    Yields:
+        TextChunk: Chunks in document order
+    """
+    if min_tokens is None:
+        min_tokens = max_tokens // 2
+    index = 0
+    section = None
+    # (text, tokens) of the paragraphs in the chunk being built
+    current = []
+    current_tokens = 0
+    # Overlap carried over from the previous chunk, not new content on its own
+    carried = 0
+
+    def flush():
+        nonlocal index
+        chunk = TextChunk(index, "\n\n".join(text for text, _ in current), section, current_tokens)
+        index += 1
+        return chunk
+
+    def overlap_tail():
+        # Trailing paragraphs that fit in the overlap budget
+        tail = []
+        tail_tokens = 0
+        for text, tokens in reversed(current):
+            if tail_tokens + tokens > overlap_tokens:
+                break
+            tail.insert(0, (text, tokens))
+            tail_tokens += tokens
+        return tail, tail_tokens
+
+    for block in blocks:
+        kind, text = ("page", block) if isinstance(block, str) else block
+        if kind == "heading":
+            if len(current) > carried and current_tokens >= min_tokens:
+                yield flush()
+                # Overlap is not carried across a section boundary
+                current, current_tokens, carried = [], 0, 0
+            section = text.strip()
+            paragraphs = [section]
+        elif kind == "page":
+            paragraphs = split_paragraphs(text)
+        else:
+            paragraphs = [text.strip()] if text.strip() else []
+
+        for paragraph in paragraphs:
+            tokens = estimate_tokens(paragraph) + 1
+            pieces = [(paragraph, tokens)]
+            if tokens > max_tokens:
+                pieces = [(piece, estimate_tokens(piece) + 1) for piece in _split_oversized(paragraph, max_tokens)]
+
+            for piece, piece_tokens in pieces:
+                if len(current) > carried and current_tokens + piece_tokens > max_tokens:
+                    yield flush()
+                    current, current_tokens = overlap_tail()
+                    # The overlap must leave room for the new paragraph
+                    while current and current_tokens + piece_tokens > max_tokens:
+                        current_tokens -= current.pop(0)[1]
+                    carried = len(current)
+                current.append((piece, piece_tokens))
+                current_tokens += piece_tokens
+                
+                # Content-defined boundary
+                if current_tokens >= min_tokens and _is_boundary(piece, piece_tokens, max_tokens - min_tokens):
+                    yield flush()
+                    current, current_tokens = overlap_tail()
+                    carried = len(current)
+
+    if len(current) > carried:
+        yield flush()
@@ -0,0 +1,194 @@
+"""
+Text utilities shared by the caching, retrieval and analysis helpers.
+Provides normalization, tokenization and n-gram helpers that work without any
+external NLP dependencies.
+"""
+
+import heapq
+import math
+import re
+
+# Common English stop words plus conversational filler that students add to
+# questions ("can you", "please") without changing what they are asking.
+STOP_WORDS = frozenset("""
+a am an and any are as at be been being but by can could did do does doing
+for from had has have having he her here hers herself him himself his i if in
+into is it its itself just me my myself of or our ours ourselves she should so
+some such that the their theirs them themselves then there these they this
+those to us very was we were will with would you your yours yourself
+yourselves please tell explain describe give show help let lets know want need
+something
+""".split())
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_NON_WORD_PATTERN = re.compile(r"[^a-z0-9\s]+")
+
+
+def normalize_text(text):
+    """
+    Normalize text for comparison by lowercasing and stripping punctuation.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Lowercased text with punctuation removed and whitespace collapsed
+    """
+    text = _NON_WORD_PATTERN.sub(" ", (text or "").lower())
+    return " ".join(text.split())
+
+
+def tokenize(text, remove_stop_words=False):
+    """
+    Split text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize
+        remove_stop_words (bool, optional): Drop stop words. Defaults to False.
+
+    Returns:
+        list: List of word tokens
+    """
+    tokens = _WORD_PATTERN.findall((text or "").lower())
+    if remove_stop_words:
+        return [token for token in tokens if token not in STOP_WORDS]
+    return tokens
+
+
+def char_ngrams(tokens, n=3):
+    """
+    Build the set of character n-grams for a list of tokens.
+    Each token is padded with boundary markers so that different words never
+    share their leading or trailing n-grams.
+
+    Args:
+        tokens (list): List of word tokens
+        n (int, optional): N-gram length. Defaults to 3.
+
+    Returns:
+        set: Set of character n-grams
+    """
+    grams = set()
+    for token in tokens:
+        padded = f"<{token}>"
+        if len(padded) <= n:
+            grams.add(padded)
+            continue
+        for i in range(len(padded) - n + 1):
+            grams.add(padded[i:i + n])
+    return grams
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of model tokens in a piece of text.
+    Uses the common approximation of about four characters per token, which
+    is close enough for budgeting without calling the tokenizer API.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+# Standard BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+class BM25Index:
+    """
+    Small incremental BM25 index over token lists.
+    Suited to short collections such as chat messages; documents are added one
+    at a time and identified by their insertion order.
+
+    Example:
+        index = BM25Index()
+        index.add(tokenize("photosynthesis needs light"))
+        index.top_k(tokenize("what does photosynthesis need"), 3)
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        # term -> list of (doc_id, term frequency)
+        self.postings = {}
+        self.doc_lengths = []
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, tokens):
+        """
+        Add a document to the index.
+
+        Args:
+            tokens (list): Document tokens
+
+        Returns:
+            int: Id of the new document
+        """
+        doc_id = len(self.doc_lengths)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self.postings.setdefault(token, []).append((doc_id, count))
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        return doc_id
+
+    def scores(self, query_tokens, max_doc=None):
+        """
+        Score documents against a query.
+
+        Args:
+            query_tokens (list): Query tokens
+            max_doc (int, optional): Only score documents with id below this. Defaults to None.
+
+        Returns:
+            dict: Document id -> BM25 score, for documents matching any query term
+        """
+        doc_count = len(self.doc_lengths)
+        if doc_count == 0:
+            return {}
+        if max_doc is None:
+            max_doc = doc_count
+
+        average_length = self.total_length / doc_count or 1.0
+        results = {}
+        for term in set(query_tokens):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            # Robertson-Sparck Jones IDF, floored at zero for very common terms
+            df = len(postings)
+            idf = max(0.0, math.log((doc_count - df + 0.5) / (df + 0.5) + 1.0))
+            for doc_id, tf in postings:
+                if doc_id >= max_doc:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                results[doc_id] = results.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return results
+
+    def top_k(self, query_tokens, k, max_doc=None):
+        """
+        Get the best matching documents for a query.
+
+        Args:
+            query_tokens (list): Query tokens
+            k (int): Number of documents to return
+            max_doc (int, optional): Only consider documents with id below this. Defaults to None.
+
+        Returns:
+            list: (doc_id, score) pairs with a positive score, best first
+        """
+        scored = self.scores(query_tokens, max_doc)
+        best = heapq.nlargest(k, scored.items(), key=lambda item: item[1])
+        return [(doc_id, score) for doc_id, score in best if score > 0]
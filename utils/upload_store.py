@@ -0,0 +1,169 @@
+"""
+Content-addressed store for uploaded files.
+Uploads are kept on disk once per distinct content (keyed by SHA-256) and
+shared by every session of the server process. Files are reference-counted
+while in use and evicted least recently used first under a disk quota.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict, namedtuple
+import streamlit as st
+from config.settings import UPLOAD_STORE_DIR, UPLOAD_STORE_QUOTA_MB
+from utils.file_utils import spool_uploaded_file
+
+# A file held in the store
+StoredUpload = namedtuple("StoredUpload", ["path", "sha256", "size"])
+
+
+class UploadStore:
+    """
+    Shared, reference-counted store of uploaded files.
+
+    Every acquire() must be paired with a release() of the same digest; files
+    with no references are kept for reuse until the store exceeds its quota.
+
+    Example:
+        store = get_upload_store()
+        stored = store.acquire(uploaded_file, suffix=".pdf")
+        try:
+            process_document(stored.path, uploaded_file.name)
+        finally:
+            store.release(stored.sha256)
+    """
+
+    def __init__(self, root=UPLOAD_STORE_DIR, quota_bytes=UPLOAD_STORE_QUOTA_MB * 1024 * 1024):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        # sha256 -> {"path", "size", "refs", "last_used"}, in LRU order
+        self._entries = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+        self._adopt_existing()
+
+    def _adopt_existing(self):
+        """Index files left in the store directory by an earlier process."""
+        for name in sorted(os.listdir(self.root), key=lambda n: os.path.getmtime(os.path.join(self.root, n))):
+            path = os.path.join(self.root, name)
+            sha256 = name.split(".")[0]
+            if len(sha256) != 64 or not os.path.isfile(path):
+                # Partial spool files from an interrupted upload
+                if name.startswith("tmp"):
+                    os.unlink(path)
+                continue
+            size = os.path.getsize(path)
+            self._entries[sha256] = {"path": path, "size": size, "refs": 0, "last_used": os.path.getmtime(path)}
+            self.total_bytes += size
+
+    def acquire(self, uploaded_file, suffix=""):
+        """
+        Add an upload to the store (or reuse an identical stored file) and take a reference.
+
+        Args:
+            uploaded_file: Streamlit UploadedFile object
+            suffix (str, optional): File suffix, such as ".pdf". Defaults to "".
+
+        Returns:
+            StoredUpload: Path, hex SHA-256 digest and size of the stored file
+
+        Raises:
+            ValueError: If the file size exceeds the limit
+        """
+        # Copy outside the lock so large uploads do not block other sessions
+        spooled = spool_uploaded_file(uploaded_file, suffix=suffix, directory=self.root)
+
+        with self._lock:
+            entry = self._entries.get(spooled.sha256)
+            if entry is not None and os.path.exists(entry["path"]):
+                # Same content is already stored
+                os.unlink(spooled.path)
+            else:
+                path = os.path.join(self.root, spooled.sha256 + suffix)
+                os.replace(spooled.path, path)
+                if entry is not None:
+                    self.total_bytes -= entry["size"]
+                entry = {"path": path, "size": spooled.size, "refs": 0, "last_used": 0}
+                self._entries[spooled.sha256] = entry
+                self.total_bytes += spooled.size
+
+            entry["refs"] += 1
+            entry["last_used"] = time.time()
+            self._entries.move_to_end(spooled.sha256)
+            self._evict()
+            return StoredUpload(entry["path"], spooled.sha256, entry["size"])
+
+    def release(self, sha256):
+        """
+        Drop a reference taken by acquire().
+
+        Args:
+            sha256 (str): Digest of the stored file
+        """
+        with self._lock:
+            entry = self._entries.get(sha256)
+            if entry is None:
+                return
+            entry["refs"] = max(0, entry["refs"] - 1)
+            entry["last_used"] = time.time()
+            self._evict()
+
+    def prune(self, max_age_seconds):
+        """
+        Delete unreferenced files that have not been used for a while.
+
+        Args:
+            max_age_seconds (float): Maximum time since last use
+
+        Returns:
+            tuple: (files deleted, bytes freed)
+        """
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            stale = [sha256 for sha256, entry in self._entries.items()
+                     if entry["refs"] == 0 and entry["last_used"] < cutoff]
+            freed = sum(self._remove(sha256) for sha256 in stale)
+            return len(stale), freed
+
+    def _remove(self, sha256):
+        """Delete a stored file and return its size. Caller must hold the lock."""
+        entry = self._entries.pop(sha256)
+        try:
+            os.unlink(entry["path"])
+        except FileNotFoundError:
+            pass
+        self.total_bytes -= entry["size"]
+        return entry["size"]
+
+    def _evict(self):
+        """Delete unreferenced files until the store fits its quota. Caller must hold the lock."""
+        if self.total_bytes <= self.quota_bytes:
+            return
+        for sha256 in list(self._entries):
+            if self.total_bytes <= self.quota_bytes:
+                break
+            if self._entries[sha256]["refs"] == 0:
+                self._remove(sha256)
+
+    def stats(self):
+        """
+        Get store statistics.
+
+        Returns:
+            dict: File count, bytes stored and files currently in use
+        """
+        with self._lock:
+            in_use = sum(1 for entry in self._entries.values() if entry["refs"] > 0)
+            return {"files": len(self._entries), "bytes": self.total_bytes, "in_use": in_use}
+
+
+@st.cache_resource
+def get_upload_store():
+    """
+    Get the upload store shared by all sessions of this server process.
+
+    Returns:
+        UploadStore: Shared upload store
+    """
+    return UploadStore()